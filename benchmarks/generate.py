@@ -0,0 +1,197 @@
+import argparse
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.loader import _parquet_available, _write_npz
+
+"""Колонки выгрузки operations.xlsx в исходном порядке"""
+COLUMNS = [
+    'Дата операции',
+    'Дата платежа',
+    'Номер карты',
+    'Статус',
+    'Сумма операции',
+    'Валюта операции',
+    'Сумма платежа',
+    'Валюта платежа',
+    'Кэшбэк',
+    'Категория',
+    'MCC',
+    'Описание',
+    'Бонусы (включая кэшбэк)',
+    'Округление на инвесткопилку',
+    'Сумма операции с округлением',
+]
+
+"""Категории с долей операций, кодами MCC и описаниями, близкими к реальной выгрузке"""
+CATEGORIES = {
+    'Супермаркеты': (0.34, [5411], ['Колхоз', 'Магнит', 'Пятёрочка', 'Перекрёсток', 'Лента']),
+    'Фастфуд': (0.19, [5814], ['Mouse Tail', 'Вкусно и точка', 'KFC', 'Бургер Кинг']),
+    'Транспорт': (0.06, [4131], ['Метро Санкт-Петербург', 'Транспорт Москвы']),
+    'Переводы': (0.05, [6012], ['Константин Л.', 'Светлана Т.', 'Иван С.']),
+    'Ж/д билеты': (0.04, [4112], ['РЖД', 'Туту.ру']),
+    'Различные товары': (0.03, [5399, 5948, 5331], ['Ozon.ru', 'Wildberries', 'Fix Price']),
+    'Связь': (0.03, [4814, 7379], ['Я МТС', 'Тинькофф Мобайл', 'Билайн']),
+    'Пополнения': (0.03, [6012], ['Пополнение через Сбербанк', 'Внесение наличных']),
+    'Аптеки': (0.02, [5912], ['Аптека Вита', 'Ригла']),
+    'Каршеринг': (0.02, [7512], ['Ситидрайв', 'Яндекс Драйв']),
+    'Рестораны': (0.02, [5812], ['Toko', 'Шоколадница']),
+    'Бонусы': (0.015, [None], ['Кэшбэк за обычные покупки']),
+    'Наличные': (0.015, [6011], ['Снятие в банкомате Тинькофф']),
+    'Дом и ремонт': (0.015, [5200, 5211, 7699], ['Леруа Мерлен', 'OBI']),
+    'Услуги банка': (0.014, [None], ['Плата за обслуживание']),
+    'Топливо': (0.011, [5541], ['Лукойл', 'Роснефть']),
+    'Образование': (0.011, [8299], ['Skillbox', 'Учи.ру']),
+    'Одежда и обувь': (0.01, [5651, 5661], ['Uniqlo', 'Спортмастер']),
+    'Другое': (0.01, [5817, 4900], ['Яндекс Плюс', 'Apple']),
+    'Такси': (0.01, [4121], ['Яндекс Такси', 'Ситимобил']),
+    'ЖКХ': (0.007, [4900], ['ЖКУ Квартира']),
+    'Цветы': (0.005, [5992], ['Цветы на Невском']),
+    'Развлечения': (0.005, [7941, 7991, 7922], ['Кинопоиск', 'Гипермаркет развлечений']),
+}
+
+"""Мобильные операторы для описаний с номером телефона"""
+PHONE_OPERATORS = ['Я МТС', 'Тинькофф Мобайл', 'Билайн', 'МегаФон']
+
+"""Доли операций: с номером телефона в описании, без карты, неуспешных и в валюте"""
+PHONE_SHARE = 0.01
+NO_CARD_SHARE = 0.1
+FAILED_SHARE = 0.006
+FOREIGN_SHARE = 0.02
+
+CARDS = ['*7197', '*4556', '*5091', '*5441', '*1112', '*5507', '*6002']
+CARD_WEIGHTS = [0.72, 0.2, 0.04, 0.02, 0.01, 0.005, 0.005]
+
+"""Поддерживаемые форматы файлов: xlsx, csv и колоночный (parquet, без pyarrow - npz)"""
+FORMATS = ('xlsx', 'csv', 'columnar')
+XLSX_MAX_ROWS = 1048575
+
+POSITIVE_CATEGORIES = {'Пополнения', 'Бонусы'}
+
+SECONDS_PER_DAY = 24 * 60 * 60
+TIME_TABLE = np.array([f'{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}'
+                       for second in range(SECONDS_PER_DAY)], dtype=object)
+
+
+def generate_operations(rows: int, start: str = '2018-01-01', end: str = '2021-12-31', seed: int = 0) -> pd.DataFrame:
+    """Функция генерации выгрузки операций из rows строк со схемой operations.xlsx.
+
+    Даты записываются строками в форматах выгрузки, строки отсортированы по убыванию даты, как в банке.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(CATEGORIES)
+    weights = np.array([CATEGORIES[name][0] for name in names])
+    category_codes = rng.choice(len(names), size=rows, p=weights / weights.sum())
+    categories = np.array(names, dtype=object)[category_codes]
+
+    start_day = pd.Timestamp(start).normalize()
+    days_total = (pd.Timestamp(end).normalize() - start_day).days + 1
+    seconds = np.sort(rng.integers(0, days_total * SECONDS_PER_DAY, size=rows))[::-1]
+    days = seconds // SECONDS_PER_DAY
+    payment_days = days + rng.integers(0, 2, size=rows)
+
+    amounts = -np.round(rng.lognormal(mean=5.5, sigma=1.1, size=rows), 2)
+    positive = np.isin(categories, list(POSITIVE_CATEGORIES))
+    amounts[positive] = np.abs(amounts[positive]) * 10
+
+    mcc = np.empty(rows, dtype='float64')
+    descriptions = np.empty(rows, dtype=object)
+    for code, name in enumerate(names):
+        mask = category_codes == code
+        count = int(mask.sum())
+        if not count:
+            continue
+        codes, texts = CATEGORIES[name][1], CATEGORIES[name][2]
+        codes = np.array([np.nan if value is None else value for value in codes])
+        mcc[mask] = codes[rng.integers(0, len(codes), count)]
+        descriptions[mask] = np.array(texts, dtype=object)[rng.integers(0, len(texts), count)]
+
+    phones = rng.random(rows) < PHONE_SHARE
+    count = int(phones.sum())
+    if count:
+        numbers = rng.integers(0, 10 ** 7, size=count)
+        operators = np.array(PHONE_OPERATORS, dtype=object)[rng.integers(0, len(PHONE_OPERATORS), count)]
+        descriptions[phones] = [f'{operator} +7 9{code:02d} {number // 10000:03d}-{number // 100 % 100:02d}-'
+                                f'{number % 100:02d}'
+                                for operator, code, number in zip(operators, rng.integers(0, 100, count), numbers)]
+        categories[phones] = 'Мобильная связь'
+
+    cards = np.array(CARDS, dtype=object)[rng.choice(len(CARDS), size=rows, p=CARD_WEIGHTS)]
+    cards[rng.random(rows) < NO_CARD_SHARE] = None
+    status = np.where(rng.random(rows) < FAILED_SHARE, 'FAILED', 'OK')
+    currency = np.where(rng.random(rows) < FOREIGN_SHARE, rng.choice(['TRY', 'EUR', 'CNY', 'USD'], size=rows), 'RUB')
+    rounded = np.abs(amounts)
+    cashback = np.where((rng.random(rows) < 0.1) & ~positive, np.round(rounded * 0.01), np.nan)
+
+    """Даты форматируются по таблицам строк для дней и секунд суток вместо strftime для каждой строки"""
+    day_table = pd.date_range(start_day, periods=days_total + 1, freq='D').strftime('%d.%m.%Y').to_numpy(dtype=object)
+    df = pd.DataFrame({
+        'Дата операции': day_table[days] + ' ' + TIME_TABLE[seconds % SECONDS_PER_DAY],
+        'Дата платежа': day_table[payment_days],
+        'Номер карты': cards,
+        'Статус': status,
+        'Сумма операции': amounts,
+        'Валюта операции': currency,
+        'Сумма платежа': amounts,
+        'Валюта платежа': np.where(currency == 'CNY', 'CNY', 'RUB'),
+        'Кэшбэк': cashback,
+        'Категория': categories,
+        'MCC': mcc,
+        'Описание': descriptions,
+        'Бонусы (включая кэшбэк)': (rounded // 50).astype('int64'),
+        'Округление на инвесткопилку': np.zeros(rows, dtype='int64'),
+        'Сумма операции с округлением': rounded,
+    })
+    return df[COLUMNS]
+
+
+def columnar_extension() -> str:
+    """Функция получения расширения колоночного формата: parquet при наличии pyarrow, иначе npz"""
+    return '.parquet' if _parquet_available() else '.npz'
+
+
+def write_operations(df: pd.DataFrame, directory: str, fmt: str, name: Optional[str] = None) -> str:
+    """Функция записи выгрузки в xlsx, csv или колоночном формате, возвращает путь к файлу"""
+    if fmt not in FORMATS:
+        raise ValueError(f'Неизвестный формат выгрузки: {fmt}')
+    if fmt == 'xlsx' and len(df) > XLSX_MAX_ROWS:
+        raise ValueError(f'В xlsx помещается не больше {XLSX_MAX_ROWS} строк')
+    os.makedirs(directory, exist_ok=True)
+    extension = columnar_extension() if fmt == 'columnar' else f'.{fmt}'
+    path = os.path.join(directory, f'{name or f"operations_{len(df)}"}{extension}')
+    if fmt == 'xlsx':
+        df.to_excel(path, index=False)
+    elif fmt == 'csv':
+        df.to_csv(path, index=False)
+    elif extension == '.parquet':
+        df.to_parquet(path, index=False)
+    else:
+        with open(path, 'wb') as file:
+            _write_npz(df, file)
+    return path
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Функция генерации выгрузок из командной строки"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.generate',
+                                     description='Генерация синтетических выгрузок operations.xlsx')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000, 10000000])
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--directory', default=os.path.join('benchmarks', 'data'))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for rows in args.rows:
+        df = generate_operations(rows, seed=args.seed)
+        for fmt in args.formats:
+            if fmt == 'xlsx' and rows > XLSX_MAX_ROWS:
+                print(f'{rows} строк: xlsx пропущен, лимит листа {XLSX_MAX_ROWS} строк')
+                continue
+            print(write_operations(df, args.directory, fmt))
+
+
+if __name__ == '__main__':
+    main()
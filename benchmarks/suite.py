@@ -0,0 +1,206 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate import FORMATS, XLSX_MAX_ROWS, generate_operations, write_operations
+from src.loader import load_operations
+from src.store import TransactionStore
+
+"""Размеры выгрузок и форматы по умолчанию; 1M и 10M строк задаются через --sizes"""
+DEFAULT_SIZES = [10000, 100000]
+DEFAULT_FORMATS = ['csv', 'columnar']
+
+"""Период и параметры запросов, на которых измеряются отчеты и главная страница"""
+PERIOD_START = '2021-12-01 00:00:00'
+PERIOD_END = '2021-12-31 23:59:59'
+DASHBOARD_DATETIME = '2021-12-31 23:59:59'
+REPORT_CATEGORY = 'Супермаркеты'
+REPORT_DATE = '2021-12-31'
+
+"""Правила кэшбэка, на которых измеряется расчет по всей выгрузке"""
+CASHBACK_RULES = {
+    'categories': {'Супермаркеты': 0.05, 'Фастфуд': 0.03},
+    'mcc': {'5411': 0.05},
+    'excluded_categories': ['Переводы', 'Пополнения', 'Наличные'],
+    'monthly_cap': 5000,
+    'category_caps': {'Супермаркеты': 2000},
+    'tiers': [{'from': 0, 'rate': 0.01}, {'from': 100000, 'rate': 0.015}],
+}
+
+BENCHMARKS = (
+    'load',
+    'analyze_cards',
+    'analyze_cards_store',
+    'spending_by_category',
+    'extract_transactions_with_mobile_numbers',
+    'convert_timestamps',
+    'dumps',
+    'cashback',
+    'views_main',
+)
+
+
+def measure(func: Callable[[], object], repeat: int) -> list[float]:
+    """Функция замера времени выполнения func в секундах, repeat раз"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def result_record(benchmark: str, rows: int, fmt: Optional[str], times: list[float]) -> dict:
+    """Функция формирования записи результата: все замеры, минимум, медиана и скорость по минимуму"""
+    best = min(times)
+    return {
+        'benchmark': benchmark,
+        'rows': rows,
+        'format': fmt,
+        'repeat': len(times),
+        'times': [round(value, 6) for value in times],
+        'min': round(best, 6),
+        'median': round(statistics.median(times), 6),
+        'rows_per_second': round(rows / best) if best > 0 else None,
+    }
+
+
+def environment() -> dict:
+    """Функция описания окружения запуска для сравнения результатов между запусками"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_size(rows: int, formats: Sequence[str], repeat: int, data_dir: str, seed: int) -> list[dict]:
+    """Функция замеров для одного размера выгрузки.
+
+    Загрузка измеряется для каждого формата без кэша, остальные замеры от формата не зависят
+    и выполняются на хранилище или датафрейме, загруженном из первого формата.
+    """
+    from src import reports, views
+    from src.services import extract_transactions_with_mobile_numbers
+    from src.cashback import CashbackRules, calculate_cashback
+    from src.serialization import dumps
+    from src.utils import convert_timestamps
+
+    df = generate_operations(rows, seed=seed)
+    results = []
+    store = None
+    for fmt in formats:
+        if fmt == 'xlsx' and rows > XLSX_MAX_ROWS:
+            continue
+        path = write_operations(df, data_dir, fmt, name=f'operations_{rows}_{seed}')
+        times = measure(lambda: TransactionStore(load_operations(path, use_cache=False), source=path), repeat)
+        results.append(result_record('load', rows, fmt, times))
+        if store is None:
+            store = TransactionStore(load_operations(path, use_cache=False), source=path)
+    if store is None:
+        return results
+    raw = df.copy()
+
+    window = store.date_index.window(PERIOD_START, PERIOD_END)
+    full = store.restore(store.df)
+    rules = CashbackRules.from_settings({'cashback': CASHBACK_RULES})
+    records = window.to_dict(orient='records')
+    scenarios = {
+        'analyze_cards': lambda: views.analyze_cards(raw, PERIOD_START, PERIOD_END),
+        'analyze_cards_store': lambda: views.analyze_cards(store, PERIOD_START, PERIOD_END),
+        'spending_by_category': lambda: reports.spending_by_category(store, REPORT_CATEGORY, REPORT_DATE),
+        'extract_transactions_with_mobile_numbers':
+            lambda: extract_transactions_with_mobile_numbers(store, output=os.devnull),
+        'convert_timestamps': lambda: convert_timestamps(records),
+        'dumps': lambda: dumps(window, compact=True),
+        'cashback': lambda: calculate_cashback(full, rules),
+        'views_main': lambda: views.main(DASHBOARD_DATETIME, store),
+    }
+
+    """Главная страница измеряется без обращений к внешним API, отчеты пишутся во временный каталог"""
+    saved = views.API_KEY, views.API_KEY_STOCK, reports.logs_directory
+    with tempfile.TemporaryDirectory() as reports_directory:
+        views.API_KEY, views.API_KEY_STOCK, reports.logs_directory = None, None, reports_directory
+        try:
+            for name, scenario in scenarios.items():
+                scenario()
+                results.append(result_record(name, rows, None, measure(scenario, repeat)))
+        finally:
+            views.API_KEY, views.API_KEY_STOCK, reports.logs_directory = saved
+    return results
+
+
+def run_suite(sizes: Sequence[int] = DEFAULT_SIZES, formats: Sequence[str] = DEFAULT_FORMATS, repeat: int = 3,
+              data_dir: Optional[str] = None, seed: int = 0) -> dict:
+    """Функция запуска набора замеров, возвращает окружение и результаты в виде словаря для JSON"""
+    data_dir = data_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+    results = []
+    for rows in sizes:
+        results.extend(run_size(rows, formats, repeat, data_dir, seed))
+    return {'environment': environment(), 'results': results}
+
+
+def compare(baseline: dict, current: dict) -> list[dict]:
+    """Функция сравнения двух запусков по минимальному времени: ratio > 1 - замедление"""
+    previous = {(item['benchmark'], item['rows'], item['format']): item for item in baseline['results']}
+    comparison = []
+    for item in current['results']:
+        key = (item['benchmark'], item['rows'], item['format'])
+        if key in previous and previous[key]['min'] > 0:
+            comparison.append({'benchmark': item['benchmark'], 'rows': item['rows'], 'format': item['format'],
+                               'baseline': previous[key]['min'], 'current': item['min'],
+                               'ratio': round(item['min'] / previous[key]['min'], 3)})
+    return comparison
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Функция запуска замеров из командной строки, результаты выводятся в JSON"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description='Замеры производительности')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='размеры выгрузок в строках')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=DEFAULT_FORMATS)
+    parser.add_argument('--repeat', type=int, default=3, help='число повторов каждого замера')
+    parser.add_argument('--data-dir', default=None, help='каталог для сгенерированных выгрузок')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='файл для результатов, по умолчанию stdout')
+    parser.add_argument('--compare', default=None, help='файл с результатами предыдущего запуска')
+    args = parser.parse_args(argv)
+
+    """Записи логов создаются как при обычной работе, но никуда не выводятся"""
+    logging.getLogger().addHandler(logging.NullHandler())
+    report = run_suite(args.sizes, args.formats, args.repeat, args.data_dir, args.seed)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            report['comparison'] = compare(json.load(file), report)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    else:
+        sys.stdout.write(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import datetime
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+from src.loader import READERS, load_operations
+from src.logging_config import configure_worker_logging, logger_levels, worker_logging
+from src.store import TransactionStore
+
+logger = logging.getLogger(__name__)
+
+"""Расширения файлов выписок, которые собираются из каталога"""
+STATEMENT_EXTENSIONS = ('.xlsx', *READERS)
+
+"""Процесс-обработчик перезапускается после стольких выписок, чтобы память не накапливалась"""
+MAX_TASKS_PER_WORKER = 50
+
+"""Число выписок в работе на один процесс: новые файлы отправляются по мере готовности старых"""
+TASKS_IN_FLIGHT_PER_WORKER = 2
+
+"""Имена файлов результатов для каждой выписки и для всего пакета"""
+DASHBOARD_FILENAME = 'dashboard.json'
+REPORT_FILENAME = 'report'
+PHONES_FILENAME = 'phones.ndjson'
+CARD_TOTALS_FILENAME = 'card_totals.csv'
+CATEGORY_SPEND_FILENAME = 'category_spend.csv'
+SUMMARY_FILENAME = 'summary.json'
+
+
+def find_statements(pattern: str) -> list[str]:
+    """Функция поиска выписок: все файлы поддерживаемых форматов в каталоге или файлы по шаблону glob"""
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                 if name.lower().endswith(STATEMENT_EXTENSIONS) and not name.startswith('~$')]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def output_names(paths: Iterable[str]) -> list[str]:
+    """Функция получения уникальных имен каталогов результатов по именам файлов выписок"""
+    names, used = [], set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, suffix = stem, 1
+        while name in used:
+            suffix += 1
+            name = f'{stem}_{suffix}'
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def _init_worker(records, levels: dict[str, int]) -> None:
+    """Функция настройки процесса-обработчика: логи передаются в родительский процесс, ошибки - в результате"""
+    configure_worker_logging(records, levels)
+
+
+def process_statement(path: str, output_dir: str, datetime_str: str, category: str, date: str,
+                      compact: bool = False, budget: Optional[float] = None, settings: Optional[dict] = None) -> dict:
+    """Функция обработки одной выписки в процессе-обработчике.
+
+    Для выписки формируются ответ главной страницы, отчет по категории и транзакции с мобильными номерами,
+    файлы пишутся в output_dir. В родительский процесс возвращаются только агрегаты:
+    суммы по картам за месяц главной страницы и траты по категориям за три месяца до date.
+    Настройки settings (валюты, акции, правила кэшбэка) читаются один раз в родительском процессе.
+    """
+    from src import reports, views
+    from src.services import extract_transactions_with_mobile_numbers
+    from src.writers import report_path, write_report
+
+    started = time.perf_counter()
+    result = {'file': path, 'output': output_dir, 'rows': 0, 'rejected': 0, 'cards': [], 'categories': {},
+              'report_rows': 0, 'phone_rows': 0, 'seconds': 0.0, 'error': None}
+    try:
+        store = TransactionStore(load_operations(path, use_cache=False), source=path, compact=compact)
+        result['rows'] = len(store)
+        result['rejected'] = len(store.ingest_report.rejected)
+        os.makedirs(output_dir, exist_ok=True)
+
+        dashboard = views.main(datetime_str, store, budget=budget, settings=settings)
+        with open(os.path.join(output_dir, DASHBOARD_FILENAME), 'w', encoding='utf-8') as file:
+            file.write(dashboard)
+        result['cards'] = json.loads(dashboard)['cards']
+
+        report = reports.spending_by_category.__wrapped__(store, category, date)
+        write_report(report, report_path(output_dir, REPORT_FILENAME, 'csv'))
+        result['report_rows'] = len(report)
+
+        phones = extract_transactions_with_mobile_numbers(store, output=os.path.join(output_dir, PHONES_FILENAME))
+        result['phone_rows'] = 0 if phones is None else len(phones)
+
+        end_date = pd.to_datetime(date, format='%Y-%m-%d')
+        window = store.restore(store.date_index.window(end_date - pd.DateOffset(months=3), end_date), categorical=True)
+        spend = window.groupby('Категория', observed=True)['Сумма операции'].sum()
+        result['categories'] = {str(name): float(value) for name, value in spend.items()}
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    result['seconds'] = round(time.perf_counter() - started, 6)
+    return result
+
+
+def merge_results(results: Iterable[dict]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Функция объединения агрегатов выписок: суммы и кэшбэк по картам, траты по категориям.
+
+    Карты разных выписок не суммируются: по последним цифрам карты разных клиентов не различить,
+    поэтому строки карт остаются по выпискам. Траты по категориям суммируются по всем выпискам.
+    """
+    card_rows, category_rows = [], []
+    for result in results:
+        card_rows.extend({'Выписка': result['file'], 'Последние цифры': card['Последние цифры'],
+                          'Всего потрачено': card['Всего потрачено'], 'Кэшбэк': card['Кэшбэк']}
+                         for card in result['cards'])
+        category_rows.extend({'Категория': name, 'Сумма операций': value, 'Выписок': 1}
+                             for name, value in result['categories'].items())
+
+    card_types = {'Выписка': object, 'Последние цифры': object, 'Всего потрачено': 'float64', 'Кэшбэк': 'float64'}
+    card_totals = pd.DataFrame(card_rows, columns=list(card_types)).astype(card_types)
+    card_totals = card_totals.sort_values('Выписка', kind='stable', ignore_index=True)
+    category_types = {'Категория': object, 'Сумма операций': 'float64', 'Выписок': 'int64'}
+    category_spend = pd.DataFrame(category_rows, columns=list(category_types)).astype(category_types)
+    category_spend = category_spend.groupby('Категория', as_index=False).sum()
+    card_totals[['Всего потрачено', 'Кэшбэк']] = card_totals[['Всего потрачено', 'Кэшбэк']].round(2)
+    category_spend['Сумма операций'] = category_spend['Сумма операций'].round(2)
+    return card_totals, category_spend.sort_values('Сумма операций', ignore_index=True)
+
+
+def log_progress(done: int, total: int, result: dict) -> None:
+    """Функция вывода прогресса пакетной обработки в лог"""
+    if result['error']:
+        logger.error('[%s/%s] Ошибка обработки %s: %s', done, total, result['file'], result['error'])
+    else:
+        logger.info('[%s/%s] %s: %s строк за %.2f с', done, total, result['file'], result['rows'], result['seconds'])
+
+
+def run_batch(paths: Iterable[str], output_dir: str, datetime_str: str, category: str, date: Optional[str] = None,
+              workers: Optional[int] = None, compact: bool = False, budget: Optional[float] = None,
+              settings: Optional[dict] = None, progress: Callable[[int, int, dict], None] = log_progress,
+              max_tasks_per_worker: int = MAX_TASKS_PER_WORKER) -> dict:
+    """Функция пакетной обработки выписок в пуле процессов.
+
+    Выписки обрабатываются независимо, поэтому скорость растет с числом ядер (workers, по умолчанию - все).
+    Память ограничена: в работе не больше TASKS_IN_FLIGHT_PER_WORKER файлов на процесс, процессы
+    перезапускаются после max_tasks_per_worker выписок, а в родительский процесс возвращаются только агрегаты.
+    Логи процессов-обработчиков передаются через очередь в лог текущего процесса.
+    При workers=1 выписки обрабатываются в текущем процессе. Возвращает сводку пакета.
+    """
+    paths = list(paths)
+    if date is None:
+        date = datetime.datetime.today().strftime('%Y-%m-%d')
+    workers = workers or os.cpu_count() or 1
+    total = len(paths)
+    tasks = [(path, os.path.join(output_dir, name), datetime_str, category, date, compact, budget, settings)
+             for path, name in zip(paths, output_names(paths))]
+    logger.info('Пакетная обработка %s выписок в %s процессах', total, workers)
+
+    started = time.perf_counter()
+    results = []
+    if workers == 1:
+        for task in tasks:
+            results.append(process_statement(*task))
+            progress(len(results), total, results[-1])
+    else:
+        pending_tasks = iter(tasks)
+        context = multiprocessing.get_context('spawn')
+        with worker_logging(context) as records, \
+                ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                    initargs=(records, logger_levels()),
+                                    max_tasks_per_child=max_tasks_per_worker) as executor:
+            running = set()
+            while True:
+                for task in pending_tasks:
+                    running.add(executor.submit(process_statement, *task))
+                    if len(running) >= workers * TASKS_IN_FLIGHT_PER_WORKER:
+                        break
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results.append(future.result())
+                    progress(len(results), total, results[-1])
+
+    card_totals, category_spend = merge_results(result for result in results if result['error'] is None)
+    os.makedirs(output_dir, exist_ok=True)
+    card_totals.to_csv(os.path.join(output_dir, CARD_TOTALS_FILENAME), index=False)
+    category_spend.to_csv(os.path.join(output_dir, CATEGORY_SPEND_FILENAME), index=False)
+
+    seconds = time.perf_counter() - started
+    summary = {
+        'files': total,
+        'failed': [{'file': result['file'], 'error': result['error']} for result in results if result['error']],
+        'rows': sum(result['rows'] for result in results),
+        'rejected': sum(result['rejected'] for result in results),
+        'workers': workers,
+        'seconds': round(seconds, 3),
+        'files_per_second': round(total / seconds, 3) if seconds > 0 else None,
+    }
+    with open(os.path.join(output_dir, SUMMARY_FILENAME), 'w', encoding='utf-8') as file:
+        json.dump(summary, file, ensure_ascii=False, indent=2)
+    logger.info('Обработано %s выписок за %.2f с, с ошибками: %s', total, seconds, len(summary['failed']))
+    return summary
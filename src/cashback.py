@@ -0,0 +1,196 @@
+import logging
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+"""Ставка кэшбэка по умолчанию, как в прежнем расчете: 1% от суммы операций"""
+DEFAULT_RATE = 0.01
+
+"""Раздел user_settings.json с правилами кэшбэка"""
+SETTINGS_KEY = 'cashback'
+
+"""Колонки операций, по которым рассчитывается кэшбэк"""
+CASHBACK_COLUMNS = ['Дата операции', 'Номер карты', 'Сумма операции', 'Категория', 'MCC']
+
+
+def _rate(value, name: str) -> float:
+    """Функция проверки ставки кэшбэка: число от 0 до 1"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+        raise ValueError(f'Некорректная ставка кэшбэка {name}: {value!r}')
+    return float(value)
+
+
+def _cap(value, name: str) -> float:
+    """Функция проверки лимита кэшбэка: неотрицательное число"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f'Некорректный лимит кэшбэка {name}: {value!r}')
+    return float(value)
+
+
+class CashbackRules:
+    """Класс правил кэшбэка.
+
+    Ставка операции берется по MCC, затем по категории, иначе - базовая: default_rate или ставка уровня tiers
+    по сумме операций карты за месяц. Исключенные категории кэшбэк не получают. Кэшбэк карты за месяц
+    ограничивается monthly_cap, а по категории за месяц - category_caps.
+    """
+
+    def __init__(self, default_rate: float = DEFAULT_RATE, categories: Optional[dict] = None,
+                 mcc: Optional[dict] = None, excluded_categories: Iterable[str] = (),
+                 monthly_cap: Optional[float] = None, category_caps: Optional[dict] = None,
+                 tiers: Optional[list] = None) -> None:
+        self.default_rate = _rate(default_rate, 'default_rate')
+        self.categories = {str(name): _rate(rate, name) for name, rate in (categories or {}).items()}
+        self.mcc = {int(code): _rate(rate, f'MCC {code}') for code, rate in (mcc or {}).items()}
+        self.excluded_categories = frozenset(str(name) for name in excluded_categories)
+        self.monthly_cap = None if monthly_cap is None else _cap(monthly_cap, 'monthly_cap')
+        self.category_caps = {str(name): _cap(cap, name) for name, cap in (category_caps or {}).items()}
+        self.tiers = sorted((_cap(tier.get('from'), 'tiers.from'), _rate(tier.get('rate'), 'tiers.rate'))
+                            for tier in (tiers or []))
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> 'CashbackRules':
+        """Метод получения правил из раздела "cashback" настроек, без раздела - 1% от суммы операций"""
+        rules = settings.get(SETTINGS_KEY) or {}
+        if not isinstance(rules, dict):
+            raise ValueError(f'Раздел {SETTINGS_KEY} настроек должен быть объектом')
+        return cls(**rules)
+
+    def __repr__(self) -> str:
+        return (f'CashbackRules(default_rate={self.default_rate}, categories={len(self.categories)}, '
+                f'mcc={len(self.mcc)}, excluded={len(self.excluded_categories)}, monthly_cap={self.monthly_cap}, '
+                f'category_caps={len(self.category_caps)}, tiers={len(self.tiers)})')
+
+
+class CashbackResult:
+    """Класс результата расчета: суммы операций и кэшбэк по картам и по категориям"""
+
+    def __init__(self, by_card: pd.DataFrame, by_category: pd.DataFrame) -> None:
+        self.by_card = by_card
+        self.by_category = by_category
+
+    @property
+    def total(self) -> float:
+        return round(float(self.by_card['Кэшбэк'].sum()), 2)
+
+    def __repr__(self) -> str:
+        return f'CashbackResult(cards={len(self.by_card)}, categories={len(self.by_category)}, total={self.total})'
+
+
+def _codes(values: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    """Функция получения кодов значений колонки и самих значений, пропуски - код -1.
+
+    У категориальной колонки используются ее коды, остальные колонки факторизуются один раз.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype(np.int64), pd.Index(values.cat.categories)
+    codes, keys = pd.factorize(values, sort=True)
+    return codes.astype(np.int64), pd.Index(keys)
+
+
+def _lookup(keys: pd.Index, values: dict, missing) -> np.ndarray:
+    """Функция построения массива значений по кодам; последний элемент отвечает коду -1 (пропуск или нет правила)"""
+    table = pd.Series(values, dtype='float64').reindex(keys.astype(str)).to_numpy(dtype='float64')
+    return np.append(np.where(np.isnan(table), missing, table), missing)
+
+
+def _cap_groups(cashback: np.ndarray, groups: np.ndarray, caps: np.ndarray) -> np.ndarray:
+    """Функция ограничения кэшбэка групп: сумма группы по модулю не больше лимита, строки масштабируются"""
+    sums = np.abs(np.bincount(groups, weights=cashback, minlength=len(caps)))
+    scale = np.ones(len(caps))
+    over = sums > caps
+    scale[over] = caps[over] / sums[over]
+    return cashback * scale[groups]
+
+
+def _totals(codes: np.ndarray, keys: pd.Index, amounts: np.ndarray, cashback: np.ndarray,
+            name: str) -> pd.DataFrame:
+    """Функция сумм операций и кэшбэка по кодам колонки, строки без значения колонки (код -1) не учитываются"""
+    shifted = codes + 1
+    size = len(keys) + 1
+    present = np.bincount(shifted, minlength=size)[1:] > 0
+    table = pd.DataFrame({
+        'Сумма операции': np.bincount(shifted, weights=amounts, minlength=size)[1:],
+        'Кэшбэк': np.bincount(shifted, weights=cashback, minlength=size)[1:],
+    }, index=pd.Index(keys, name=name))[present]
+    return table.round(2)
+
+
+@timed('cashback.calculate')
+def calculate_cashback(df: pd.DataFrame, rules: CashbackRules) -> CashbackResult:
+    """Функция расчета кэшбэка по правилам для всех операций датафрейма сразу.
+
+    Правила не проверяются построчно: категории и карты заменяются кодами, ставки и лимиты берутся
+    из массивов по кодам, суммы групп (карта, месяц[, категория]) считаются через np.bincount.
+    Кэшбэк имеет тот же знак, что и сумма операции, как и в прежнем расчете.
+    """
+    amounts = np.nan_to_num(df['Сумма операции'].to_numpy(dtype='float64', na_value=np.nan))
+    card_codes, cards = _codes(df['Номер карты'])
+    category_codes, categories = _codes(df['Категория'])
+
+    excluded = _lookup(categories, {name: 1.0 for name in rules.excluded_categories}, 0.0)[category_codes] > 0
+    counted = np.where(excluded, 0.0, amounts)
+
+    month_codes, months = pd.factorize(df['Дата операции'].to_numpy().astype('datetime64[M]'), use_na_sentinel=False)
+    """Номер группы (карта, месяц) вычисляется по кодам и служит индексом массивов сумм групп"""
+    card_months = (card_codes + 1) * len(months) + month_codes
+    group_count = (len(cards) + 1) * len(months)
+
+    if rules.tiers:
+        bounds = np.array([bound for bound, _ in rules.tiers])
+        tier_rates = np.array([rate for _, rate in rules.tiers])
+        volume = np.abs(np.bincount(card_months, weights=counted, minlength=group_count))
+        tier = np.searchsorted(bounds, volume, side='right') - 1
+        rates = np.where(tier >= 0, tier_rates[np.maximum(tier, 0)], rules.default_rate)[card_months]
+    else:
+        rates = np.full(len(df), rules.default_rate)
+
+    if rules.categories:
+        category_rates = _lookup(categories, rules.categories, np.nan)[category_codes]
+        rates = np.where(np.isnan(category_rates), rates, category_rates)
+    if rules.mcc and 'MCC' in df.columns:
+        mcc_keys = pd.Index(list(rules.mcc), dtype='float64')
+        positions = mcc_keys.get_indexer(pd.to_numeric(df['MCC'], errors='coerce').to_numpy(dtype='float64'))
+        mcc_rates = np.append(np.array(list(rules.mcc.values())), np.nan)[positions]
+        rates = np.where(np.isnan(mcc_rates), rates, mcc_rates)
+
+    cashback = counted * rates
+    if rules.category_caps:
+        size = len(categories) + 1
+        groups, keys = pd.factorize(card_months.astype(np.int64) * size + category_codes + 1)
+        caps = _lookup(categories, rules.category_caps, np.inf)[keys % size - 1]
+        cashback = _cap_groups(cashback, groups, caps)
+    if rules.monthly_cap is not None:
+        cashback = _cap_groups(cashback, card_months, np.full(group_count, rules.monthly_cap))
+
+    by_card = _totals(card_codes, cards, amounts, cashback, 'Номер карты')
+    by_category = _totals(category_codes, categories, amounts, cashback, 'Категория')
+    by_category = by_category.reset_index().sort_values('Кэшбэк', key=np.abs, ascending=False, ignore_index=True)
+    logger.debug('Кэшбэк рассчитан для %s операций: %s', len(df), rules)
+    return CashbackResult(by_card, by_category)
+
+
+def cashback_aggregates(df: pd.DataFrame) -> pd.DataFrame:
+    """Функция свертки операций в суммы по карте, месяцу, категории и MCC.
+
+    Ставка одинакова для всех операций такой группы, а уровни и лимиты зависят только от сумм групп,
+    поэтому calculate_cashback по свертке дает тот же результат, что и по исходным операциям.
+    Свертку можно повторять: суммы сверток нескольких пачек снова сворачиваются.
+    """
+    keys = [column for column in CASHBACK_COLUMNS if column in df.columns and column != 'Сумма операции']
+    months = df['Дата операции'].to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
+    df = df[keys + ['Сумма операции']].assign(**{'Дата операции': months})
+    return df.groupby(keys, dropna=False, observed=True, sort=False)['Сумма операции'].sum().reset_index()
+
+
+def cashback_records(result: CashbackResult) -> list[dict]:
+    """Функция получения кэшбэка по категориям для ответа главной страницы"""
+    return [{'Категория': str(name), 'Сумма операции': float(amount), 'Кэшбэк': float(cashback)}
+            for name, amount, cashback in zip(result.by_category['Категория'].tolist(),
+                                              result.by_category['Сумма операции'].tolist(),
+                                              result.by_category['Кэшбэк'].tolist())]
@@ -0,0 +1,220 @@
+import argparse
+import logging
+import os
+import sys
+from typing import Optional, Sequence
+
+from src.logging_config import DEFAULT_OPERATIONS_FILE, DEFAULT_SETTINGS_FILE, LOGS_DIRECTORY, configure_logging, \
+    parse_module_levels
+from src.metrics import profiled, registry
+
+logger = logging.getLogger(__name__)
+
+
+def load_store(args: argparse.Namespace):
+    """Функция однократной загрузки транзакций в общее хранилище или в базу SQLite (--sqlite)"""
+    from src.store import TransactionStore
+
+    if args.sqlite:
+        from src.sqlite_store import SQLiteStore
+
+        logger.info('Открытие базы %s для файла %s', args.sqlite, args.file)
+        return SQLiteStore.from_file(args.sqlite, args.file)
+
+    logger.info('Загрузка данных из файла %s', args.file)
+    store = TransactionStore.from_file(args.file, compact=args.compact)
+    logger.info('Данные успешно загружены, количество записей: %s', len(store))
+    return store
+
+
+def run_dashboard(args: argparse.Namespace) -> int:
+    """Функция подкоманды dashboard: JSON-ответ главной страницы"""
+    from src.utils import load_user_settings
+    from src.views import main
+
+    settings = load_user_settings(args.settings)
+    print(main(args.datetime, load_store(args), budget=args.budget, timings=args.timings, settings=settings,
+               compact=args.compact_json))
+    return 0
+
+
+def run_services(args: argparse.Namespace) -> int:
+    """Функция подкоманды services: транзакции с мобильными номерами в формате NDJSON"""
+    from src.services import extract_transactions_with_mobile_numbers
+
+    result = extract_transactions_with_mobile_numbers(load_store(args), output=args.output or sys.stdout)
+    return 0 if result is not None else 1
+
+
+def run_reports(args: argparse.Namespace) -> int:
+    """Функция подкоманды reports: траты по категории за три месяца до даты"""
+    from src.reports import spending_by_category, spending_by_category_custom
+
+    report = spending_by_category_custom if args.custom else spending_by_category
+    result = report(load_store(args), args.category, args.date)
+    print(f'Найдено {len(result)} транзакций по категории {args.category}')
+    return 0
+
+
+def run_all(args: argparse.Namespace) -> int:
+    """Функция подкоманды all: сервис, отчеты по категориям и главная страница по одному хранилищу.
+
+    Отчет по category сохраняется в reports, отчет по custom_category - в custom_report.
+    Транзакции загружаются один раз, ошибка одного шага записывается в лог и не прерывает остальные.
+    """
+    from src.reports import spending_by_category, spending_by_category_custom
+    from src.services import extract_transactions_with_mobile_numbers
+    from src.utils import load_user_settings
+    from src.views import main
+
+    store = load_store(args)
+    steps = [
+        ('extract_transactions_with_mobile_numbers', lambda: extract_transactions_with_mobile_numbers(
+            store, output=sys.stdout)),
+        ('spending_by_category', lambda: print(
+            f'Найдено {len(spending_by_category(store, args.category, args.date))} транзакций '
+            f'по категории {args.category}')),
+        ('spending_by_category_custom', lambda: print(
+            f'Найдено {len(spending_by_category_custom(store, args.custom_category, args.custom_date))} '
+            f'транзакций по категории {args.custom_category}')),
+        ('main', lambda: print(main(args.datetime, store, budget=args.budget,
+                                    settings=load_user_settings(args.settings)))),
+    ]
+    failed = 0
+    for name, step in steps:
+        logger.info('Вызов функции %s', name)
+        try:
+            step()
+            logger.info('Функция %s выполнена успешно', name)
+        except Exception as e:
+            logger.error('Ошибка при вызове функции %s: %s', name, e)
+            failed += 1
+    return 1 if failed else 0
+
+
+def print_progress(done: int, total: int, result: dict) -> None:
+    """Функция вывода прогресса пакетной обработки в stderr"""
+    if result['error']:
+        status = f'ошибка: {result["error"]}'
+    else:
+        status = f'{result["rows"]} строк за {result["seconds"]:.2f} с'
+    print(f'[{done}/{total}] {result["file"]}: {status}', file=sys.stderr)
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """Функция подкоманды batch: обработка множества выписок в пуле процессов"""
+    from src import batch
+    from src.utils import load_user_settings
+
+    paths = batch.find_statements(args.statements)
+    if not paths:
+        print(f'Выписки не найдены: {args.statements}', file=sys.stderr)
+        return 1
+    summary = batch.run_batch(paths, args.output_dir, args.datetime, args.category, args.date, workers=args.workers,
+                              compact=args.compact, budget=args.budget, settings=load_user_settings(args.settings),
+                              progress=print_progress)
+    print(f'Обработано {summary["files"]} выписок за {summary["seconds"]} с, с ошибками: {len(summary["failed"])}')
+    return 1 if summary['failed'] else 0
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    """Функция подкоманды serve: HTTP-сервер с данными в памяти и перезагрузкой при изменении файлов"""
+    from src.server import run_server
+
+    run_server(args.file, args.settings, args.host, args.port, args.poll_interval, args.workers, args.compact)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Функция построения разбора аргументов командной строки"""
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description='Анализ банковских операций')
+    parser.add_argument('--file', default=DEFAULT_OPERATIONS_FILE, help='файл с операциями (xlsx или csv)')
+    parser.add_argument('--compact', action='store_true', help='хранить транзакции в компактном представлении')
+    parser.add_argument('--sqlite', default=None, metavar='БАЗА',
+                        help='хранить транзакции в базе SQLite, файл операций загружается при изменении')
+    parser.add_argument('--log-level', default='INFO', help='уровень логирования (по умолчанию INFO)')
+    parser.add_argument('--log-file', default=os.path.join(LOGS_DIRECTORY, 'main.log'), help='файл логов')
+    parser.add_argument('--log-module', action='append', default=[], metavar='МОДУЛЬ=УРОВЕНЬ',
+                        help='уровень логирования модуля, например src.views=DEBUG')
+    parser.add_argument('--profile', default=None, metavar='ФАЙЛ',
+                        help='профилировать подкоманду через cProfile и сохранить статистику в файл')
+    parser.add_argument('--metrics', default=None, metavar='ФАЙЛ',
+                        help='сохранить метрики этапов в файл: .json - JSON, иначе формат Prometheus')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    dashboard = subparsers.add_parser('dashboard', help='JSON-ответ главной страницы')
+    dashboard.add_argument('datetime', help='дата и время, например "2018-07-20 15:30:45"')
+    dashboard.add_argument('--budget', type=float, default=None, help='бюджет времени на ответ в секундах')
+    dashboard.add_argument('--timings', action='store_true', help='добавить в ответ длительность этапов')
+    dashboard.add_argument('--compact-json', action='store_true', help='компактный JSON без отступов')
+    dashboard.add_argument('--settings', default=DEFAULT_SETTINGS_FILE, help='файл пользовательских настроек')
+    dashboard.set_defaults(handler=run_dashboard)
+
+    services = subparsers.add_parser('services', help='транзакции с мобильными номерами в формате NDJSON')
+    services.add_argument('--output', default=None, help='файл для записи, по умолчанию stdout')
+    services.set_defaults(handler=run_services)
+
+    reports = subparsers.add_parser('reports', help='траты по категории за три месяца')
+    reports.add_argument('category', help='категория, например "Супермаркеты"')
+    reports.add_argument('date', nargs='?', default=None, help='дата в формате ГГГГ-ММ-ДД, по умолчанию сегодня')
+    reports.add_argument('--custom', action='store_true', help='сохранить отчет в custom_report')
+    reports.set_defaults(handler=run_reports)
+
+    batch = subparsers.add_parser('batch', help='главная страница, отчет и сервис для множества выписок')
+    batch.add_argument('statements', help='каталог с выписками или шаблон, например "statements/*.xlsx"')
+    batch.add_argument('datetime', help='дата и время для главной страницы')
+    batch.add_argument('category', help='категория для отчета')
+    batch.add_argument('date', nargs='?', default=None, help='дата отчета в формате ГГГГ-ММ-ДД, по умолчанию сегодня')
+    batch.add_argument('--output-dir', default=os.path.join(LOGS_DIRECTORY, 'batch'), help='каталог результатов')
+    batch.add_argument('--workers', type=int, default=None, help='число процессов, по умолчанию - число ядер')
+    batch.add_argument('--budget', type=float, default=None, help='бюджет времени на главную страницу в секундах')
+    batch.add_argument('--settings', default=DEFAULT_SETTINGS_FILE, help='файл пользовательских настроек')
+    batch.set_defaults(handler=run_batch)
+
+    pipeline = subparsers.add_parser('all', help='сервис, отчеты и главная страница по одной загрузке транзакций')
+    pipeline.add_argument('datetime', help='дата и время для главной страницы')
+    pipeline.add_argument('category', help='категория для отчета')
+    pipeline.add_argument('date', nargs='?', default=None,
+                          help='дата отчета в формате ГГГГ-ММ-ДД, по умолчанию сегодня')
+    pipeline.add_argument('--custom-category', default='Дом и ремонт', help='категория для отчета custom_report')
+    pipeline.add_argument('--custom-date', default=None,
+                          help='дата отчета custom_report в формате ГГГГ-ММ-ДД, по умолчанию сегодня')
+    pipeline.add_argument('--budget', type=float, default=None, help='бюджет времени на главную страницу в секундах')
+    pipeline.add_argument('--settings', default=DEFAULT_SETTINGS_FILE, help='файл пользовательских настроек')
+    pipeline.set_defaults(handler=run_all)
+
+    serve = subparsers.add_parser('serve', help='HTTP-сервер главной страницы, отчетов и сервиса')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--settings', default=DEFAULT_SETTINGS_FILE, help='файл пользовательских настроек')
+    serve.add_argument('--poll-interval', type=float, default=1.0,
+                       help='период проверки изменения файлов в секундах, 0 - без перезагрузки')
+    serve.add_argument('--workers', type=int, default=4, help='число потоков для обработки запросов')
+    serve.set_defaults(handler=run_serve)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Функция запуска командной строки, возвращает код завершения.
+
+    Логирование настраивается один раз здесь, pandas, requests и модули проекта импортируются
+    только внутри подкоманды, которой они нужны.
+    """
+    args = build_parser().parse_args(argv)
+    configure_logging(args.log_level, args.log_file, parse_module_levels(','.join(args.log_module)))
+    logger.info('Запуск подкоманды %s', args.command)
+    try:
+        with profiled(args.profile):
+            return args.handler(args)
+    except Exception as e:
+        logger.error('Ошибка при выполнении подкоманды %s: %s', args.command, e)
+        print(f'Ошибка: {e}', file=sys.stderr)
+        return 1
+    finally:
+        if args.metrics:
+            registry.write(args.metrics)
+            logger.info('Метрики сохранены в %s', args.metrics)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+"""Суммы в компактном представлении хранятся в копейках"""
+KOPECKS_PER_RUBLE = 100
+
+"""Колонки сумм, которые хранятся целым числом копеек"""
+KOPECK_COLUMNS = ['Сумма операции', 'Сумма платежа', 'Сумма операции с округлением']
+
+"""Колонки с повторяющимися значениями, которые хранятся категориальными, если различных значений мало"""
+CATEGORICAL_COLUMNS = ['Номер карты', 'Статус', 'Валюта операции', 'Валюта платежа', 'Категория', 'Описание', 'MCC']
+
+"""Максимальная доля различных значений, при которой колонка становится категориальной"""
+MAX_CATEGORY_RATIO = 0.5
+
+
+def to_kopecks(amounts: pd.Series) -> pd.Series:
+    """Функция перевода сумм в рублях в целые копейки: int64, либо Int64 при пропусках"""
+    kopecks = (amounts.astype('float64') * KOPECKS_PER_RUBLE).round()
+    if kopecks.isna().any():
+        return kopecks.astype('Int64')
+    return kopecks.astype('int64')
+
+
+def compact_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Функция получения компактного представления нормализованных транзакций.
+
+    Все колонки сохраняются, потому что отчеты выводят их целиком: суммы переводятся в копейки,
+    колонки CATEGORICAL_COLUMNS с небольшим числом различных значений становятся категориальными.
+    """
+    df = df.copy()
+    for column in KOPECK_COLUMNS:
+        if column in df.columns:
+            df[column] = to_kopecks(df[column])
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and df[column].nunique() <= MAX_CATEGORY_RATIO * len(df):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def compact_like(df: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """Функция перевода новых нормализованных транзакций в компактное представление с колонками датафрейма like"""
+    df = df.reindex(columns=like.columns)
+    for column in KOPECK_COLUMNS:
+        if column in df.columns:
+            df[column] = to_kopecks(df[column])
+    return df
+
+
+def concat_transactions(first: pd.DataFrame, second: pd.DataFrame) -> pd.DataFrame:
+    """Функция объединения транзакций с сохранением категориальных колонок первого датафрейма.
+
+    Новые значения добавляются в конец категорий, коды существующих строк не меняются.
+    """
+    first, second = first.copy(deep=False), second.copy(deep=False)
+    for column in first.columns:
+        if isinstance(first[column].dtype, pd.CategoricalDtype) and column in second.columns:
+            categories = first[column].cat.categories
+            new_values = pd.Index(second[column].dropna().unique()).difference(categories)
+            if len(new_values):
+                categories = categories.append(new_values)
+                first[column] = first[column].cat.set_categories(categories)
+            second[column] = pd.Categorical(second[column], categories=categories)
+    return pd.concat([first, second])
+
+
+def expand_transactions(df: pd.DataFrame, categorical: bool = False) -> pd.DataFrame:
+    """Функция перевода компактного представления обратно: суммы - в рубли (float64), категориальные колонки -
+    в исходный тип значений. При categorical=True категориальные колонки остаются как есть (для расчетов по кодам).
+    """
+    df = df.copy(deep=False)
+    for column in KOPECK_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].to_numpy(dtype='float64', na_value=np.nan) / KOPECKS_PER_RUBLE
+    if not categorical:
+        for column in CATEGORICAL_COLUMNS:
+            if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype(df[column].cat.categories.dtype)
+    return df
+
+
+def column_memory(df: pd.DataFrame) -> pd.Series:
+    """Функция получения занимаемой памяти по колонкам в байтах, включая содержимое строк"""
+    return df.memory_usage(index=False, deep=True)
+
+
+def memory_report(before: pd.Series, after: pd.Series) -> pd.DataFrame:
+    """Функция сравнения памяти по колонкам до и после сжатия, в байтах, с итоговой строкой"""
+    columns = before.index.union(after.index, sort=False)
+    report = pd.DataFrame({'До': before, 'После': after}).reindex(columns).fillna(0).astype('int64')
+    report.loc['Итого'] = report.sum()
+    report['Экономия'] = report['До'] - report['После']
+    return report
@@ -0,0 +1,110 @@
+import logging
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.loader import DATE_FORMATS, parse_date_column
+from src.logging_config import log_summary
+from src.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+"""Колонки с суммами в выгрузке operations.xlsx"""
+AMOUNT_COLUMNS = [
+    'Сумма операции',
+    'Сумма платежа',
+    'Кэшбэк',
+    'Бонусы (включая кэшбэк)',
+    'Округление на инвесткопилку',
+    'Сумма операции с округлением',
+]
+
+"""Символы маски в номере карты, например '*7197'"""
+CARD_MASK_PATTERN = r'[\s*]'
+
+"""Колонки, по которым одна и та же транзакция узнается в повторных выгрузках"""
+DEDUP_COLUMNS = ['Дата операции', 'Номер карты', 'Сумма операции', 'Описание']
+
+
+class IngestReport:
+    """Класс отчета о нормализации: число строк, скорость и отклоненные строки с причиной"""
+
+    def __init__(self, rows: int, seconds: float, rejected: pd.DataFrame) -> None:
+        self.rows = rows
+        self.seconds = seconds
+        self.rejected = rejected
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+    def __repr__(self) -> str:
+        return (f'IngestReport(rows={self.rows}, rejected={len(self.rejected)}, '
+                f'rows_per_second={self.rows_per_second:.0f})')
+
+
+def strip_card_masks(cards: pd.Series) -> pd.Series:
+    """Функция удаления маски и пробелов из номеров карт: ' *7197 ' -> '7197'"""
+    stripped = cards.astype(str).str.replace(CARD_MASK_PATTERN, '', regex=True)
+    return stripped.where(cards.notna() & (stripped != ''))
+
+
+def transaction_keys(df: pd.DataFrame) -> np.ndarray:
+    """Функция получения 64-битных ключей транзакций по колонкам DEDUP_COLUMNS нормализованного датафрейма.
+
+    Суммы сравниваются в копейках, категориальные колонки - по значениям, поэтому ключи
+    обычного и компактного представления совпадают.
+    """
+    columns = {}
+    for column in DEDUP_COLUMNS:
+        values = df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if column == 'Сумма операции':
+            values = (values.astype('float64') * 100).round()
+        elif not pd.api.types.is_datetime64_any_dtype(values):
+            values = values.astype(object)
+        columns[column] = values
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+@timed('ingest.ingest_transactions')
+def ingest_transactions(df: pd.DataFrame, source: Optional[str] = None) -> tuple[pd.DataFrame, IngestReport]:
+    """Функция однократной нормализации транзакций.
+
+    Даты разбираются по фиксированным форматам, суммы приводятся к числам, из номеров карт удаляется маска.
+    Строки без даты операции или с нечисловой суммой операции отклоняются и возвращаются в отчете.
+    Исходный датафрейм не изменяется.
+    """
+    started = time.perf_counter()
+    df = df.copy(deep=False)
+    reasons = pd.Series('', index=df.index, dtype=object)
+
+    for column, date_format in DATE_FORMATS.items():
+        if column in df.columns:
+            df[column] = parse_date_column(df[column], date_format)
+    if 'Дата операции' in df.columns:
+        reasons[df['Дата операции'].isna()] = 'некорректная дата операции'
+
+    for column in AMOUNT_COLUMNS:
+        if column in df.columns and not pd.api.types.is_numeric_dtype(df[column]):
+            amounts = pd.to_numeric(df[column], errors='coerce')
+            if column == 'Сумма операции':
+                reasons[amounts.isna() & df[column].notna() & (reasons == '')] = 'некорректная сумма операции'
+            df[column] = amounts
+
+    if 'Номер карты' in df.columns:
+        df['Номер карты'] = strip_card_masks(df['Номер карты'])
+
+    rejected_mask = (reasons != '').to_numpy()
+    rejected = df[rejected_mask].assign(**{'Причина': reasons[rejected_mask]})
+    if rejected_mask.any():
+        df = df[~rejected_mask]
+
+    report = IngestReport(len(rejected_mask), time.perf_counter() - started, rejected)
+    logger.info('Нормализовано %s транзакций из %s (%.0f строк/с), отклонено %s',
+                report.rows, source or 'датафрейма', report.rows_per_second, len(rejected))
+    if len(rejected):
+        logger.warning('Отклоненные строки %s: %s', log_summary(rejected.index.tolist()),
+                       log_summary(rejected['Причина'].value_counts().to_dict()))
+    return df, report
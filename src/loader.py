@@ -0,0 +1,255 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+"""Форматы дат в выгрузке operations.xlsx"""
+DATE_FORMATS = {
+    'Дата операции': '%d.%m.%Y %H:%M:%S',
+    'Дата платежа': '%d.%m.%Y',
+}
+
+CACHE_DIRNAME = '.cache'
+
+"""Версия содержимого кэша: кэш другой версии не используется, даже если исходный файл не изменился"""
+CACHE_VERSION = 3
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def _parquet_available() -> bool:
+    """Функция проверки наличия движка для Parquet"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parse_date_column(values: pd.Series, date_format: str) -> pd.Series:
+    """Функция разбора колонки дат по фиксированному формату в datetime64[ns].
+
+    Значения, не подошедшие под формат, разбираются как ISO 8601, остальные становятся NaT.
+    Поэлементный разбор с угадыванием формата (dayfirst) не используется.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('datetime64[ns]')
+    dates = pd.to_datetime(values, format=date_format, errors='coerce')
+    leftover = dates.isna() & values.notna()
+    if leftover.any():
+        dates[leftover] = pd.to_datetime(values[leftover].astype(str), format='ISO8601', errors='coerce')
+    return dates.astype('datetime64[ns]')
+
+
+def parse_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """Функция преобразования колонок с датами: тот же разбор, что и при загрузке в хранилище"""
+    for column, date_format in DATE_FORMATS.items():
+        if column in df.columns:
+            df[column] = parse_date_column(df[column], date_format)
+    return df
+
+
+def _write_npz(df: pd.DataFrame, file) -> None:
+    """Функция записи таблицы в .npz без pickle: колонки object сохраняются строками с маской пропусков.
+
+    Колонки других типов (не numpy, например с часовым поясом) и колонки object с нестроковыми
+    значениями не поддерживаются - в этом случае возникает TypeError.
+    """
+    arrays = {'columns': np.array([str(column) for column in df.columns], dtype=str)}
+    for position, (column, values) in enumerate(df.items()):
+        if values.dtype == object:
+            missing = values.isna().to_numpy()
+            if missing.all() or pd.api.types.infer_dtype(values, skipna=True) == 'string':
+                arrays[f'mask_{position}'] = missing
+                arrays[f'values_{position}'] = values.fillna('').to_numpy(dtype=str)
+                continue
+        elif isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufmM':
+            arrays[f'values_{position}'] = values.to_numpy()
+            continue
+        raise TypeError(f'Колонку {column} ({values.dtype}) нельзя сохранить в .npz')
+    np.savez(file, **arrays)
+
+
+def _read_npz(file) -> pd.DataFrame:
+    """Функция чтения таблицы из .npz, записанного _write_npz; pickle при чтении запрещен"""
+    with np.load(file, allow_pickle=False) as data:
+        columns = data['columns'].tolist()
+        values = {}
+        for position in range(len(columns)):
+            column = data[f'values_{position}']
+            if f'mask_{position}' in data.files:
+                column = column.astype(object)
+                column[data[f'mask_{position}']] = np.nan
+            values[position] = column
+    df = pd.DataFrame(values)
+    df.columns = columns
+    return df
+
+
+"""Чтение файлов операций по расширению, остальные файлы читаются как Excel"""
+READERS = {
+    '.csv': pd.read_csv,
+    '.parquet': pd.read_parquet,
+    '.npz': _read_npz,
+}
+
+
+@timed('loader.read_file')
+def read_operations_file(file_path) -> pd.DataFrame:
+    """Функция чтения файла операций в формате xlsx, csv, parquet или npz"""
+    if isinstance(file_path, (str, os.PathLike)):
+        extension = os.path.splitext(os.fspath(file_path))[1].lower()
+        if extension in READERS:
+            return READERS[extension](file_path)
+    return pd.read_excel(file_path)
+
+
+def file_fingerprint(file_path: str) -> dict:
+    """Функция получения отпечатка файла: размер, время изменения и хэш содержимого"""
+    stat = os.stat(file_path)
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            sha256.update(block)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256.hexdigest()}
+
+
+def _cache_paths(file_path: str, cache_dir: Optional[str]) -> tuple[str, str]:
+    """Функция получения путей к файлу кэша и к файлу с его метаданными"""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIRNAME)
+    base_name = os.path.basename(file_path)
+    return os.path.join(cache_dir, f'{base_name}.data'), os.path.join(cache_dir, f'{base_name}.meta.json')
+
+
+def _read_meta(meta_path: str) -> dict:
+    """Функция чтения метаданных кэша"""
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(meta_path: str, meta: dict) -> None:
+    """Функция атомарной записи метаданных кэша"""
+    tmp_path = f'{meta_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+    os.replace(tmp_path, meta_path)
+
+
+def _read_cache(data_path: str, cache_format: str) -> pd.DataFrame:
+    """Функция чтения кэша в колоночном формате"""
+    if cache_format == 'parquet':
+        return pd.read_parquet(data_path)
+    if cache_format == 'npz':
+        return _read_npz(data_path)
+    raise ValueError(f'Неизвестный формат кэша: {cache_format}')
+
+
+def _write_cache(df: pd.DataFrame, data_path: str) -> str:
+    """Функция атомарной записи кэша, возвращает использованный формат: parquet при наличии pyarrow, иначе npz"""
+    tmp_path = f'{data_path}.tmp'
+    if _parquet_available():
+        df.to_parquet(tmp_path, index=False)
+        cache_format = 'parquet'
+    else:
+        with open(tmp_path, 'wb') as file:
+            _write_npz(df, file)
+        cache_format = 'npz'
+    os.replace(tmp_path, data_path)
+    return cache_format
+
+
+@timed('loader.load_operations')
+def load_operations(file_path, cache_dir: Optional[str] = None, use_cache: bool = True) -> pd.DataFrame:
+    """Функция загрузки операций (xlsx, csv, parquet или npz) с кэшированием в колоночном формате.
+
+    Кэш используется, пока размер, время изменения и хэш исходного файла и версия кэша не изменились.
+    Если путь не указывает на существующий файл, кэш не применяется.
+    """
+    if not use_cache or not isinstance(file_path, (str, os.PathLike)) or not os.path.isfile(file_path):
+        return parse_dates(read_operations_file(file_path))
+
+    file_path = os.fspath(file_path)
+    data_path, meta_path = _cache_paths(file_path, cache_dir)
+    fingerprint = file_fingerprint(file_path)
+    meta = _read_meta(meta_path)
+
+    if meta.get('version') == CACHE_VERSION and meta.get('sha256') == fingerprint['sha256'] \
+            and meta.get('size') == fingerprint['size'] and os.path.exists(data_path):
+        try:
+            df = _read_cache(data_path, meta.get('format'))
+            if meta.get('mtime_ns') != fingerprint['mtime_ns']:
+                _write_meta(meta_path, {**meta, **fingerprint})
+            logger.info('Операции загружены из кэша %s', data_path)
+            return df
+        except Exception as e:
+            logger.warning('Не удалось прочитать кэш %s, файл будет прочитан заново: %s', data_path, e)
+
+    df = parse_dates(read_operations_file(file_path))
+    logger.info('Файл %s прочитан, записей: %s', file_path, len(df))
+
+    try:
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        cache_format = _write_cache(df, data_path)
+        _write_meta(meta_path, {**fingerprint, 'format': cache_format, 'version': CACHE_VERSION})
+        logger.info('Кэш сохранен в %s', data_path)
+    except Exception as e:
+        logger.warning('Не удалось сохранить кэш %s: %s', data_path, e)
+
+    return df
+
+
+def _iter_excel_rows(file_path, chunk_size: int) -> Iterator[tuple[tuple, list]]:
+    """Функция построчного чтения листа Excel в режиме read-only, возвращает заголовок и пачки строк"""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                yield header, batch
+                batch = []
+        if batch:
+            yield header, batch
+    finally:
+        workbook.close()
+
+
+def iter_operation_batches(file_path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Функция потокового чтения операций пачками фиксированного размера.
+
+    Поддерживаются файлы .xlsx (openpyxl в режиме read-only) и .csv (чтение по частям),
+    поэтому расход памяти ограничен размером пачки, а не размером файла.
+    """
+    if chunk_size <= 0:
+        raise ValueError('Размер пачки должен быть положительным')
+
+    if os.fspath(file_path).lower().endswith('.csv'):
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+            yield parse_dates(chunk)
+        return
+
+    offset = 0
+    for header, rows in _iter_excel_rows(file_path, chunk_size):
+        batch = pd.DataFrame.from_records(rows, columns=header)
+        batch.index = pd.RangeIndex(offset, offset + len(batch))
+        offset += len(batch)
+        yield parse_dates(batch)
+    logger.info('Файл %s прочитан потоково, записей: %s', file_path, offset)
@@ -0,0 +1,191 @@
+import atexit
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Iterator, Optional
+
+"""Каталог логов и отчетов по умолчанию: logs в корне проекта, переопределяется переменной LOGS_DIR"""
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGS_DIRECTORY = os.getenv('LOGS_DIR', os.path.join(PROJECT_DIRECTORY, 'logs'))
+
+"""Файл с операциями по умолчанию, переопределяется переменной OPERATIONS_FILE"""
+DEFAULT_OPERATIONS_FILE = os.getenv('OPERATIONS_FILE', os.path.join(PROJECT_DIRECTORY, 'data', 'operations.xlsx'))
+
+"""Файл пользовательских настроек, переопределяется переменной USER_SETTINGS_FILE"""
+DEFAULT_SETTINGS_FILE = os.getenv('USER_SETTINGS_FILE', os.path.join(PROJECT_DIRECTORY, 'user_settings.json'))
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+"""Уровни логирования по модулям по умолчанию; переопределяются переменной LOG_LEVELS
+вида 'src.views=DEBUG,src.store=WARNING' и параметром module_levels"""
+MODULE_LEVELS = {
+    'urllib3': 'WARNING',
+}
+
+"""Ограничения на размер описания объекта в логе"""
+MAX_SUMMARY_ITEMS = 10
+MAX_SUMMARY_LENGTH = 200
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+def parse_module_levels(value: str) -> dict[str, str]:
+    """Функция разбора строки уровней по модулям вида 'src.views=DEBUG,src.store=WARNING'"""
+    levels = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = 'INFO', log_file: Optional[str] = None,
+                      module_levels: Optional[dict[str, str]] = None) -> None:
+    """Функция однократной настройки логирования приложения.
+
+    Записи передаются через очередь (QueueHandler), а в файл их пишет отдельный поток QueueListener,
+    поэтому запись на диск не задерживает вызывающий код. Логи дописываются в log_file
+    (по умолчанию logs/main.log), уровни отдельных модулей задаются module_levels.
+    Повторные вызовы ничего не меняют, модули при импорте логирование не настраивают.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    if log_file is None:
+        log_file = os.path.join(LOGS_DIRECTORY, 'main.log')
+    directory = os.path.dirname(log_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(records)
+    _listener = QueueListener(records, file_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    root.addHandler(_queue_handler)
+    levels = {**MODULE_LEVELS, **parse_module_levels(os.getenv('LOG_LEVELS', '')), **(module_levels or {})}
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Функция остановки фоновой записи логов: оставшиеся в очереди записи дописываются в файл"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+
+
+class _ParentLoggerHandler(logging.Handler):
+    """Класс передачи записей процессов-обработчиков логгерам родительского процесса с теми же именами"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger(record.name).handle(record)
+
+
+def logger_levels() -> dict[str, int]:
+    """Функция получения уровней корневого логгера ('') и логгеров, которым уровень задан явно"""
+    levels = {name: logger.level for name, logger in logging.root.manager.loggerDict.items()
+              if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET}
+    return {'': logging.getLogger().level, **levels}
+
+
+@contextmanager
+def worker_logging(context=multiprocessing) -> Iterator[multiprocessing.Queue]:
+    """Функция приема логов процессов-обработчиков, запущенных в контексте multiprocessing context.
+
+    Возвращает очередь для configure_worker_logging: пока контекст открыт, поток QueueListener
+    передает записи из нее логгерам текущего процесса, а те - в его обработчики (файл лога).
+    """
+    records = context.Queue()
+    listener = QueueListener(records, _ParentLoggerHandler())
+    listener.start()
+    try:
+        yield records
+    finally:
+        listener.stop()
+        records.close()
+        records.join_thread()
+
+
+def configure_worker_logging(records: multiprocessing.Queue, levels: dict[str, int]) -> None:
+    """Функция настройки логирования процесса-обработчика.
+
+    Обработчики, унаследованные от родительского процесса (их QueueHandler в процессе-обработчике никто
+    не читает), удаляются; записи отправляются в очередь records с уровнями логгеров родителя levels.
+    """
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(records))
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def describe(obj: Any) -> str:
+    """Функция краткого описания объекта для лога.
+
+    Датафреймы и серии описываются размером и хэшем содержимого вместо repr,
+    большие коллекции - типом и длиной, длинные строки обрезаются.
+    """
+    if type(obj).__module__.startswith('pandas') and hasattr(obj, 'shape'):
+        return f'{type(obj).__name__}(shape={obj.shape}, hash={content_hash(obj)})'
+    if isinstance(obj, (list, tuple, set, dict)):
+        if len(obj) > MAX_SUMMARY_ITEMS:
+            return f'{type(obj).__name__}(len={len(obj)})'
+        if isinstance(obj, dict):
+            return '{' + ', '.join(f'{key!r}: {describe(value)}' for key, value in obj.items()) + '}'
+        items = ', '.join(describe(item) for item in obj)
+        if isinstance(obj, tuple):
+            return f'({items},)' if len(obj) == 1 else f'({items})'
+        return f'[{items}]' if isinstance(obj, list) else f'{{{items}}}'
+    text = repr(obj)
+    if len(text) > MAX_SUMMARY_LENGTH:
+        return f'{text[:MAX_SUMMARY_LENGTH]}...'
+    return text
+
+
+def content_hash(obj: Any) -> str:
+    """Функция короткого хэша содержимого датафрейма или серии"""
+    import pandas as pd
+
+    try:
+        row_hashes = pd.util.hash_pandas_object(obj, index=True).to_numpy()
+    except (TypeError, ValueError):
+        return '?'
+    return hashlib.blake2b(row_hashes.tobytes(), digest_size=8).hexdigest()
+
+
+class LogSummary:
+    """Класс ленивого описания объекта: описание строится, только если запись действительно выводится"""
+
+    __slots__ = ('obj',)
+
+    def __init__(self, obj: Any) -> None:
+        self.obj = obj
+
+    def __str__(self) -> str:
+        return describe(self.obj)
+
+    __repr__ = __str__
+
+
+def log_summary(obj: Any) -> LogSummary:
+    """Функция обертки аргумента логгера в ленивое краткое описание: logger.debug('%s', log_summary(df))"""
+    return LogSummary(obj)
@@ -0,0 +1,194 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import ContextDecorator, contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+"""Границы корзин гистограммы длительностей в секундах"""
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+"""Имена метрик этапов"""
+STAGE_DURATION = 'stage_duration_seconds'
+STAGE_CALLS = 'stage_calls_total'
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Histogram:
+    """Класс гистограммы: счетчики по корзинам, сумма и количество наблюдений"""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Метод получения накопленных счетчиков по корзинам в формате Prometheus, последняя - +Inf"""
+        total, result = 0, []
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+
+class MetricsRegistry:
+    """Класс реестра метрик процесса: счетчики и гистограммы с метками"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: dict[str, dict[tuple, float]] = {}
+        self.histograms: dict[str, dict[tuple, Histogram]] = {}
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Метод увеличения счетчика"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Метод добавления наблюдения в гистограмму"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def reset(self) -> None:
+        """Метод очистки всех метрик"""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        """Метод получения снимка метрик в виде словаря для JSON"""
+        with self._lock:
+            return {
+                'counters': {name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                             for name, series in self.counters.items()},
+                'histograms': {name: [{'labels': dict(key), 'count': histogram.count, 'sum': round(histogram.sum, 6),
+                                       'buckets': dict(histogram.cumulative())}
+                                      for key, histogram in series.items()]
+                               for name, series in self.histograms.items()},
+            }
+
+    def to_prometheus(self) -> str:
+        """Метод получения метрик в текстовом формате Prometheus"""
+        def labels_text(key: tuple, extra: Optional[tuple] = None) -> str:
+            pairs = list(key) + ([extra] if extra else [])
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f'# TYPE {name} counter')
+                lines.extend(f'{name}{labels_text(key)} {value}' for key, value in sorted(series.items()))
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f'# TYPE {name} histogram')
+                for key, histogram in sorted(series.items()):
+                    lines.extend(f'{name}_bucket{labels_text(key, ("le", bound))} {count}'
+                                 for bound, count in histogram.cumulative())
+                    lines.append(f'{name}_sum{labels_text(key)} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{labels_text(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> None:
+        """Метод атомарной записи метрик в файл: .json - снимок в JSON, иначе текстовый формат Prometheus"""
+        if path.endswith('.json'):
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        else:
+            content = self.to_prometheus()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+
+registry = MetricsRegistry()
+
+_timings: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar('timings', default=None)
+_timings_lock = threading.Lock()
+
+
+class timed(ContextDecorator):
+    """Класс замера длительности этапа, используется как контекстный менеджер или декоратор.
+
+    Длительность попадает в гистограмму stage_duration_seconds, вызов - в счетчик stage_calls_total
+    со статусом ok или error, а внутри collect_timings - еще и в сводку этапов запроса.
+    """
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self._started = threading.local()
+
+    def __enter__(self) -> 'timed':
+        starts = getattr(self._started, 'values', None)
+        if starts is None:
+            starts = self._started.values = []
+        starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        elapsed = time.perf_counter() - self._started.values.pop()
+        registry.observe(STAGE_DURATION, elapsed, stage=self.stage)
+        registry.increment(STAGE_CALLS, stage=self.stage, status='error' if exc_type else 'ok')
+        timings = _timings.get()
+        if timings is not None:
+            with _timings_lock:
+                timings[self.stage] = timings.get(self.stage, 0.0) + elapsed
+        return False
+
+
+@contextmanager
+def collect_timings() -> Iterator[dict]:
+    """Функция сбора длительностей этапов текущего запроса в словарь {этап: секунды}.
+
+    Чтобы учесть этапы из пула потоков, задачи передаются через contextvars.copy_context().run.
+    """
+    timings: dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def profiled(path: Optional[str]) -> Iterator[None]:
+    """Функция запуска блока под cProfile с сохранением статистики в path; без path профилирование выключено"""
+    if not path:
+        yield
+        return
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(path)
+        logger.info('Профиль сохранен в %s', path)
@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+"""Настройки кэша котировок по умолчанию"""
+DEFAULT_TTL = 300.0
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'quotes.sqlite3')
+
+
+class QuoteCache:
+    """Класс кэша котировок с временем жизни записей.
+
+    Записи хранятся в памяти и в файле SQLite, поэтому кэш общий для разных процессов и перезапусков.
+    Устаревшие значения отдаются сразу, а обновляются в фоне (stale-while-revalidate).
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_PATH, ttl: float = DEFAULT_TTL) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._memory: dict[str, tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+        self._refreshing: set[str] = set()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='quote-refresh')
+        self.counters = {'hits': 0, 'stale': 0, 'misses': 0, 'refreshes': 0, 'errors': 0}
+        if self.path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._connect() as connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS quotes (key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL)')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with closing(sqlite3.connect(self.path, timeout=5)) as connection:
+            with connection:
+                yield connection
+
+    def _count(self, counter: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] += value
+
+    def _load(self, keys: list[str]) -> dict[str, tuple[Any, float]]:
+        """Метод чтения записей из памяти, отсутствующие и устаревшие записи перечитываются из SQLite"""
+        now = time.time()
+        with self._lock:
+            entries = {key: self._memory[key] for key in keys if key in self._memory}
+        expired = [key for key in keys if key not in entries or now - entries[key][1] >= self.ttl]
+        if expired and self.path is not None:
+            try:
+                with self._connect() as connection:
+                    placeholders = ','.join('?' * len(expired))
+                    rows = connection.execute(
+                        f'SELECT key, value, updated_at FROM quotes WHERE key IN ({placeholders})', expired).fetchall()
+            except sqlite3.Error as e:
+                logger.error('Ошибка чтения кэша котировок %s: %s', self.path, e)
+                rows = []
+            with self._lock:
+                for key, value, updated_at in rows:
+                    if key in entries and entries[key][1] >= updated_at:
+                        continue
+                    entry = (json.loads(value), updated_at)
+                    self._memory[key] = entry
+                    entries[key] = entry
+        return entries
+
+    def put_many(self, values: dict[str, Any]) -> None:
+        """Метод сохранения значений в памяти и в SQLite"""
+        now = time.time()
+        with self._lock:
+            for key, value in values.items():
+                self._memory[key] = (value, now)
+        if self.path is not None and values:
+            try:
+                with self._connect() as connection:
+                    connection.executemany('INSERT OR REPLACE INTO quotes (key, value, updated_at) VALUES (?, ?, ?)',
+                                           [(key, json.dumps(value), now) for key, value in values.items()])
+            except sqlite3.Error as e:
+                logger.error('Ошибка записи кэша котировок %s: %s', self.path, e)
+
+    def _refresh(self, keys: list[str], fetch_many: Callable[[list[str]], dict[str, Any]]) -> None:
+        try:
+            self.put_many(fetch_many(keys))
+            self._count('refreshes')
+        except Exception as e:
+            self._count('errors')
+            logger.error('Ошибка фонового обновления котировок %s: %s', keys, e)
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(keys)
+
+    def get_or_fetch_many(self, keys: Iterable[str], fetch_many: Callable[[list[str]], dict[str, Any]],
+                          refresh_many: Optional[Callable[[list[str]], dict[str, Any]]] = None) -> dict[str, Any]:
+        """Метод получения значений по ключам.
+
+        Свежие значения берутся из кэша, устаревшие отдаются сразу и обновляются в фоне через refresh_many
+        (по умолчанию fetch_many), отсутствующие запрашиваются через fetch_many синхронно.
+        Исключения fetch_many пробрасываются.
+        """
+        keys = list(keys)
+        entries = self._load(keys)
+        now = time.time()
+        result, stale, missing = {}, [], []
+        for key in keys:
+            if key not in entries:
+                missing.append(key)
+                continue
+            value, updated_at = entries[key]
+            result[key] = value
+            if now - updated_at >= self.ttl:
+                stale.append(key)
+
+        self._count('hits', len(result) - len(stale))
+        self._count('stale', len(stale))
+        self._count('misses', len(missing))
+
+        with self._lock:
+            stale = [key for key in stale if key not in self._refreshing]
+            self._refreshing.update(stale)
+        if stale:
+            self._executor.submit(self._refresh, stale, refresh_many or fetch_many)
+
+        if missing:
+            fetched = fetch_many(missing)
+            self.put_many(fetched)
+            result.update(fetched)
+        return result
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any], refresh: Optional[Callable[[], Any]] = None) -> Any:
+        """Метод получения одного значения по ключу, refresh используется для фонового обновления"""
+        refresh_many = (lambda keys: {key: refresh()}) if refresh is not None else None
+        return self.get_or_fetch_many([key], lambda keys: {key: fetch()}, refresh_many)[key]
+
+    def stats(self) -> dict[str, int]:
+        """Метод получения счетчиков попаданий и промахов"""
+        with self._lock:
+            return dict(self.counters)
+
+    def clear(self) -> None:
+        """Метод очистки кэша в памяти и в SQLite"""
+        with self._lock:
+            self._memory.clear()
+        if self.path is not None:
+            with self._connect() as connection:
+                connection.execute('DELETE FROM quotes')
@@ -1,47 +1,75 @@
+import numpy as np
 import pandas as pd
 import datetime
-import os
+import inspect
+import itertools
 import logging
-from typing import Optional, Callable
+from typing import Optional, Callable, Iterable, Sequence
 from functools import wraps
+from src.sqlite_store import SQLiteStore
+from src.store import PartitionIndex, TransactionSource, TransactionStore, get_transactions, normalize_transactions
+from src.logging_config import LOGS_DIRECTORY, log_summary
+from src.metrics import timed
+from src.writers import REPORT_FORMATS, report_path, report_writer
 
-"""Настройка логирования"""
-logs_directory = 'C:/Users/Александр Побережный/Desktop/питон/final_task_course_3/logs'
-log_file = os.path.join(logs_directory, 'reports.log')
-
-os.makedirs(logs_directory, exist_ok=True)
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=log_file,
-    filemode='w'
-)
+"""Каталог, в который сохраняются отчеты"""
+logs_directory = LOGS_DIRECTORY
 
 logger = logging.getLogger(__name__)
 
 
-def save_report(filename: Optional[str] = None) -> Callable:
-    """Функция декоратора для сохранения отчета в файле"""
+def _format_filename(template: str, func: Callable, args: tuple, kwargs: dict, sequence: int,
+                     unique: bool) -> str:
+    """Функция формирования имени файла отчета по шаблону.
+
+    В шаблоне доступны поля {func}, {timestamp}, {seq} и строковые или числовые аргументы функции,
+    например 'report_{category}_{date}'.
+    """
+    fields = {'func': func.__name__, 'timestamp': datetime.datetime.now().strftime('%Y%m%d%H%M%S%f'),
+              'seq': sequence}
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        fields.update({name: value for name, value in bound.arguments.items()
+                       if isinstance(value, (str, int, float)) or value is None})
+    except TypeError:
+        pass
+    output_filename = template.format(**fields) if '{' in template else template
+    if unique:
+        output_filename = f'{output_filename}_{fields["timestamp"]}_{sequence}'
+    return output_filename
+
+
+def save_report(filename: Optional[str] = None, fmt: str = 'csv', background: bool = False,
+                unique: bool = False) -> Callable:
+    """Функция декоратора для сохранения отчета в файле.
+
+    fmt задает формат (csv, csv.gz, parquet, ndjson), background включает запись в фоновом потоке,
+    unique добавляет к имени файла метку времени и номер вызова. Имя файла может быть шаблоном.
+    """
     default_filename = 'reports'
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f'Неизвестный формат отчета: {fmt}')
 
     def decorator(func: Callable) -> Callable:
+        calls = itertools.count(1)
+        stage = timed(f'reports.{func.__name__}')
+
         @wraps(func)
         def wrapper(*args, **kwargs) -> pd.DataFrame:
-            logger.debug(f'Вызвана функция {func.__name__} с аргументами {args} и {kwargs}')
+            logger.debug('Вызвана функция %s с аргументами %s и %s',
+                         func.__name__, log_summary(args), log_summary(kwargs))
             try:
-                result = func(*args, **kwargs)
-                output_filename = filename if filename else default_filename
-                output_file = os.path.join(logs_directory, output_filename)
-
-                if not os.path.exists(logs_directory):
-                    os.makedirs(logs_directory)
-
-                result.to_csv(output_file, index=False)
-                logger.info(f'Результаты сохранены в файл {output_file}')
+                with stage:
+                    result = func(*args, **kwargs)
+                output_filename = _format_filename(filename if filename else default_filename, func, args, kwargs,
+                                                   next(calls), unique)
+                output_file = report_path(logs_directory, output_filename, fmt)
+                with timed('reports.write'):
+                    report_writer.submit(result, output_file, fmt, background=background)
                 return result
             except Exception as e:
-                logger.error(f'Ошибка при выполнении функции {func.__name__}: {e}')
+                logger.error('Ошибка при выполнении функции %s: %s', func.__name__, e)
                 raise
 
         return wrapper
@@ -49,45 +77,121 @@ def save_report(filename: Optional[str] = None) -> Callable:
     return decorator
 
 
+@timed('reports.filter_by_category')
+def filter_by_category(transactions: TransactionSource, category: str, start_date: pd.Timestamp,
+                       end_date: pd.Timestamp) -> pd.DataFrame:
+    """Функция отбора транзакций категории за период.
+
+    Для хранилища используется индекс по категориям: просматриваются только строки категории,
+    а окно по датам внутри них выбирается бинарным поиском. Для базы SQLite - индекс (категория, дата).
+    """
+    if isinstance(transactions, TransactionStore):
+        return transactions.restore(transactions.category_index.rows(category, start_date, end_date).sort_index())
+    if isinstance(transactions, SQLiteStore):
+        return transactions.category_rows(category, start_date, end_date)
+
+    transactions = get_transactions(transactions)
+    return transactions[
+        (transactions['Дата операции'] >= start_date) &
+        (transactions['Дата операции'] <= end_date) &
+        (transactions['Категория'] == category)
+    ]
+
+
 @save_report()
-def spending_by_category(transactions: pd.DataFrame, category: str, date: Optional[str] = None) -> pd.DataFrame:
+def spending_by_category(transactions: TransactionSource, category: str, date: Optional[str] = None) -> pd.DataFrame:
     """Функция для вывода транзакций по категориям"""
-    logger.info(f'Обработка транзакций по категории {category} и дате {date}')
+    logger.info('Обработка транзакций по категории %s и дате %s', category, date)
     if date is None:
         date = datetime.datetime.today().strftime('%Y-%m-%d')
     end_date = pd.to_datetime(date, format='%Y-%m-%d')
     start_date = end_date - pd.DateOffset(months=3)
 
-    transactions['Дата операции'] = pd.to_datetime(transactions['Дата операции'], dayfirst=True)
+    filtered_transactions = filter_by_category(transactions, category, start_date, end_date)
 
-    filtered_transactions = transactions[
-        (transactions['Дата операции'] >= start_date) &
-        (transactions['Дата операции'] <= end_date) &
-        (transactions['Категория'] == category)
-    ]
-
-    logger.debug(f'Найдено {len(filtered_transactions)} транзакций по категории {category}')
+    logger.debug('Найдено %s транзакций по категории %s', len(filtered_transactions), category)
     return filtered_transactions
 
 
 @save_report('custom_report')
-def spending_by_category_custom(transactions: pd.DataFrame, category: str, date: Optional[str] = None) -> pd.DataFrame:
+def spending_by_category_custom(transactions: TransactionSource, category: str,
+                                date: Optional[str] = None) -> pd.DataFrame:
     """Функция для вывода транзакций по категориям"""
-    logger.info(f'Обработка транзакций по категории {category} и дате {date} с кастомным отчетом')
+    logger.info('Обработка транзакций по категории %s и дате %s с кастомным отчетом', category, date)
     if date is None:
         date = datetime.datetime.today().strftime('%Y-%m-%d')
     end_date = pd.to_datetime(date, format='%Y-%m-%d')
     start_date = end_date - pd.DateOffset(months=3)
 
-    transactions['Дата операции'] = pd.to_datetime(transactions['Дата операции'], dayfirst=True)
+    filtered_transactions = filter_by_category(transactions, category, start_date, end_date)
 
-    filtered_transactions = transactions[
-        (transactions['Дата операции'] >= start_date) &
-        (transactions['Дата операции'] <= end_date) &
-        (transactions['Категория'] == category)
-    ]
+    logger.debug('Найдено %s транзакций по категории %s', len(filtered_transactions), category)
+    return filtered_transactions
+
+
+@save_report('batch_report')
+def spending_by_categories(transactions: TransactionSource, categories: Sequence[str],
+                           dates: Sequence[str]) -> pd.DataFrame:
+    """Функция для расчета трат по набору категорий и дат за один проход.
+
+    Для каждой категории строятся накопленные суммы по отсортированным датам, после чего
+    сумма за любой трехмесячный период считается как разность двух значений.
+    Возвращает таблицу в длинном формате: категория, дата, начало периода, количество и сумма операций.
+    """
+    logger.info('Пакетная обработка %s категорий и %s дат', len(categories), len(dates))
+    end_dates = pd.to_datetime(pd.Series(dates), format='%Y-%m-%d')
+    start_dates = end_dates - pd.DateOffset(months=3)
+    starts = start_dates.to_numpy()
+    ends = end_dates.to_numpy()
+
+    if isinstance(transactions, TransactionStore):
+        index = transactions.category_index
+        scale = transactions.amount_scale
+    else:
+        index = PartitionIndex(get_transactions(transactions), 'Категория')
+        scale = 1
+    amounts = np.nan_to_num(index.df['Сумма операции'].to_numpy(dtype='float64', na_value=np.nan))
+
+    parts = []
+    for category in categories:
+        left, right = index.bounds(category)
+        category_dates = index.dates[left:right]
+        cumulative = np.concatenate(([0.0], np.cumsum(amounts[left:right])))
+        lower = np.searchsorted(category_dates, starts, side='left')
+        upper = np.searchsorted(category_dates, ends, side='right')
+        parts.append(pd.DataFrame({
+            'Категория': category,
+            'Дата': end_dates.to_numpy(),
+            'Начало периода': starts,
+            'Количество операций': upper - lower,
+            'Сумма операций': np.round((cumulative[upper] - cumulative[lower]) / scale, 2)
+        }))
+
+    columns = ['Категория', 'Дата', 'Начало периода', 'Количество операций', 'Сумма операций']
+    result = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+    logger.debug('Сформировано %s строк пакетного отчета', len(result))
+    return result
+
+
+@save_report()
+def spending_by_category_from_batches(batches: Iterable[pd.DataFrame], category: str,
+                                      date: Optional[str] = None) -> pd.DataFrame:
+    """Функция для вывода транзакций по категориям при потоковом чтении пачками"""
+    logger.info('Потоковая обработка транзакций по категории %s и дате %s', category, date)
+    if date is None:
+        date = datetime.datetime.today().strftime('%Y-%m-%d')
+    end_date = pd.to_datetime(date, format='%Y-%m-%d')
+    start_date = end_date - pd.DateOffset(months=3)
+
+    parts = []
+    for batch in batches:
+        batch = normalize_transactions(batch)
+        operation_dates = batch['Дата операции']
+        parts.append(batch[(operation_dates >= start_date) & (operation_dates <= end_date) &
+                           (batch['Категория'] == category)])
 
-    logger.debug(f'Найдено {len(filtered_transactions)} транзакций по категории {category}')
+    filtered_transactions = pd.concat(parts) if parts else pd.DataFrame()
+    logger.debug('Найдено %s транзакций по категории %s', len(filtered_transactions), category)
     return filtered_transactions
 
 
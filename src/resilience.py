@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+"""Таймаут запроса по умолчанию, если общий бюджет времени не задан"""
+REQUEST_TIMEOUT = 10.0
+
+"""Настройки автоматического выключателя"""
+FAILURE_THRESHOLD = 3
+COOLDOWN = 30.0
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Исключение при исчерпании бюджета времени до отправки запроса"""
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Исключение при обращении к провайдеру, который временно отключен выключателем"""
+
+
+class Deadline:
+    """Класс общего бюджета времени, из которого выводятся таймауты отдельных запросов"""
+
+    def __init__(self, budget: float) -> None:
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        """Метод получения оставшегося времени в секундах"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float = REQUEST_TIMEOUT) -> float:
+        """Метод получения таймаута запроса: оставшееся время, но не больше cap"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded('Бюджет времени исчерпан')
+        return min(remaining, cap)
+
+
+class CircuitBreaker:
+    """Класс автоматического выключателя для одного провайдера.
+
+    После failure_threshold ошибок подряд провайдер пропускается на cooldown секунд,
+    затем пропускается один пробный запрос: успех замыкает выключатель, ошибка снова размыкает.
+    """
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                return 'half-open'
+            return 'open'
+
+    def allow(self) -> bool:
+        """Метод проверки, можно ли отправить запрос"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_progress = False
+
+    def release(self) -> None:
+        """Метод снятия пробного запроса, который завершился без ответа провайдера"""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_progress or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_progress = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    """Функция получения выключателя для хоста"""
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+
+def reset_breakers() -> None:
+    """Функция сброса всех выключателей"""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def guarded_get(session: requests.Session, url: str, deadline: Optional[Deadline] = None,
+                **kwargs) -> requests.Response:
+    """Функция GET-запроса с таймаутом из бюджета времени и выключателем по хосту.
+
+    Таймаут вычисляется до проверки выключателя: исчерпанный бюджет не должен занимать пробный запрос.
+    """
+    host = urlparse(url).netloc
+    breaker = get_breaker(host)
+    timeout = deadline.timeout() if deadline is not None else REQUEST_TIMEOUT
+    if not breaker.allow():
+        raise CircuitOpenError(f'Провайдер {host} временно отключен')
+
+    try:
+        response = session.get(url, timeout=timeout, **kwargs)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        breaker.record_failure()
+        if breaker.state != 'closed':
+            logger.warning('Провайдер %s отключен на %s с после ошибки: %s', host, breaker.cooldown, e)
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.record_success()
+    return response
@@ -0,0 +1,159 @@
+import datetime
+import functools
+import json
+import logging
+import math
+import os
+from typing import Any, Optional, TextIO
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+"""Отступ JSON в читаемом режиме, как у прежнего json.dumps(..., indent=4)"""
+INDENT = 4
+
+"""Строк датафрейма, которые переводятся в значения JSON и пишутся в поток за один раз в режиме NDJSON"""
+NDJSON_CHUNK_SIZE = 10000
+
+"""Переменная окружения для выбора бэкенда: json - только стандартный модуль, иначе orjson при наличии"""
+BACKEND_ENV = 'JSON_BACKEND'
+
+
+@functools.lru_cache(maxsize=1)
+def fast_backend():
+    """Функция получения ускоренного бэкенда orjson, None если он не установлен или отключен через JSON_BACKEND"""
+    if os.environ.get(BACKEND_ENV, '').lower() == 'json':
+        return None
+    try:
+        import orjson
+    except ImportError:
+        return None
+    logger.debug('Для сериализации JSON используется orjson %s', orjson.__version__)
+    return orjson
+
+
+def _datetime_strings(values: np.ndarray) -> np.ndarray:
+    """Функция перевода массива datetime64 в строки как у Timestamp.isoformat, NaT - None.
+
+    Даты переводятся с точностью до секунды, доли секунды дописываются только тем датам, у которых они есть.
+    """
+    values = values.astype('datetime64[ns]')
+    missing = np.isnat(values)
+    strings = np.datetime_as_string(values, unit='s').astype(object)
+    ticks = values.view('int64')
+    nanoseconds = (ticks % 1000 != 0) & ~missing
+    microseconds = (ticks % 1_000_000_000 != 0) & ~missing & ~nanoseconds
+    for mask, unit in ((microseconds, 'us'), (nanoseconds, 'ns')):
+        if mask.any():
+            strings[mask] = np.datetime_as_string(values[mask], unit=unit)
+    strings[missing] = None
+    return strings
+
+
+def column_values(series: pd.Series) -> list:
+    """Функция перевода колонки в значения JSON целиком по массиву колонки.
+
+    Даты становятся строками ISO 8601, числа numpy - числами Python, NaN, NaT и None - None.
+    """
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        return [None if pd.isna(value) else value.isoformat() for value in series]
+    if pd.api.types.is_datetime64_dtype(series.dtype):
+        return _datetime_strings(series.to_numpy()).tolist()
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_integer_dtype(series.dtype):
+        if not series.hasnans:
+            return series.to_numpy().tolist()
+    values = series.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    if missing.any():
+        values[missing] = None
+    return values.tolist()
+
+
+def frame_records(df: pd.DataFrame) -> list[dict]:
+    """Функция получения записей датафрейма со значениями JSON: колонки переводятся целиком, затем собираются строки"""
+    names = [str(name) for name in df.columns]
+    columns = [column_values(df.iloc[:, position]) for position in range(df.shape[1])]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _default(value: Any) -> Any:
+    """Функция перевода значений, которые модуль json не поддерживает, за один проход кодировщика"""
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+        return None if isinstance(value, float) and not math.isfinite(value) else value
+    if isinstance(value, pd.DataFrame):
+        return frame_records(value)
+    if isinstance(value, (pd.Series, pd.Index, np.ndarray)):
+        return column_values(pd.Series(value))
+    return str(value)
+
+
+_PRETTY_ENCODER = json.JSONEncoder(ensure_ascii=False, allow_nan=False, indent=INDENT, default=_default)
+_COMPACT_ENCODER = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(',', ':'), default=_default)
+
+
+def _without_nan(obj: Any) -> Any:
+    """Функция замены NaN и бесконечностей на None для редкого случая, когда они встретились вне датафреймов"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _without_nan(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_without_nan(value) for value in obj]
+    return obj
+
+
+def _encode(encoder: json.JSONEncoder, obj: Any) -> str:
+    try:
+        return encoder.encode(obj)
+    except ValueError:
+        """Кодировщики не допускают NaN, поэтому такие значения заменяются на null повторным проходом"""
+        return encoder.encode(_without_nan(obj))
+
+
+def dumps(obj: Any, compact: bool = False) -> str:
+    """Функция сериализации в JSON за один проход, без предварительного копирования структуры.
+
+    Даты, значения numpy, NaN и NaT переводятся кодировщиком по месту, датафреймы - по колонкам.
+    В компактном режиме используется orjson, если он установлен, иначе - json без пробелов.
+    Читаемый режим с отступом INDENT всегда формируется стандартным модулем json.
+    """
+    if compact:
+        backend = fast_backend()
+        if backend is not None:
+            return backend.dumps(obj, default=_default,
+                                 option=backend.OPT_SERIALIZE_NUMPY | backend.OPT_NON_STR_KEYS).decode('utf-8')
+        return _encode(_COMPACT_ENCODER, obj)
+    return _encode(_PRETTY_ENCODER, obj)
+
+
+def ndjson_lines(df: pd.DataFrame) -> str:
+    """Функция получения строк NDJSON для датафрейма, по одной записи в строке"""
+    records = frame_records(df)
+    backend = fast_backend()
+    if backend is not None:
+        lines = [backend.dumps(record, default=_default, option=backend.OPT_SERIALIZE_NUMPY).decode('utf-8')
+                 for record in records]
+    else:
+        encode = _COMPACT_ENCODER.encode
+        try:
+            lines = [encode(record) for record in records]
+        except ValueError:
+            lines = [encode(_without_nan(record)) for record in records]
+    return ''.join(f'{line}\n' for line in lines)
+
+
+def write_ndjson(df: pd.DataFrame, stream: TextIO, chunk_size: Optional[int] = NDJSON_CHUNK_SIZE) -> int:
+    """Функция записи датафрейма в поток в формате NDJSON порциями по chunk_size строк, возвращает число записей"""
+    chunk_size = chunk_size or max(len(df), 1)
+    for start in range(0, len(df), chunk_size):
+        stream.write(ndjson_lines(df.iloc[start:start + chunk_size]))
+    return len(df)
@@ -0,0 +1,385 @@
+import asyncio
+import datetime
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from dateutil.parser import parse
+
+from src.loader import load_operations
+from src.metrics import registry, timed
+from src.store import TransactionStore
+
+logger = logging.getLogger(__name__)
+
+"""Параметры сервера по умолчанию"""
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_WORKERS = 4
+
+"""Ограничения на запрос: время ожидания строки запроса и заголовков, число заголовков"""
+REQUEST_TIMEOUT = 30.0
+MAX_HEADERS = 100
+
+JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+NDJSON_CONTENT_TYPE = 'application/x-ndjson; charset=utf-8'
+TEXT_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestError(Exception):
+    """Класс ошибки запроса с HTTP-статусом ответа"""
+
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def file_signature(path: str) -> Optional[tuple[int, int]]:
+    """Функция получения признаков изменения файла: время изменения и размер, None если файла нет"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_settings(path: Optional[str]) -> dict:
+    """Функция чтения пользовательских настроек; в отличие от load_user_settings ошибки не скрываются"""
+    if path is None:
+        return {}
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def warm_up(store: TransactionStore, settings: dict) -> None:
+    """Функция построения индексов хранилища, которые нужны главной странице и отчетам"""
+    store.date_index
+    store.category_index
+    store.card_daily_totals
+    store.top_k_index(5, settings.get('top_transactions_rank', 'Сумма операции'))
+
+
+class Snapshot:
+    """Класс неизменяемого снимка данных сервера: хранилище с индексами, настройки и кэш ответов.
+
+    Запрос берет снимок один раз и работает только с ним, поэтому перезагрузка не влияет на начатые запросы.
+    """
+
+    def __init__(self, store: TransactionStore, settings: dict, signatures: dict, version: int) -> None:
+        self.store = store
+        self.settings = settings
+        self.signatures = signatures
+        self.version = version
+        self.loaded_at = datetime.datetime.now().isoformat(timespec='seconds')
+        self._cache: dict[str, str] = {}
+        self._cache_lock = threading.Lock()
+
+    def cached(self, key: str, build: Callable[[], str]) -> str:
+        """Метод получения ответа, который зависит только от данных снимка, из кэша снимка"""
+        with self._cache_lock:
+            if key in self._cache:
+                return self._cache[key]
+        value = build()
+        with self._cache_lock:
+            return self._cache.setdefault(key, value)
+
+
+class DashboardState:
+    """Класс состояния сервера: текущий снимок данных и его перезагрузка при изменении файлов.
+
+    Новый снимок полностью строится в фоне и подменяет текущий одним присваиванием.
+    Если файл не удалось прочитать или он изменился во время чтения, остается прежний снимок.
+    """
+
+    def __init__(self, operations_file: str, settings_file: Optional[str] = None, compact: bool = False) -> None:
+        self.operations_file = operations_file
+        self.settings_file = settings_file
+        self.compact = compact
+        self.reloads = 0
+        self._reload_lock = threading.Lock()
+        self.snapshot: Optional[Snapshot] = None
+
+    def _signatures(self) -> dict:
+        return {'operations': file_signature(self.operations_file),
+                'settings': file_signature(self.settings_file) if self.settings_file else None}
+
+    def load(self) -> Snapshot:
+        """Метод первой загрузки данных, ошибки чтения файла операций пробрасываются"""
+        with self._reload_lock:
+            self.snapshot = self._build(self._signatures(), None)
+        return self.snapshot
+
+    def _build(self, signatures: dict, previous: Optional[Snapshot]) -> Snapshot:
+        """Метод построения снимка; неизменившиеся хранилище или настройки берутся из предыдущего снимка"""
+        if previous is not None and previous.signatures['operations'] == signatures['operations']:
+            store = previous.store
+        else:
+            with timed('server.load_operations'):
+                store = TransactionStore(load_operations(self.operations_file), source=self.operations_file,
+                                         compact=self.compact)
+        if previous is not None and previous.signatures['settings'] == signatures['settings']:
+            settings = previous.settings
+        elif signatures['settings'] is None:
+            if self.settings_file:
+                logger.warning('Файл настроек %s не найден, используются пустые настройки', self.settings_file)
+            settings = {}
+        else:
+            settings = read_settings(self.settings_file)
+        warm_up(store, settings)
+        if self._signatures() != signatures:
+            raise RuntimeError('файлы изменились во время чтения')
+        version = previous.version + 1 if previous is not None else 1
+        logger.info('Загружен снимок %s: %s записей из %s', version, len(store), self.operations_file)
+        return Snapshot(store, settings, signatures, version)
+
+    def reload_if_changed(self) -> bool:
+        """Метод перезагрузки данных при изменении файлов, возвращает True, если снимок заменен"""
+        with self._reload_lock:
+            signatures = self._signatures()
+            if self.snapshot is not None and signatures == self.snapshot.signatures:
+                return False
+            if signatures['operations'] is None:
+                logger.warning('Файл операций %s недоступен, используется прежний снимок', self.operations_file)
+                return False
+            try:
+                self.snapshot = self._build(signatures, self.snapshot)
+            except Exception as e:
+                logger.error('Не удалось перезагрузить данные, используется прежний снимок: %s', e)
+                return False
+            self.reloads += 1
+            return True
+
+
+def _query_value(query: dict, name: str, required: bool = False) -> Optional[str]:
+    values = query.get(name)
+    if not values:
+        if required:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f'не указан параметр {name}')
+        return None
+    return values[0]
+
+
+def _query_flag(query: dict, name: str) -> bool:
+    return (_query_value(query, name) or '').lower() in ('1', 'true', 'yes')
+
+
+def dashboard_endpoint(snapshot: Snapshot, query: dict) -> tuple[str, str]:
+    """Функция ответа главной страницы: /dashboard?datetime=2021-12-31 12:00:00[&budget=1.5][&timings=1]
+
+    Ответ отдается компактным JSON, с параметром pretty=1 - с отступами.
+    """
+    from src import views
+
+    datetime_str = _query_value(query, 'datetime', required=True)
+    budget = _query_value(query, 'budget')
+    try:
+        budget = float(budget) if budget is not None else None
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f'некорректный budget: {budget}')
+    try:
+        parse(datetime_str)
+    except (ValueError, OverflowError):
+        raise RequestError(HTTPStatus.BAD_REQUEST, f'некорректная дата: {datetime_str}')
+    body = views.main(datetime_str, snapshot.store, budget=budget, timings=_query_flag(query, 'timings'),
+                      settings=snapshot.settings, compact=not _query_flag(query, 'pretty'))
+    return JSON_CONTENT_TYPE, body
+
+
+def reports_endpoint(snapshot: Snapshot, query: dict) -> tuple[str, str]:
+    """Функция ответа отчета по категории: /reports?category=Супермаркеты[&date=2021-12-31]"""
+    from src.reports import spending_by_category
+
+    category = _query_value(query, 'category', required=True)
+    date = _query_value(query, 'date')
+    try:
+        report = spending_by_category.__wrapped__(snapshot.store, category, date)
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f'некорректная дата: {date}')
+    return JSON_CONTENT_TYPE, report.to_json(orient='records', force_ascii=False, date_format='iso')
+
+
+def services_endpoint(snapshot: Snapshot, query: dict) -> tuple[str, str]:
+    """Функция ответа сервиса: транзакции с мобильными номерами в формате NDJSON, один раз на снимок"""
+    from src.services import extract_transactions_with_mobile_numbers
+
+    def build() -> str:
+        stream = io.StringIO()
+        if extract_transactions_with_mobile_numbers(snapshot.store, output=stream) is None:
+            raise RuntimeError('не удалось найти транзакции с мобильными номерами')
+        return stream.getvalue()
+
+    return NDJSON_CONTENT_TYPE, snapshot.cached('services', build)
+
+
+def health_endpoint(snapshot: Snapshot, query: dict) -> tuple[str, str]:
+    """Функция ответа о состоянии сервера: версия и время загрузки снимка, число записей"""
+    return JSON_CONTENT_TYPE, json.dumps({'status': 'ok', 'version': snapshot.version, 'loaded_at': snapshot.loaded_at,
+                                          'rows': len(snapshot.store), 'source': snapshot.store.source},
+                                         ensure_ascii=False)
+
+
+def metrics_endpoint(snapshot: Snapshot, query: dict) -> tuple[str, str]:
+    """Функция ответа с метриками этапов в текстовом формате Prometheus"""
+    return TEXT_CONTENT_TYPE, registry.to_prometheus()
+
+
+"""Обработчики запросов по путям"""
+ROUTES = {
+    '/dashboard': dashboard_endpoint,
+    '/reports': reports_endpoint,
+    '/services': services_endpoint,
+    '/health': health_endpoint,
+    '/metrics': metrics_endpoint,
+}
+
+
+def encode_response(status: HTTPStatus, content_type: str, body: str, keep_alive: bool) -> bytes:
+    """Функция формирования HTTP-ответа"""
+    payload = body.encode('utf-8')
+    head = (f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(payload)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    return head.encode('latin-1') + payload
+
+
+def error_body(message: str) -> str:
+    return json.dumps({'error': message}, ensure_ascii=False)
+
+
+class DashboardServer:
+    """Класс асинхронного HTTP-сервера главной страницы, отчетов и сервиса.
+
+    Данные и индексы держатся в памяти между запросами, работа с pandas выполняется в пуле потоков,
+    поэтому цикл событий не блокируется и запросы обрабатываются одновременно.
+    Файлы операций и настроек проверяются каждые poll_interval секунд и перезагружаются при изменении.
+    """
+
+    def __init__(self, state: DashboardState, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, workers: int = DEFAULT_WORKERS) -> None:
+        self.state = state
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dashboard')
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Метод загрузки данных и запуска сервера и наблюдения за файлами"""
+        loop = asyncio.get_running_loop()
+        if self.state.snapshot is None:
+            await loop.run_in_executor(self.executor, self.state.load)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.poll_interval:
+            self._watcher = asyncio.create_task(self._watch())
+        logger.info('Сервер запущен на http://%s:%s', self.host, self.port)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        """Метод остановки сервера, наблюдения за файлами и пула потоков"""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.executor.shutdown(wait=False)
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await loop.run_in_executor(self.executor, self.state.reload_if_changed)
+            except Exception as e:
+                logger.error('Ошибка проверки файлов: %s', e)
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[tuple[str, str, str, dict]]:
+        """Метод чтения строки запроса и заголовков, None - соединение закрыто клиентом"""
+        line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, 'некорректная строка запроса')
+        headers = {}
+        for _ in range(MAX_HEADERS):
+            header = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            if header in (b'\r\n', b'\n', b''):
+                return method, target, version, headers
+            name, _, value = header.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, 'слишком много заголовков')
+
+    async def _respond(self, method: str, target: str) -> tuple[HTTPStatus, str, str]:
+        url = urlsplit(target)
+        endpoint = ROUTES.get(url.path.rstrip('/') or '/')
+        if endpoint is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, f'неизвестный путь {url.path}')
+        if method != 'GET':
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f'метод {method} не поддерживается')
+        snapshot = self.state.snapshot
+        query = parse_qs(url.query)
+        with timed(f'server.{endpoint.__name__}'):
+            content_type, body = await asyncio.get_running_loop().run_in_executor(
+                self.executor, endpoint, snapshot, query)
+        return HTTPStatus.OK, content_type, body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Метод обработки соединения: запросы читаются, пока клиент держит соединение открытым"""
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers = request
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                    status, content_type, body = await self._respond(method, target)
+                except RequestError as e:
+                    status, content_type, body = e.status, JSON_CONTENT_TYPE, error_body(str(e))
+                except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+                    break
+                except Exception as e:
+                    logger.error('Ошибка обработки запроса: %s', e)
+                    status, content_type = HTTPStatus.INTERNAL_SERVER_ERROR, JSON_CONTENT_TYPE
+                    body = error_body(str(e))
+                registry.increment('server_requests_total', status=status.value)
+                writer.write(encode_response(status, content_type, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def run_server(operations_file: str, settings_file: Optional[str] = None, host: str = DEFAULT_HOST,
+               port: int = DEFAULT_PORT, poll_interval: float = DEFAULT_POLL_INTERVAL, workers: int = DEFAULT_WORKERS,
+               compact: bool = False) -> None:
+    """Функция запуска сервера до прерывания (Ctrl+C)"""
+    server = DashboardServer(DashboardState(operations_file, settings_file, compact), host, port, poll_interval,
+                             workers)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info('Сервер остановлен')
@@ -2,70 +2,105 @@ import os
 import logging
 import pandas as pd
 import re
-import json
+from src.logging_config import log_summary
+from src.metrics import timed
+from src.serialization import write_ndjson
+from src.store import get_transactions
 
-"""Настройка логирования"""
-logs_directory = 'C:/Users/Александр Побережный/Desktop/питон/final_task_course_3/logs'
-log_file = os.path.join(logs_directory, 'services.log')
+logger = logging.getLogger(__name__)
 
-os.makedirs(logs_directory, exist_ok=True)
 
-"""Настройка логгера"""
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=log_file,
-    filemode='w'
-)
+"""Выражение для поиска мобильных номеров"""
+phone_pattern = re.compile(r'\+7\s?\(?\d{3}\)?\s?\d{3}-?\d{2}-?\d{2}')
 
-logger = logging.getLogger(__name__)
 
+def contains_mobile_number(description):
+    """Функция для проверки описания на наличие мобильного номера"""
+    if pd.isnull(description):
+        return False
+    return bool(phone_pattern.search(description))
 
-def extract_transactions_with_mobile_numbers(file_path):
-    """Чтение данных из Excel файла"""
-    try:
-        df = pd.read_excel(file_path)
-        logger.info(f"Файл {file_path} успешно прочитан.")
-    except Exception as e:
-        logger.error(f"Ошибка при чтении файла {file_path}: {e}")
-        return
 
-    """Выражение для поиска мобильных номеров"""
-    phone_pattern = re.compile(r'\+7\s?\(?\d{3}\)?\s?\d{3}-?\d{2}-?\d{2}')
-    logger.debug("Регулярное выражение для мобильных номеров создано.")
+def filter_transactions_with_mobile_numbers(df, vectorized=True):
+    """Функция фильтрации строк, где в описании есть мобильные номера.
 
-    def contains_mobile_number(description):
-        """Функция для проверки описания на наличие мобильного номера"""
-        if pd.isnull(description):
-            return False
-        return bool(phone_pattern.search(description))
+    В векторном режиме используется Series.str.contains, без вызова Python-функции на каждую строку.
+    """
+    if vectorized:
+        mask = df['Описание'].astype('string').str.contains(phone_pattern, na=False).astype(bool)
+    else:
+        mask = df['Описание'].apply(contains_mobile_number)
+    return df[mask]
 
-    """Фильтрация строк, где в описании есть мобильные номера"""
+
+def _open_output(output):
+    """Функция получения потока вывода: путь к файлу открывается, поток используется как есть"""
+    if isinstance(output, (str, os.PathLike)):
+        return open(output, 'w', encoding='utf-8'), True
+    return output, False
+
+
+def extract_transactions_with_mobile_numbers(source, output=None):
+    """Функция поиска транзакций с мобильными номерами, возвращает найденные транзакции.
+
+    Если передан output (путь к файлу или поток, например sys.stdout), транзакции записываются в формате NDJSON.
+    """
     try:
-        df_with_numbers = df[df['Описание'].apply(contains_mobile_number)]
-        logger.info("Успешно отфильтрованы строки с мобильными номерами.")
+        with timed('services.load_transactions'):
+            df = get_transactions(source)
+        logger.info("Транзакции из %s успешно получены.", log_summary(source))
     except Exception as e:
-        logger.error(f"Ошибка при фильтрации строк: {e}")
+        logger.error("Ошибка при чтении транзакций из %s: %s", log_summary(source), e)
         return
 
-    """Преобразование отфильтрованных данных в JSON"""
+    """Фильтрация строк, где в описании есть мобильные номера"""
     try:
-        transactions_list = df_with_numbers.to_dict(orient='records')
-        logger.info("Успешно преобразовано в список транзакций в формате JSON.")
+        with timed('services.filter'):
+            df_with_numbers = filter_transactions_with_mobile_numbers(df)
+        logger.info("Успешно отфильтрованы строки с мобильными номерами.")
     except Exception as e:
-        logger.error(f"Ошибка при преобразовании данных в JSON: {e}")
+        logger.error("Ошибка при фильтрации строк: %s", e)
         return
 
-    """Вывод каждого объекта JSON в столбец"""
+    """Запись транзакций в формате NDJSON"""
+    if output is not None:
+        try:
+            stream, should_close = _open_output(output)
+            try:
+                with timed('services.write_ndjson'):
+                    write_ndjson(df_with_numbers, stream)
+            finally:
+                if should_close:
+                    stream.close()
+            logger.info("Успешно выведены транзакции содержащие мобильные номера.")
+        except Exception as e:
+            logger.error("Ошибка при выводе транзакций: %s", e)
+
+    return df_with_numbers
+
+
+def extract_transactions_with_mobile_numbers_from_batches(batches, output=None):
+    """Потоковая обработка пачек транзакций, память ограничена размером одной пачки.
+
+    Найденные транзакции записываются в output в формате NDJSON по мере обработки пачек,
+    функция возвращает количество найденных транзакций.
+    """
+    found = 0
+    stream, should_close = _open_output(output) if output is not None else (None, False)
     try:
-        for transaction in transactions_list:
-            transaction_json = json.dumps(transaction, ensure_ascii=False, indent=2)
-            print(transaction_json)
-            print()
-        logger.info("Успешно выведены транзакции содержащие мобильные номера.")
+        for batch in batches:
+            df_with_numbers = filter_transactions_with_mobile_numbers(batch)
+            if stream is not None:
+                write_ndjson(df_with_numbers, stream)
+            found += len(df_with_numbers)
+        logger.info("Потоково найдено транзакций с мобильными номерами: %s", found)
     except Exception as e:
-        logger.error(f"Ошибка при выводе транзакций: {e}")
+        logger.error("Ошибка при потоковой обработке транзакций: %s", e)
         return
+    finally:
+        if should_close:
+            stream.close()
+    return found
 
 
 """Пример использования функции"""
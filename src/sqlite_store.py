@@ -0,0 +1,312 @@
+import itertools
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.compact import KOPECK_COLUMNS, KOPECKS_PER_RUBLE, to_kopecks
+from src.ingest import IngestReport, ingest_transactions
+from src.loader import load_operations
+from src.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+"""Колонки таблицы transactions: колонка выгрузки, имя и тип в SQLite; суммы KOPECK_COLUMNS хранятся в копейках"""
+SCHEMA = [
+    ('Дата операции', 'operation_date', 'TEXT NOT NULL'),
+    ('Дата платежа', 'payment_date', 'TEXT'),
+    ('Номер карты', 'card', 'TEXT'),
+    ('Статус', 'status', 'TEXT'),
+    ('Сумма операции', 'amount', 'INTEGER'),
+    ('Валюта операции', 'currency', 'TEXT'),
+    ('Сумма платежа', 'payment_amount', 'INTEGER'),
+    ('Валюта платежа', 'payment_currency', 'TEXT'),
+    ('Кэшбэк', 'cashback', 'REAL'),
+    ('Категория', 'category', 'TEXT'),
+    ('MCC', 'mcc', 'REAL'),
+    ('Описание', 'description', 'TEXT'),
+    ('Бонусы (включая кэшбэк)', 'bonuses', 'REAL'),
+    ('Округление на инвесткопилку', 'rounding', 'REAL'),
+    ('Сумма операции с округлением', 'rounded_amount', 'INTEGER'),
+]
+COLUMN_NAMES = {name: column for column, name, _ in SCHEMA}
+
+"""Индексы для отбора по периоду, по категории за период и по карте за период"""
+INDEXES = {
+    'idx_transactions_date': 'operation_date',
+    'idx_transactions_category_date': 'category, operation_date',
+    'idx_transactions_card_date': 'card, operation_date',
+}
+
+"""Выражения ранжирования топа в SQL, соответствуют TOP_RANKINGS из src.store"""
+RANK_EXPRESSIONS = {
+    'Сумма операции': ('amount', 'amount IS NOT NULL'),
+    'spend': ('-amount', 'amount < 0'),
+    'Сумма платежа': ('payment_amount', 'payment_amount IS NOT NULL'),
+    'Сумма операции с округлением': ('rounded_amount', 'rounded_amount IS NOT NULL'),
+}
+
+"""Строк в одном вызове executemany при загрузке и в одной порции при чтении курсора"""
+BATCH_SIZE = 50000
+FETCH_SIZE = 10000
+
+"""Таблица, в которую загружаются транзакции перед заменой таблицы transactions"""
+STAGING_TABLE = 'transactions_staging'
+
+
+"""Даты хранятся строками ISO 8601 с точностью до секунды, поэтому сравниваются как строки"""
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def to_sql_date(value) -> str:
+    """Функция перевода даты запроса в строку ISO 8601 для сравнения с датами в базе"""
+    return pd.Timestamp(value).isoformat()
+
+
+def _date_strings(dates: pd.Series) -> list:
+    strings = np.datetime_as_string(dates.to_numpy(dtype='datetime64[s]'), unit='s').astype(object)
+    strings[dates.isna().to_numpy()] = None
+    return strings.tolist()
+
+
+def _column_values(df: pd.DataFrame, column: str) -> list:
+    """Функция получения значений колонки для вставки: даты - строками, суммы - в копейках, пропуски - None"""
+    if column not in df.columns:
+        return [None] * len(df)
+    values = df[column]
+    if column in ('Дата операции', 'Дата платежа'):
+        return _date_strings(values)
+    if column in KOPECK_COLUMNS:
+        values = to_kopecks(values)
+    values = values.astype(object)
+    return values.where(values.notna(), None).tolist()
+
+
+def read_frame(cursor: sqlite3.Cursor, fetch_size: int = FETCH_SIZE) -> pd.DataFrame:
+    """Функция чтения результата запроса из курсора порциями по fetch_size строк в датафрейм.
+
+    Первая колонка результата - id транзакции, она становится индексом. Колонки переименовываются
+    в колонки выгрузки, даты разбираются, суммы переводятся из копеек в рубли.
+    """
+    names = [description[0] for description in cursor.description]
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        chunks.append(pd.DataFrame.from_records(rows, columns=names))
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=names)
+    df = df.set_index(names[0]).rename_axis(None)
+    for name in df.columns:
+        if name in ('operation_date', 'payment_date'):
+            df[name] = pd.to_datetime(df[name], format=DATE_FORMAT).astype('datetime64[ns]')
+        elif COLUMN_NAMES.get(name) in KOPECK_COLUMNS:
+            df[name] = df[name].astype('float64') / KOPECKS_PER_RUBLE
+    return df.rename(columns=COLUMN_NAMES)
+
+
+class SQLiteStore:
+    """Класс хранилища транзакций в локальной базе SQLite.
+
+    Отбор по периоду, категории и карте выполняется индексированными запросами, результаты читаются
+    из курсора порциями. Хранилище держит только путь к базе и открывает соединение на каждый запрос,
+    поэтому одну базу могут читать несколько процессов без копии данных в памяти каждого.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.source = path
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with closing(sqlite3.connect(self.path, timeout=30)) as connection:
+            with connection:
+                yield connection
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Метод открытия соединения для записи: блокировка BEGIN IMMEDIATE и одна транзакция на все изменения.
+
+        Читатели в режиме WAL до фиксации видят прежнее состояние базы, другие писатели ждут блокировку.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with closing(sqlite3.connect(self.path, timeout=30, isolation_level=None)) as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    @staticmethod
+    def _create_table(connection: sqlite3.Connection, table: str) -> None:
+        columns = ', '.join(f'{name} {sql_type}' for _, name, sql_type in SCHEMA)
+        connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, {columns})')
+
+    @staticmethod
+    def _create_indexes(connection: sqlite3.Connection) -> None:
+        for index_name, index_columns in INDEXES.items():
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON transactions ({index_columns})')
+
+    def create(self, replace: bool = False, indexes: bool = True) -> None:
+        """Метод создания таблиц и индексов; при replace=True существующие транзакции удаляются"""
+        with self._write() as connection:
+            if replace:
+                connection.execute('DROP TABLE IF EXISTS transactions')
+            self._create_table(connection, 'transactions')
+            if replace:
+                connection.execute('DELETE FROM meta')
+            if indexes:
+                self._create_indexes(connection)
+
+    def create_indexes(self) -> None:
+        """Метод создания индексов по дате, категории и карте"""
+        with self._write() as connection:
+            self._create_indexes(connection)
+
+    def _insert(self, connection: sqlite3.Connection, df: pd.DataFrame, replace: bool, batch_size: int,
+                meta: Optional[dict] = None) -> None:
+        """Метод вставки нормализованных транзакций в открытой транзакции записи.
+
+        При replace=True строки вставляются в таблицу STAGING_TABLE, которая затем переименовывается
+        в transactions, индексы строятся один раз после вставки, а id - индексы строк датафрейма.
+        При добавлении id продолжают нумерацию таблицы, как в TransactionStore.append.
+        Значения meta пишутся в той же транзакции.
+        """
+        table = STAGING_TABLE if replace else 'transactions'
+        if replace:
+            connection.execute(f'DROP TABLE IF EXISTS {STAGING_TABLE}')
+        self._create_table(connection, table)
+        names = ', '.join(['id'] + [name for _, name, _ in SCHEMA])
+        placeholders = ', '.join('?' * (len(SCHEMA) + 1))
+        statement = f'INSERT INTO {table} ({names}) VALUES ({placeholders})'
+        ids = df.index.tolist()
+        if not replace:
+            start = connection.execute('SELECT COALESCE(MAX(id) + 1, 0) FROM transactions').fetchone()[0]
+            ids = range(start, start + len(df))
+        rows = zip(ids, *(_column_values(df, column) for column, _, _ in SCHEMA))
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            connection.executemany(statement, batch)
+        if replace:
+            connection.execute('DROP TABLE IF EXISTS transactions')
+            connection.execute(f'ALTER TABLE {STAGING_TABLE} RENAME TO transactions')
+            connection.execute('DELETE FROM meta')
+        self._create_indexes(connection)
+        connection.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (meta or {}).items())
+
+    @timed('sqlite.load')
+    def load(self, df: pd.DataFrame, source: Optional[str] = None, replace: bool = True,
+             batch_size: int = BATCH_SIZE) -> IngestReport:
+        """Метод пакетной загрузки транзакций в базу.
+
+        Транзакции нормализуются и вставляются executemany порциями по batch_size строк
+        в одной транзакции SQLite. При replace=True id - индексы строк датафрейма, а таблица заменяется
+        целиком при фиксации, поэтому читатели не видят пустую или неполную таблицу. При replace=False
+        id продолжают нумерацию таблицы.
+        """
+        df, report = ingest_transactions(df, source)
+        started = time.perf_counter()
+        with self._write() as connection:
+            self._insert(connection, df, replace, batch_size)
+        logger.info('В базу %s загружено %s транзакций за %.2f с', self.path, len(df), time.perf_counter() - started)
+        return report
+
+    @classmethod
+    def from_file(cls, path: str, file_path: str, batch_size: int = BATCH_SIZE) -> 'SQLiteStore':
+        """Метод открытия базы для файла операций.
+
+        Файл загружается, только если база создана не из него или файл изменился после загрузки.
+        Решение о перезагрузке повторно проверяется под блокировкой записи, поэтому при одновременном
+        открытии базу перезаписывает только один процесс; отпечаток файла пишется в той же транзакции.
+        """
+        store = cls(path)
+        stat = os.stat(file_path)
+        signature = f'{os.path.abspath(file_path)}:{stat.st_mtime_ns}:{stat.st_size}'
+        if store.meta('source') == signature:
+            logger.info('База %s актуальна для файла %s', path, file_path)
+            return store
+        df, _ = ingest_transactions(load_operations(file_path, use_cache=False), str(file_path))
+        started = time.perf_counter()
+        with store._write() as connection:
+            store._create_table(connection, 'transactions')
+            row = connection.execute('SELECT value FROM meta WHERE key = ?', ('source',)).fetchone()
+            if row and row[0] == signature:
+                logger.info('База %s уже загружена из файла %s другим процессом', path, file_path)
+                return store
+            store._insert(connection, df, True, batch_size, {'source': signature})
+        logger.info('В базу %s загружено %s транзакций за %.2f с', path, len(df), time.perf_counter() - started)
+        return store
+
+    def meta(self, key: str) -> Optional[str]:
+        """Метод получения служебного значения из таблицы meta, None если базы или значения нет"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with self._connect() as connection:
+                row = connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def query(self, where: str = '1', params: tuple = (), order: str = 'id', limit: Optional[int] = None,
+              columns: Optional[str] = None) -> pd.DataFrame:
+        """Метод выполнения запроса к транзакциям с чтением результата из курсора порциями"""
+        columns = columns or ', '.join(name for _, name, _ in SCHEMA)
+        sql = f'SELECT id, {columns} FROM transactions WHERE {where} ORDER BY {order}'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        with self._connect() as connection:
+            return read_frame(connection.execute(sql, params))
+
+    def read_all(self) -> pd.DataFrame:
+        """Метод чтения всех транзакций в нормализованный датафрейм"""
+        return self.query()
+
+    @timed('sqlite.window')
+    def window(self, start_date, end_date) -> pd.DataFrame:
+        """Метод получения транзакций за период включительно по индексу дат"""
+        return self.query('operation_date BETWEEN ? AND ?', (to_sql_date(start_date), to_sql_date(end_date)))
+
+    @timed('sqlite.category_rows')
+    def category_rows(self, category: str, start_date, end_date) -> pd.DataFrame:
+        """Метод получения транзакций категории за период включительно по индексу (категория, дата)"""
+        return self.query('category = ? AND operation_date BETWEEN ? AND ?',
+                          (category, to_sql_date(start_date), to_sql_date(end_date)))
+
+    @timed('sqlite.card_totals')
+    def card_totals(self, start_date, end_date) -> pd.Series:
+        """Метод получения сумм операций по картам за период включительно, в рублях"""
+        sql = ('SELECT card, SUM(amount) FROM transactions WHERE operation_date BETWEEN ? AND ? '
+               'AND card IS NOT NULL GROUP BY card ORDER BY card')
+        with self._connect() as connection:
+            rows = connection.execute(sql, (to_sql_date(start_date), to_sql_date(end_date))).fetchall()
+        totals = pd.Series(dict(rows), dtype='float64', name='Сумма операции') / KOPECKS_PER_RUBLE
+        return totals.rename_axis('Номер карты')
+
+    @timed('sqlite.top_transactions')
+    def top_transactions(self, start_date, end_date, k: int = 5, rank_by: str = 'Сумма операции') -> pd.DataFrame:
+        """Метод получения k лучших транзакций за период, порядок совпадает с select_top из src.store"""
+        if rank_by not in RANK_EXPRESSIONS:
+            raise ValueError(f'Неизвестный способ ранжирования: {rank_by}')
+        score, condition = RANK_EXPRESSIONS[rank_by]
+        return self.query(f'operation_date BETWEEN ? AND ? AND {condition}',
+                          (to_sql_date(start_date), to_sql_date(end_date)), order=f'{score} DESC, id', limit=k)
+
+    def __len__(self) -> int:
+        with self._connect() as connection:
+            return connection.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+
+    def __repr__(self) -> str:
+        return f'SQLiteStore(path={self.path!r})'
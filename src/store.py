@@ -0,0 +1,442 @@
+import logging
+import time
+from collections import Counter
+from functools import cached_property
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.compact import KOPECKS_PER_RUBLE, column_memory, compact_like, compact_transactions, concat_transactions, \
+    expand_transactions, memory_report
+from src.ingest import ingest_transactions, parse_date_column, transaction_keys
+from src.loader import DATE_FORMATS, load_operations
+from src.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Функция нормализации транзакций: даты, суммы и номера карт, без изменения исходного датафрейма"""
+    return ingest_transactions(df)[0]
+
+
+def _operation_dates(df: pd.DataFrame, column: str = 'Дата операции') -> np.ndarray:
+    dates = df[column]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = parse_date_column(dates, DATE_FORMATS['Дата операции'])
+    return dates.to_numpy()
+
+
+def _insert_rows(df: pd.DataFrame, new_rows: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+    """Функция вставки новых строк перед позициями positions без пересортировки старых строк"""
+    order = np.insert(np.arange(len(df)), positions, np.arange(len(df), len(df) + len(new_rows)))
+    return concat_transactions(df, new_rows).iloc[order]
+
+
+class DateIndex:
+    """Класс индекса транзакций, отсортированных по дате операции.
+
+    Окно по датам выбирается бинарным поиском (searchsorted) за O(log n).
+    """
+
+    def __init__(self, df: pd.DataFrame, column: str = 'Дата операции') -> None:
+        dates = _operation_dates(df, column)
+        order = np.argsort(dates, kind='stable')
+        self.column = column
+        self.df = df.iloc[order]
+        self.dates = dates[order]
+
+    def update(self, new_rows: pd.DataFrame) -> None:
+        """Метод добавления новых транзакций: места для них находятся бинарным поиском, без пересортировки"""
+        if new_rows.empty:
+            return
+        dates = _operation_dates(new_rows, self.column)
+        order = np.argsort(dates, kind='stable')
+        positions = np.searchsorted(self.dates, dates[order], side='right')
+        self.df = _insert_rows(self.df, new_rows.iloc[order], positions)
+        self.dates = np.insert(self.dates, positions, dates[order])
+
+    def bounds(self, start_date, end_date) -> tuple[int, int]:
+        """Метод получения границ окна [start_date, end_date] в отсортированном массиве"""
+        left = np.searchsorted(self.dates, pd.Timestamp(start_date).to_datetime64(), side='left')
+        right = np.searchsorted(self.dates, pd.Timestamp(end_date).to_datetime64(), side='right')
+        return int(left), int(right)
+
+    def window(self, start_date, end_date) -> pd.DataFrame:
+        """Метод получения транзакций за период включительно"""
+        left, right = self.bounds(start_date, end_date)
+        return self.df.iloc[left:right]
+
+
+class PartitionIndex:
+    """Класс индекса транзакций, разбитых по значениям колонки на непрерывные отрезки.
+
+    Значения колонки заменяются категориальными кодами, строки сортируются по коду и дате,
+    поэтому транзакции одной категории или карты занимают отрезок [offsets[code], offsets[code + 1]),
+    отсортированный по дате операции.
+    """
+
+    def __init__(self, df: pd.DataFrame, column: str, date_column: str = 'Дата операции') -> None:
+        codes, keys = pd.factorize(df[column], sort=True)
+        dates = _operation_dates(df, date_column)
+        order = np.lexsort((dates, codes))
+        sorted_codes = codes[order]
+
+        self.column = column
+        self.date_column = date_column
+        self.keys = pd.Index(keys)
+        self.df = df.iloc[order]
+        self.dates = dates[order]
+        self.offsets = np.searchsorted(sorted_codes, np.arange(len(keys) + 1), side='left')
+
+    def bounds(self, key, start_date=None, end_date=None) -> tuple[int, int]:
+        """Метод получения границ строк значения key, при необходимости ограниченных периодом"""
+        if key not in self.keys:
+            return 0, 0
+        code = self.keys.get_loc(key)
+        left, right = int(self.offsets[code]), int(self.offsets[code + 1])
+        dates = self.dates[left:right]
+        if start_date is not None:
+            left += int(np.searchsorted(dates, pd.Timestamp(start_date).to_datetime64(), side='left'))
+        if end_date is not None:
+            right = int(self.offsets[code]) + int(
+                np.searchsorted(dates, pd.Timestamp(end_date).to_datetime64(), side='right'))
+        return left, max(left, right)
+
+    def rows(self, key, start_date=None, end_date=None) -> pd.DataFrame:
+        """Метод получения транзакций значения key за период включительно"""
+        left, right = self.bounds(key, start_date, end_date)
+        return self.df.iloc[left:right]
+
+    def update(self, new_rows: pd.DataFrame) -> None:
+        """Метод добавления новых транзакций без пересортировки индекса.
+
+        Строка вставляется в отрезок своего значения по дате, новые значения получают отрезки
+        в конце индекса, строки без значения попадают в начальный отрезок [0, offsets[0]).
+        """
+        if new_rows.empty:
+            return
+        values = new_rows[self.column]
+        new_keys = pd.Index(values.dropna().unique()).difference(self.keys)
+        if len(new_keys):
+            self.keys = pd.Index(list(self.keys) + list(new_keys))
+        codes = self.keys.get_indexer(values)
+        dates = _operation_dates(new_rows, self.date_column)
+
+        offsets = np.concatenate((self.offsets, np.full(len(new_keys), self.offsets[-1])))
+        starts = np.concatenate(([0], offsets[:-1]))
+        positions = np.empty(len(new_rows), dtype='int64')
+        for code in np.unique(codes):
+            rows = np.flatnonzero(codes == code)
+            left, right = starts[code + 1], offsets[code + 1]
+            positions[rows] = left + np.searchsorted(self.dates[left:right], dates[rows], side='right')
+
+        order = np.lexsort((dates, codes, positions))
+        self.df = _insert_rows(self.df, new_rows.iloc[order], positions[order])
+        self.dates = np.insert(self.dates, positions[order], dates[order])
+        added = np.bincount(codes[codes >= 0], minlength=len(self.keys))
+        self.offsets = offsets + np.count_nonzero(codes < 0) + np.concatenate(([0], np.cumsum(added)))
+
+
+class CardDailyTotals:
+    """Класс материализованной таблицы накопленных дневных трат по картам.
+
+    Для каждой карты хранятся отсортированные дни и накопленные суммы с ведущим нулем,
+    поэтому сумма за любые целые дни считается как разность двух значений.
+    scale - число единиц суммы в рубле (100, если суммы хранятся в копейках), результаты возвращаются в рублях.
+    """
+
+    def __init__(self, df: pd.DataFrame, scale: int = 1) -> None:
+        self.scale = scale
+        self.daily = self._aggregate(df)
+        self.days: dict = {}
+        self.cumulative_spend: dict = {}
+        self._rebuild(self.daily.index.get_level_values(0).unique())
+
+    @staticmethod
+    def _aggregate(df: pd.DataFrame) -> pd.Series:
+        """Метод агрегации сумм операций по карте и дню"""
+        days = df['Дата операции'].dt.normalize().rename('День')
+        return df.groupby([df['Номер карты'], days], observed=True)['Сумма операции'].sum().sort_index()
+
+    def _rebuild(self, cards) -> None:
+        """Метод пересчета накопленных сумм для указанных карт"""
+        for card in cards:
+            card_daily = self.daily.xs(card, level=0)
+            spend = np.nan_to_num(card_daily.to_numpy(dtype='float64'))
+            self.days[card] = card_daily.index.to_numpy()
+            self.cumulative_spend[card] = np.concatenate(([0.0], np.cumsum(spend)))
+
+    def update(self, new_rows: pd.DataFrame) -> None:
+        """Метод инкрементального обновления таблицы новыми транзакциями.
+
+        Пересчитываются только карты, по которым пришли новые транзакции.
+        """
+        new_daily = self._aggregate(new_rows)
+        if new_daily.empty:
+            return
+        self.daily = self.daily.add(new_daily, fill_value=0).sort_index()
+        self._rebuild(new_daily.index.get_level_values(0).unique())
+
+    def full_days(self, start_day: pd.Timestamp, end_day: pd.Timestamp) -> pd.DataFrame:
+        """Метод получения сумм по картам за целые дни в полуинтервале [start_day, end_day)"""
+        start, end = start_day.to_datetime64(), end_day.to_datetime64()
+        totals = {}
+        for card, days in self.days.items():
+            left = np.searchsorted(days, start, side='left')
+            right = np.searchsorted(days, end, side='left')
+            if right > left:
+                totals[card] = (self.cumulative_spend[card][right] - self.cumulative_spend[card][left],)
+        totals = pd.DataFrame.from_dict(totals, orient='index', columns=['Сумма операции'], dtype='float64')
+        return totals / self.scale
+
+    def between(self, start_date, end_date, date_index: 'DateIndex') -> pd.DataFrame:
+        """Метод получения трат по картам за период [start_date, end_date] включительно.
+
+        Целые дни берутся из таблицы, неполные первый и последний дни досчитываются по индексу дат.
+        Суммы округляются до копеек, чтобы убрать погрешность разности накопленных сумм.
+        """
+        start_date, end_date = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        first_full_day = start_date.ceil('D')
+        last_day = end_date.floor('D')
+        if first_full_day >= last_day:
+            partial = [date_index.window(start_date, end_date)]
+            totals = pd.DataFrame(columns=['Сумма операции'], dtype='float64')
+        else:
+            partial = [date_index.window(start_date, first_full_day - pd.Timedelta(1, 'ns')),
+                       date_index.window(last_day, end_date)]
+            totals = self.full_days(first_full_day, last_day)
+
+        for rows in partial:
+            if rows.empty:
+                continue
+            spend = rows.groupby('Номер карты', observed=True)['Сумма операции'].sum().astype('float64') / self.scale
+            partial_totals = spend.to_frame('Сумма операции')
+            totals = partial_totals if totals.empty else totals.add(partial_totals, fill_value=0)
+        return totals.sort_index().round(2)
+
+
+"""Способы ранжирования транзакций для топа: 'spend' - крупнейшие расходы по модулю,
+иначе - значение указанной колонки по убыванию"""
+TOP_RANKINGS = ('Сумма операции', 'spend', 'Сумма платежа', 'Сумма операции с округлением')
+
+
+def rank_scores(df: pd.DataFrame, rank_by: str = 'Сумма операции') -> pd.Series:
+    """Функция расчета оценок для ранжирования транзакций, NaN - транзакция не участвует в топе"""
+    if rank_by not in TOP_RANKINGS:
+        raise ValueError(f'Неизвестный способ ранжирования: {rank_by}')
+    if rank_by == 'spend':
+        amounts = df['Сумма операции']
+        return (-amounts).where(amounts < 0)
+    return df[rank_by].astype('float64')
+
+
+def select_top(df: pd.DataFrame, k: int = 5, rank_by: str = 'Сумма операции', by_card: bool = False,
+               scores: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Функция выбора k транзакций с наибольшей оценкой, при равенстве - в порядке индекса"""
+    if scores is None:
+        scores = rank_scores(df, rank_by)
+    ranked = df.assign(_score=scores).dropna(subset=['_score']).sort_index()
+    ranked = ranked.sort_values('_score', ascending=False, kind='stable')
+    top = ranked.groupby('Номер карты', sort=False, observed=True).head(k) if by_card else ranked.head(k)
+    return top.drop(columns='_score')
+
+
+class TopKIndex:
+    """Класс индекса k лучших транзакций за каждый день (и по каждой карте при by_card=True).
+
+    Топ за любой период собирается слиянием дневных топов за O(дней * k), без просмотра всех строк.
+    """
+
+    def __init__(self, df: pd.DataFrame, k: int = 5, rank_by: str = 'Сумма операции', by_card: bool = False) -> None:
+        self.k = k
+        self.rank_by = rank_by
+        self.by_card = by_card
+        self.rows = self._select(df)
+        self.days = self.rows['_day'].to_numpy()
+
+    def _select(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Метод отбора k лучших транзакций по дням"""
+        rows = df.assign(_score=rank_scores(df, self.rank_by), _day=df['Дата операции'].dt.normalize())
+        rows = rows.dropna(subset=['_score']).sort_index()
+        rows = rows.sort_values(['_day', '_score'], ascending=[True, False], kind='stable')
+        groups = ['_day', 'Номер карты'] if self.by_card else ['_day']
+        return rows.groupby(groups, sort=False, dropna=False, observed=True).head(self.k)
+
+    def update(self, new_rows: pd.DataFrame) -> None:
+        """Метод инкрементального обновления: пересчитываются только дни, в которые пришли новые транзакции"""
+        new_days = new_rows['Дата операции'].dt.normalize().unique()
+        affected = self.rows[self.rows['_day'].isin(new_days)].drop(columns=['_score', '_day'])
+        untouched = self.rows[~self.rows['_day'].isin(new_days)]
+        merged = self._select(concat_transactions(affected, new_rows))
+        self.rows = concat_transactions(untouched, merged).sort_values('_day', kind='stable')
+        self.days = self.rows['_day'].to_numpy()
+
+    def full_days(self, start_day: pd.Timestamp, end_day: pd.Timestamp) -> pd.DataFrame:
+        """Метод получения дневных топов за целые дни в полуинтервале [start_day, end_day)"""
+        left = np.searchsorted(self.days, start_day.to_datetime64(), side='left')
+        right = np.searchsorted(self.days, end_day.to_datetime64(), side='left')
+        return self.rows.iloc[left:right].drop(columns=['_score', '_day'])
+
+
+class AppendReport:
+    """Класс отчета о добавлении выгрузки: строк в выгрузке, добавлено, повторов и отклонено"""
+
+    def __init__(self, rows: int, appended: int, rejected: int, seconds: float) -> None:
+        self.rows = rows
+        self.appended = appended
+        self.rejected = rejected
+        self.seconds = seconds
+
+    @property
+    def duplicates(self) -> int:
+        return self.rows - self.rejected - self.appended
+
+    def __repr__(self) -> str:
+        return (f'AppendReport(rows={self.rows}, appended={self.appended}, duplicates={self.duplicates}, '
+                f'rejected={self.rejected})')
+
+
+class TransactionStore:
+    """Класс хранилища транзакций, которые загружаются и нормализуются один раз за запуск.
+
+    В компактном режиме (compact=True) суммы хранятся в копейках, строковые колонки - категориальными.
+    Наружу строки отдаются через restore с суммами в рублях и исходными типами колонок.
+    """
+
+    def __init__(self, df: pd.DataFrame, source: Optional[str] = None, compact: bool = False) -> None:
+        self.df, self.ingest_report = ingest_transactions(df, source)
+        self.source = source
+        self.compact = compact
+        self.amount_scale = KOPECKS_PER_RUBLE if compact else 1
+        self._memory_before = None
+        if compact:
+            self._memory_before = column_memory(self.df)
+            self.df = compact_transactions(self.df)
+        self._top_k_indexes: dict[tuple, TopKIndex] = {}
+
+    @classmethod
+    def from_file(cls, file_path: str, cache_dir: Optional[str] = None, compact: bool = False) -> 'TransactionStore':
+        """Метод создания хранилища из файла с операциями"""
+        df = load_operations(file_path, cache_dir=cache_dir)
+        logger.info('Хранилище транзакций загружено из %s, записей: %s', file_path, len(df))
+        return cls(df, source=str(file_path), compact=compact)
+
+    @cached_property
+    def _key_counts(self) -> Counter:
+        """Число транзакций хранилища с каждым ключом DEDUP_COLUMNS, считается один раз при первом добавлении"""
+        return Counter(transaction_keys(self.restore(self.df, categorical=True)).tolist())
+
+    def append(self, df: pd.DataFrame, source: Optional[str] = None) -> AppendReport:
+        """Метод инкрементального добавления новой выгрузки, которая может пересекаться с уже загруженными.
+
+        Выгрузка нормализуется, транзакции, которые уже есть в хранилище, отбрасываются по ключу
+        (дата операции, карта, сумма, описание) с учетом числа повторов ключа, остальные добавляются в конец.
+        Построенные индексы и агрегаты обновляются только новыми строками, без перестроения,
+        поэтому время добавления растет с размером выгрузки, а не всей истории.
+        """
+        started = time.perf_counter()
+        new, ingest_report = ingest_transactions(df, source)
+        keys = transaction_keys(new)
+        occurrence = pd.Series(keys).groupby(keys).cumcount().to_numpy()
+        known = np.array([self._key_counts.get(key, 0) for key in keys.tolist()], dtype='int64')
+        fresh_mask = occurrence >= known
+        fresh = new[fresh_mask]
+        self._key_counts.update(keys[fresh_mask].tolist())
+
+        if len(fresh):
+            start = len(self.df)
+            if len(self.df) and pd.api.types.is_integer_dtype(self.df.index):
+                start = max(start, int(self.df.index.max()) + 1)
+            fresh = fresh.set_axis(pd.RangeIndex(start, start + len(fresh)))
+            if self.compact:
+                self._memory_before = self._memory_before.add(column_memory(fresh), fill_value=0)
+                fresh = compact_like(fresh, self.df)
+            self.df = concat_transactions(self.df, fresh)
+            for name in ('date_index', 'category_index', 'card_daily_totals'):
+                if name in self.__dict__:
+                    self.__dict__[name].update(fresh)
+            for index in self._top_k_indexes.values():
+                index.update(fresh)
+
+        report = AppendReport(len(keys) + len(ingest_report.rejected), len(fresh), len(ingest_report.rejected),
+                              time.perf_counter() - started)
+        logger.info('Из %s добавлено %s новых транзакций, повторов %s, отклонено %s, всего записей %s',
+                    source or 'датафрейма', report.appended, report.duplicates, report.rejected, len(self.df))
+        return report
+
+    def append_file(self, file_path: str) -> AppendReport:
+        """Метод добавления новой выгрузки из файла"""
+        return self.append(load_operations(file_path, use_cache=False), source=str(file_path))
+
+    def restore(self, df: pd.DataFrame, categorical: bool = False) -> pd.DataFrame:
+        """Метод приведения строк хранилища к исходному виду: суммы в рублях, колонки исходных типов.
+
+        При categorical=True категориальные колонки не перекодируются. Без компактного режима строки не меняются.
+        """
+        return expand_transactions(df, categorical) if self.compact else df
+
+    def memory_report(self) -> pd.DataFrame:
+        """Метод получения памяти по колонкам в байтах до и после компактного представления"""
+        after = column_memory(self.df)
+        return memory_report(after if self._memory_before is None else self._memory_before, after)
+
+    @cached_property
+    def date_index(self) -> DateIndex:
+        """Индекс по дате операции, строится один раз при первом обращении"""
+        return DateIndex(self.df)
+
+    @cached_property
+    def category_index(self) -> PartitionIndex:
+        """Индекс по категориям, строится один раз при первом обращении"""
+        return PartitionIndex(self.df, 'Категория')
+
+    @cached_property
+    def card_daily_totals(self) -> CardDailyTotals:
+        """Накопленные дневные траты по картам, строятся один раз при первом обращении"""
+        return CardDailyTotals(self.df, self.amount_scale)
+
+    def top_k_index(self, k: int = 5, rank_by: str = 'Сумма операции', by_card: bool = False) -> TopKIndex:
+        """Метод получения индекса дневных топов, индекс строится один раз для каждого набора параметров"""
+        key = (k, rank_by, by_card)
+        if key not in self._top_k_indexes:
+            self._top_k_indexes[key] = TopKIndex(self.df, k, rank_by, by_card)
+        return self._top_k_indexes[key]
+
+    def top_transactions(self, start_date, end_date, k: int = 5, rank_by: str = 'Сумма операции',
+                         by_card: bool = False) -> pd.DataFrame:
+        """Метод получения k лучших транзакций за период [start_date, end_date] включительно.
+
+        Целые дни берутся из индекса дневных топов, неполные первый и последний дни - из индекса дат.
+        """
+        start_date, end_date = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        first_full_day = start_date.ceil('D')
+        last_day = end_date.floor('D')
+        if first_full_day >= last_day:
+            candidates = [self.date_index.window(start_date, end_date)]
+        else:
+            candidates = [self.top_k_index(k, rank_by, by_card).full_days(first_full_day, last_day),
+                          self.date_index.window(start_date, first_full_day - pd.Timedelta(1, 'ns')),
+                          self.date_index.window(last_day, end_date)]
+        return self.restore(select_top(pd.concat(candidates), k, rank_by, by_card))
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def __repr__(self) -> str:
+        return f'TransactionStore(source={self.source!r}, rows={len(self.df)}, compact={self.compact})'
+
+
+TransactionSource = Union[TransactionStore, SQLiteStore, pd.DataFrame, str]
+
+
+def get_transactions(source: TransactionSource) -> pd.DataFrame:
+    """Функция получения нормализованного датафрейма из хранилища, базы SQLite, датафрейма или пути к файлу"""
+    if isinstance(source, TransactionStore):
+        return source.restore(source.df)
+    if isinstance(source, SQLiteStore):
+        return source.read_all()
+    if isinstance(source, pd.DataFrame):
+        return normalize_transactions(source)
+    return normalize_transactions(load_operations(source))
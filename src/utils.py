@@ -2,19 +2,21 @@ import json
 import logging
 import pandas as pd
 from datetime import datetime
+from src.loader import load_operations
+from src.logging_config import DEFAULT_SETTINGS_FILE
 
 logger = logging.getLogger(__name__)
 
 
-def load_user_settings(file_path='C:/Users/Александр Побережный/Desktop/питон/final_task_course_3/user_settings.json'):
-    """Функция загрузки пользовательских настроек"""
+def load_user_settings(file_path=DEFAULT_SETTINGS_FILE):
+    """Функция загрузки пользовательских настроек, по умолчанию - user_settings.json в корне проекта"""
     try:
-        with open(file_path, 'r') as file:
+        with open(file_path, 'r', encoding='utf-8') as file:
             settings = json.load(file)
-            logger.info(f'Настройки загружены из {file_path}')
+            logger.info('Настройки загружены из %s', file_path)
             return settings
     except Exception as e:
-        logger.error(f'Ошибка при загрузке настроек из {file_path}: {e}')
+        logger.error('Ошибка при загрузке настроек из %s: %s', file_path, e)
         return {}
 
 
@@ -32,8 +34,8 @@ def convert_timestamps(obj):
 def load_transactions(file_path):
     """Функция чтения транзакций"""
     try:
-        transactions = pd.read_excel(file_path)
+        transactions = load_operations(file_path)
         return transactions
     except Exception as e:
-        logger.error(f"Ошибка чтения транзакций из {file_path}: {e}")
+        logger.error("Ошибка чтения транзакций из %s: %s", file_path, e)
         return pd.DataFrame()
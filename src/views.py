@@ -1,24 +1,21 @@
+import contextvars
 import os
+import threading
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import pandas as pd
 from dateutil.parser import parse
 from dotenv import load_dotenv
-from src.utils import load_user_settings, convert_timestamps
-import json
-
-"""Настройка логирования"""
-logs_directory = 'C:/Users/Александр Побережный/Desktop/питон/final_task_course_3/logs'
-log_file = os.path.join(logs_directory, 'views.log')
-
-os.makedirs(logs_directory, exist_ok=True)
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=log_file,
-    filemode='w'
-)
+from src.cashback import DEFAULT_RATE, CashbackRules, calculate_cashback, cashback_aggregates, cashback_records
+from src.logging_config import DEFAULT_OPERATIONS_FILE, log_summary
+from src.metrics import collect_timings, timed
+from src.resilience import REQUEST_TIMEOUT, Deadline, guarded_get
+from src.serialization import dumps, frame_records
+from src.quote_cache import DEFAULT_PATH, DEFAULT_TTL, QuoteCache
+from src.sqlite_store import SQLiteStore
+from src.store import TransactionStore, get_transactions, normalize_transactions, select_top
+from src.utils import load_user_settings
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +26,33 @@ load_dotenv()
 API_KEY = os.getenv("API_KEY")
 API_KEY_STOCK = os.getenv("API_KEY_STOCK")
 
+"""Адреса внешних API"""
+CURRENCY_API_URL = "https://api.apilayer.com/currency_data/live"
+STOCK_API_URL = "https://www.alphavantage.co/query"
+
+"""Максимальное количество одновременных запросов к API"""
+MAX_WORKERS = 8
+
+"""Бюджет времени на формирование ответа главной страницы в секундах"""
+DASHBOARD_BUDGET = float(os.getenv("DASHBOARD_BUDGET", 2.0))
+
+"""Запас времени, за который вложенные ожидания успевают вернуть частичный результат"""
+DEADLINE_GRACE = 0.05
+
+"""Настройки кэша котировок: время жизни в секундах и путь к SQLite (пустой путь - только память)"""
+QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", DEFAULT_TTL))
+QUOTE_CACHE_PATH = os.getenv("QUOTE_CACHE_PATH", DEFAULT_PATH) or None
+
+_session = None
+_session_lock = threading.Lock()
+_quote_cache = None
+
+"""Дефолтные значения курсов валют"""
+default_currency_rates = [
+    {"currency": "USD", "rate": 73.21},
+    {"currency": "EUR", "rate": 87.08}
+]
+
 """Дефолтные значения цен на акции"""
 default_stock_prices = {
     "AAPL": 150.12,
@@ -44,15 +68,37 @@ def fetch_stock_price(stock_symbol):
     try:
         price = default_stock_prices.get(stock_symbol, None)
         if price is not None:
-            logger.info(f'Цена акций для {stock_symbol}: {price}')
+            logger.info('Цена акций для %s: %s', stock_symbol, price)
         else:
-            logger.warning(f'Цена для {stock_symbol} не найдена.')
+            logger.warning('Цена для %s не найдена.', stock_symbol)
         return price
     except Exception as e:
-        logger.error(f'Ошибка при получении цены акции для {stock_symbol}: {e}')
+        logger.error('Ошибка при получении цены акции для %s: %s', stock_symbol, e)
         return None
 
 
+def get_session():
+    """Функция получения общей HTTP-сессии с пулом keep-alive соединений"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+    return _session
+
+
+def get_quote_cache():
+    """Функция получения общего кэша котировок"""
+    global _quote_cache
+    with _session_lock:
+        if _quote_cache is None:
+            _quote_cache = QuoteCache(path=QUOTE_CACHE_PATH, ttl=QUOTE_CACHE_TTL)
+    return _quote_cache
+
+
 def get_greeting(dt):
     """Функция получения приветствия в зависимости от времени суток"""
     hour = dt.hour
@@ -66,50 +112,117 @@ def get_greeting(dt):
         return "Доброй ночи"
 
 
-def get_currency_rates(currencies):
-    """Функция получения курсов валют"""
+@timed('views.request_currency_quotes')
+def request_currency_quotes(pairs, deadline=None):
+    """Функция запроса курсов валют у API, возвращает словарь вида {"USDEUR": 0.85}"""
+    symbols = ",".join(pair[3:] for pair in pairs)
+    url = f"{CURRENCY_API_URL}?symbols={symbols}"
+    headers = {"apikey": API_KEY}
+
+    response = guarded_get(get_session(), url, deadline, headers=headers)
+    logger.info("Курсы валют получены успешно.")
+
+    data = response.json()
+    logger.debug('Полученные данные о курсах валют: %s', log_summary(data))
+    quotes = data.get("quotes", {})
+    return {pair: quotes[pair] for pair in pairs if pair in quotes}
+
+
+@timed('views.get_currency_rates')
+def get_currency_rates(currencies, deadline=None, degraded=None):
+    """Функция получения курсов валют, значения берутся из кэша котировок.
+
+    Бюджет deadline ограничивает только синхронный запрос отсутствующих курсов, фоновое обновление
+    устаревших курсов получает собственный бюджет REQUEST_TIMEOUT.
+    При подстановке дефолтных значений в множество degraded добавляется "currency_rates".
+    """
+    if degraded is None:
+        degraded = set()
+
     if not API_KEY:
         logger.warning("API_KEY не установлен. Проверьте файл .env.")
-        return [
-            {"currency": "USD", "rate": 73.21},
-            {"currency": "EUR", "rate": 87.08}
-        ]
-
-    symbols = ",".join(currencies)
-    url = f"https://api.apilayer.com/currency_data/live?symbols={symbols}"
-    headers = {"apikey": API_KEY}
+        degraded.add("currency_rates")
+        return list(default_currency_rates)
 
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        logger.info("Курсы валют получены успешно.")
+        quotes = get_quote_cache().get_or_fetch_many(
+            [f"USD{currency}" for currency in currencies],
+            lambda pairs: request_currency_quotes(pairs, deadline),
+            lambda pairs: request_currency_quotes(pairs, Deadline(REQUEST_TIMEOUT)))
     except requests.RequestException as e:
-        logger.error(f"Ошибка в обращении к сайту: {e}")
-        return [
-            {"currency": "USD", "rate": 73.21},
-            {"currency": "EUR", "rate": 87.08}
-        ]
-
-    try:
-        data = response.json()
-        logger.debug(f'Полученные данные о курсах валют: {data}')
+        logger.error("Ошибка в обращении к сайту: %s", e)
+        degraded.add("currency_rates")
+        return list(default_currency_rates)
     except ValueError as e:
-        logger.error(f"Ошибка в преобразовании ответа в JSON: {e}")
-        return [
-            {"currency": "USD", "rate": 73.21},
-            {"currency": "EUR", "rate": 87.08}
-        ]
+        logger.error("Ошибка в преобразовании ответа в JSON: %s", e)
+        degraded.add("currency_rates")
+        return list(default_currency_rates)
 
-    quotes = data.get("quotes", {})
     rates = [{"currency": currency, "rate": round(quotes.get(f"USD{currency}", 0), 2)} for currency in currencies]
     logger.info("Курсы валют успешно обработаны.")
     return rates
 
 
-def get_stock_price(stocks):
-    """Функция получения цен на акции"""
+@timed('views.request_stock_quote')
+def request_stock_quote(s, deadline=None):
+    """Функция запроса цены одной акции у API, исключение при ошибке или отсутствии цены"""
+    url = f"{STOCK_API_URL}?function=GLOBAL_QUOTE&symbol={s}&apikey={API_KEY_STOCK}"
+    response = guarded_get(get_session(), url, deadline)
+    logger.info("Цены на акции для %s получены успешно.", s)
+
+    data = response.json()
+    logger.debug('Полученные данные о цене акций для %s: %s', s, log_summary(data))
+    stock_data = data.get("Global Quote", {})
+    price = round(float(stock_data.get("05. price", 0)), 2)
+    if price == 0.0:
+        raise ValueError(f"В ответе нет цены для {s}")
+    return price
+
+
+def fetch_stock_quote(s, deadline=None, degraded=None):
+    """Функция получения цены одной акции из кэша котировок с подстановкой дефолтного значения при ошибке.
+
+    Бюджет deadline ограничивает только синхронный запрос, фоновое обновление получает свой REQUEST_TIMEOUT.
+    """
+    try:
+        price = get_quote_cache().get_or_fetch(f"stock:{s}", lambda: request_stock_quote(s, deadline),
+                                               lambda: request_stock_quote(s, Deadline(REQUEST_TIMEOUT)))
+    except requests.RequestException as e:
+        logger.error("Запрос не был успешным для %s: %s", s, e)
+        price = default_stock_prices.get(s, 0.0)
+        if degraded is not None:
+            degraded.add("stock_prices")
+    except ValueError as e:
+        logger.error("Ошибка в обработке ответа для %s: %s", s, e)
+        price = default_stock_prices.get(s, 0.0)
+        if degraded is not None:
+            degraded.add("stock_prices")
+
+    return {"stock": s, "price": price}
+
+
+def wait_within_deadline(future, deadline, default, section, degraded, grace=0.0):
+    """Функция ожидания результата в пределах бюджета времени, по истечении возвращает default"""
+    timeout = None if deadline is None else deadline.remaining() + grace
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        logger.warning("Раздел %s не получен за отведенное время, используются дефолтные значения.", section)
+        if degraded is not None:
+            degraded.add(section)
+        return default
+
+
+@timed('views.get_stock_price')
+def get_stock_price(stocks, deadline=None, degraded=None):
+    """Функция получения цен на акции, запросы по разным акциям выполняются параллельно.
+
+    При подстановке дефолтных значений в множество degraded добавляется "stock_prices".
+    """
     if not API_KEY_STOCK:
         logger.warning("API_KEY_STOCK не установлен. Проверьте файл .env.")
+        if degraded is not None:
+            degraded.add("stock_prices")
         return [
             {"stock": "AAPL", "price": 150.12},
             {"stock": "AMZN", "price": 3173.18},
@@ -119,33 +232,14 @@ def get_stock_price(stocks):
         ]
 
     stock_prices = []
-
-    for s in stocks:
-        url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={s}&apikey={API_KEY_STOCK}"
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            logger.info(f"Цены на акции для {s} получены успешно.")
-        except requests.RequestException as e:
-            logger.error(f"Запрос не был успешным для {s}: {e}")
-            stock_prices.append({"stock": s, "price": default_stock_prices.get(s, 0.0)})
-            continue
-
-        try:
-            data = response.json()
-            logger.debug(f'Полученные данные о цене акций для {s}: {data}')
-        except ValueError as e:
-            logger.error(f"Ошибка в преобразовании ответа в JSON для {s}: {e}")
-            stock_prices.append({"stock": s, "price": default_stock_prices.get(s, 0.0)})
-            continue
-
-        stock_data = data.get("Global Quote", {})
-        price = round(float(stock_data.get("05. price", 0)), 2)
-
-        if price == 0.0:
-            price = default_stock_prices.get(s, 0.0)
-
-        stock_prices.append({"stock": s, "price": price})
+    if stocks:
+        executor = ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(stocks)))
+        futures = [executor.submit(contextvars.copy_context().run, fetch_stock_quote, s, deadline, degraded)
+                   for s in stocks]
+        executor.shutdown(wait=False)
+        for s, future in zip(stocks, futures):
+            default = {"stock": s, "price": default_stock_prices.get(s, 0.0)}
+            stock_prices.append(wait_within_deadline(future, deadline, default, "stock_prices", degraded))
 
     if not stock_prices:
         logger.warning("Получен пустой список акций. Возвращаем дефолтные значения.")
@@ -155,74 +249,256 @@ def get_stock_price(stocks):
     return stock_prices
 
 
-def analyze_cards(file_path, start_date, end_date):
-    """Функция для анализа данных карт из operations.xlsx"""
+@timed('views.analyze_cards')
+def analyze_cards(source, start_date, end_date, rank_by='Сумма операции', cashback=None):
+    """Функция для анализа данных карт из operations.xlsx или из общего хранилища транзакций.
+
+    rank_by задает ранжирование топ-5 транзакций: 'Сумма операции', 'spend' (крупнейшие расходы),
+    'Сумма платежа' или 'Сумма операции с округлением'.
+    cashback - кэшбэк по номерам карт из analyze_cashback, без него кэшбэк равен 1% от суммы операций.
+    """
+    if isinstance(source, TransactionStore):
+        return analyze_store_cards(source, start_date, end_date, rank_by, cashback)
+    if isinstance(source, SQLiteStore):
+        return analyze_sqlite_cards(source, start_date, end_date, rank_by, cashback)
+
     try:
-        df = pd.read_excel(file_path)
-        logger.info(f'Файл {file_path} успешно прочитан.')
+        with timed('views.load_transactions'):
+            df = get_transactions(source)
+        logger.info('Транзакции из %s успешно получены.', log_summary(source))
     except FileNotFoundError:
-        logger.error(f"Файл {file_path} не найден.")
+        logger.error("Файл %s не найден.", log_summary(source))
         return [], []
     except Exception as e:
-        logger.error(f"Ошибка чтения файла {file_path}: {e}")
+        logger.error("Ошибка чтения транзакций из %s: %s", log_summary(source), e)
         return [], []
 
     try:
-        """Обновление формата даты и времени"""
-        df['Дата операции'] = pd.to_datetime(df['Дата операции'], format='%d.%m.%Y %H:%M:%S')
+        """Даты уже разобраны при нормализации, исходный датафрейм не изменяется"""
         start_date = pd.to_datetime(start_date)
         end_date = pd.to_datetime(end_date)
-        filtered_df = df[(df['Дата операции'] >= start_date) & (df['Дата операции'] <= end_date)]
+        with timed('views.filter_period'):
+            operation_dates = df['Дата операции']
+            filtered_df = df[(operation_dates >= start_date) & (operation_dates <= end_date)]
     except Exception as e:
-        logger.error(f"Ошибка обработки данных из {file_path}: {e}")
+        logger.error("Ошибка обработки данных из %s: %s", log_summary(source), e)
         return [], []
 
-    card_summary = filtered_df.groupby('Номер карты')['Сумма операции'].sum().reset_index()
-    card_summary['Кэшбэк'] = round(card_summary['Сумма операции'] * 0.01, 2)
-    card_summary['Последние цифры'] = card_summary['Номер карты'].apply(lambda x: str(x)[-4:] if pd.notna(x) else '')
+    with timed('views.card_totals'):
+        card_totals = filtered_df.groupby('Номер карты')['Сумма операции'].sum()
+    with timed('views.top_transactions'):
+        top_df = select_top(filtered_df, 5, rank_by)
+    return summarize_cards(card_totals, top_df, cashback)
+
+
+def analyze_store_cards(store, start_date, end_date, rank_by='Сумма операции', cashback=None):
+    """Функция для анализа данных карт по материализованным суммам хранилища.
+
+    Траты за период берутся из накопленных дневных сумм по картам, без просмотра всего датафрейма.
+    Без cashback кэшбэк, как и раньше, округляется от итоговой суммы по карте.
+    """
+    start_date = pd.to_datetime(start_date)
+    end_date = pd.to_datetime(end_date)
+
+    with timed('views.card_totals'):
+        totals = store.card_daily_totals.between(start_date, end_date, store.date_index)
+    with timed('views.top_transactions'):
+        top_df = store.top_transactions(start_date, end_date, k=5, rank_by=rank_by)
+    return summarize_cards(totals['Сумма операции'], top_df, cashback)
+
+
+def analyze_sqlite_cards(store, start_date, end_date, rank_by='Сумма операции', cashback=None):
+    """Функция для анализа данных карт индексированными запросами к базе SQLite"""
+    start_date = pd.to_datetime(start_date)
+    end_date = pd.to_datetime(end_date)
+
+    with timed('views.card_totals'):
+        card_totals = store.card_totals(start_date, end_date)
+    with timed('views.top_transactions'):
+        top_df = store.top_transactions(start_date, end_date, k=5, rank_by=rank_by)
+    return summarize_cards(card_totals, top_df, cashback)
+
+
+def load_cashback_rules(settings):
+    """Функция получения правил кэшбэка из раздела "cashback" настроек, None если правила заданы с ошибкой"""
+    try:
+        return CashbackRules.from_settings(settings)
+    except (AttributeError, TypeError, ValueError) as e:
+        logger.error("Ошибка в правилах кэшбэка: %s", e)
+        return None
+
+
+@timed('views.analyze_cashback')
+def analyze_cashback(source, start_date, end_date, rules):
+    """Функция расчета кэшбэка по правилам за период: по картам и по категориям, None при ошибке.
+
+    Из хранилища и базы SQLite берутся только операции периода, категориальные колонки хранилища
+    в компактном режиме используются без перекодирования.
+    """
+    start_date = pd.to_datetime(start_date)
+    end_date = pd.to_datetime(end_date)
+    try:
+        if isinstance(source, TransactionStore):
+            period_df = source.restore(source.date_index.window(start_date, end_date), categorical=True)
+        elif isinstance(source, SQLiteStore):
+            period_df = source.window(start_date, end_date)
+        else:
+            df = get_transactions(source)
+            operation_dates = df['Дата операции']
+            period_df = df[(operation_dates >= start_date) & (operation_dates <= end_date)]
+        return calculate_cashback(period_df, rules)
+    except Exception as e:
+        logger.error("Ошибка расчета кэшбэка по %s: %s", log_summary(source), e)
+        return None
+
+
+def summarize_cards(card_totals, top_df, cashback=None):
+    """Функция формирования сводки по картам и топ-5 транзакций.
+
+    Кэшбэк берется из cashback по номеру карты, без него - DEFAULT_RATE от суммы операций карты.
+    Сводка и транзакции собираются из колонок целиком, без перебора строк датафрейма.
+    """
+    card_summary = card_totals.rename('Сумма операции').rename_axis('Номер карты').reset_index()
+    if cashback is None:
+        card_summary['Кэшбэк'] = card_summary['Сумма операции'] * DEFAULT_RATE
+    else:
+        card_summary['Кэшбэк'] = cashback.reindex(card_summary['Номер карты']).fillna(0.0).to_numpy()
+    last_digits = card_summary['Номер карты'].astype('string').str[-4:].fillna('')
 
-    transactions = filtered_df.nlargest(5, 'Сумма операции')[['Дата операции', 'Сумма операции', 'Категория',
-                                                              'Описание']].to_dict(orient='records')
+    transactions = frame_records(top_df[['Дата операции', 'Сумма операции', 'Категория', 'Описание']])
 
-    card_info = [{"Последние цифры": str(row['Последние цифры']),
-                  "Всего потрачено": round(row['Сумма операции'], 2),
-                  "Кэшбэк": round(row['Кэшбэк'], 2)} for index, row in card_summary.iterrows()]
+    card_info = [{"Последние цифры": digits, "Всего потрачено": total, "Кэшбэк": cashback_value}
+                 for digits, total, cashback_value in zip(last_digits.tolist(),
+                                                          card_summary['Сумма операции'].round(2).tolist(),
+                                                          card_summary['Кэшбэк'].round(2).tolist())]
 
     logger.info("Транзакции успешно проанализированы.")
     return card_info, transactions
 
 
-def main(datetime_str):
-    """Главная функция"""
+def analyze_cards_from_batches(batches, start_date, end_date, rules=None):
+    """Функция для потокового анализа данных карт по пачкам транзакций.
+
+    Кэшбэк рассчитывается по правилам rules (по умолчанию - 1% от суммы операций) один раз после чтения
+    всех пачек: лимиты и уровни зависят от сумм за месяц, поэтому из пачек накапливаются только суммы
+    по карте, месяцу, категории и MCC, и память ограничена числом таких групп, а не числом операций.
+    """
+    start_date = pd.to_datetime(start_date)
+    end_date = pd.to_datetime(end_date)
+    card_totals = pd.Series(dtype='float64')
+    aggregates = None
+    top_df = None
+
+    try:
+        for batch in batches:
+            batch = normalize_transactions(batch)
+            operation_dates = batch['Дата операции']
+            filtered_df = batch[(operation_dates >= start_date) & (operation_dates <= end_date)]
+
+            batch_totals = filtered_df.groupby('Номер карты')['Сумма операции'].sum()
+            card_totals = card_totals.add(batch_totals, fill_value=0)
+            batch_aggregates = cashback_aggregates(filtered_df)
+            aggregates = batch_aggregates if aggregates is None else cashback_aggregates(
+                pd.concat([aggregates, batch_aggregates], ignore_index=True))
+
+            candidates = filtered_df.nlargest(5, 'Сумма операции')
+            top_df = candidates if top_df is None else pd.concat([top_df, candidates]).nlargest(5, 'Сумма операции')
+    except Exception as e:
+        logger.error("Ошибка потоковой обработки транзакций: %s", e)
+        return [], []
+
+    if top_df is None:
+        return [], []
+    cashback = calculate_cashback(aggregates, rules or CashbackRules())
+    return summarize_cards(card_totals, top_df, cashback.by_card['Кэшбэк'])
+
+
+"""Файл с операциями по умолчанию, как у командной строки"""
+OPERATIONS_FILE = DEFAULT_OPERATIONS_FILE
+
+
+def main(datetime_str, transactions=None, budget=None, timings=False, settings=None, compact=False):
+    """Главная функция, принимает путь к файлу или общее хранилище транзакций.
+
+    Ответ формируется в пределах бюджета времени budget (по умолчанию DASHBOARD_BUDGET секунд),
+    разделы с дефолтными значениями перечисляются в поле "degraded".
+    При timings=True в ответ добавляется поле "timings" с длительностью этапов в секундах.
+    Уже загруженные настройки передаются в settings, иначе они читаются из user_settings.json.
+    При compact=True ответ сериализуется в компактный JSON без отступов.
+    """
+    with collect_timings() as stage_timings:
+        result = build_dashboard(datetime_str, transactions, budget, settings)
+        if timings:
+            result["timings"] = {stage: round(seconds, 6) for stage, seconds in sorted(stage_timings.items())}
+
+        with timed('views.serialize'):
+            return dumps(result, compact=compact)
+
+
+@timed('views.build_dashboard')
+def build_dashboard(datetime_str, transactions=None, budget=None, settings=None):
+    """Функция формирования данных главной страницы до сериализации в JSON"""
     dt = parse(datetime_str)
     start_date = dt.replace(day=1)
     end_date = dt
 
-    logger.info(f"Программа запущена с datetime_str: {datetime_str}")
+    logger.info("Программа запущена с datetime_str: %s", datetime_str)
 
-    settings = load_user_settings()
+    if settings is None:
+        with timed('views.load_settings'):
+            settings = load_user_settings()
     greeting = get_greeting(dt)
-    card_info, top_transactions = analyze_cards(
-        'C:/Users/Александр Побережный/Desktop/питон/final_task_course_3/data/operations.xlsx', start_date, end_date)
-    currency_rates = get_currency_rates(settings.get('user_currencies', []))
-    stock_prices = get_stock_price(settings.get('user_stocks', []))
+    if transactions is None:
+        transactions = OPERATIONS_FILE
+    if not isinstance(transactions, (TransactionStore, SQLiteStore, pd.DataFrame)):
+        """Файл операций читается один раз: по нему анализируются карты и рассчитывается кэшбэк"""
+        try:
+            with timed('views.load_transactions'):
+                transactions = get_transactions(transactions)
+        except Exception as e:
+            logger.error("Ошибка чтения транзакций из %s: %s", log_summary(transactions), e)
+
+    deadline = Deadline(DASHBOARD_BUDGET if budget is None else budget)
+    degraded = set()
+    currencies = settings.get('user_currencies', [])
+    stocks = settings.get('user_stocks', [])
+
+    """Котировки запрашиваются параллельно, пока в основном потоке анализируются карты;
+    задачи запускаются в копии контекста, чтобы их этапы попали в сводку timings"""
+    executor = ThreadPoolExecutor(max_workers=2)
+    currency_future = executor.submit(contextvars.copy_context().run, get_currency_rates,
+                                      currencies, deadline, degraded)
+    stock_future = executor.submit(contextvars.copy_context().run, get_stock_price, stocks, deadline, degraded)
+    executor.shutdown(wait=False)
+
+    rules = load_cashback_rules(settings)
+    cashback = analyze_cashback(transactions, start_date, end_date, rules) if rules is not None else None
+    if cashback is None:
+        degraded.add("cashback")
+    card_info, top_transactions = analyze_cards(transactions, start_date, end_date,
+                                                settings.get('top_transactions_rank', 'Сумма операции'),
+                                                cashback=None if cashback is None else cashback.by_card['Кэшбэк'])
+    currency_rates = wait_within_deadline(currency_future, deadline, list(default_currency_rates),
+                                          "currency_rates", degraded, grace=DEADLINE_GRACE)
+    stock_prices = wait_within_deadline(stock_future, deadline,
+                                        [{"stock": s, "price": default_stock_prices.get(s, 0.0)} for s in stocks],
+                                        "stock_prices", degraded, grace=DEADLINE_GRACE)
 
     result = {
         "greeting": greeting,
         "cards": card_info,
         "top_transactions": top_transactions,
+        "cashback_categories": [] if cashback is None else cashback_records(cashback),
         "currency_rates": currency_rates,
         "stock_prices": stock_prices,
         "start_date": start_date,
-        "end_date": end_date
+        "end_date": end_date,
+        "degraded": sorted(degraded)
     }
 
-    result = convert_timestamps(result)
-
     logger.info("Результаты успешно сформированы.")
-    logger.debug(f'Результаты: {result}')
-
-    return json.dumps(result, ensure_ascii=False, indent=4)
+    logger.debug('Результаты: %s', log_summary(result))
+    return result
 
 
 """Пример как вызывать функцию"""
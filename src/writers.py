@@ -0,0 +1,129 @@
+import atexit
+import hashlib
+import logging
+import os
+import queue
+import threading
+from typing import Callable, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _write_csv(df: pd.DataFrame, path: str) -> None:
+    df.to_csv(path, index=False)
+
+
+def _write_csv_gzip(df: pd.DataFrame, path: str) -> None:
+    df.to_csv(path, index=False, compression='gzip')
+
+
+def _write_parquet(df: pd.DataFrame, path: str) -> None:
+    df.to_parquet(path, index=False)
+
+
+def _write_ndjson(df: pd.DataFrame, path: str) -> None:
+    df.to_json(path, orient='records', lines=True, force_ascii=False, date_format='iso')
+
+
+"""Поддерживаемые форматы отчетов: функция записи и расширение файла"""
+REPORT_FORMATS: dict[str, tuple[Callable[[pd.DataFrame, str], None], str]] = {
+    'csv': (_write_csv, ''),
+    'csv.gz': (_write_csv_gzip, '.csv.gz'),
+    'parquet': (_write_parquet, '.parquet'),
+    'ndjson': (_write_ndjson, '.ndjson'),
+}
+
+
+def report_path(directory: str, filename: str, fmt: str) -> str:
+    """Функция получения пути к файлу отчета с расширением формата, если его нет в имени"""
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f'Неизвестный формат отчета: {fmt}')
+    extension = REPORT_FORMATS[fmt][1]
+    if extension and not filename.endswith(extension):
+        filename = f'{filename}{extension}'
+    return os.path.join(directory, filename)
+
+
+def frame_digest(df: pd.DataFrame) -> Optional[str]:
+    """Функция вычисления хэша содержимого датафрейма, None если содержимое не хэшируется"""
+    try:
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    except (TypeError, ValueError):
+        return None
+    digest = hashlib.sha256(row_hashes.tobytes())
+    digest.update(repr(list(df.columns)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def write_report(df: pd.DataFrame, path: str, fmt: str = 'csv') -> None:
+    """Функция атомарной записи отчета в выбранном формате"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    REPORT_FORMATS[fmt][0](df, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class ReportWriter:
+    """Класс записи отчетов синхронно или в фоновом потоке через ограниченную очередь.
+
+    Запись пропускается, если содержимое отчета совпадает с последним записанным в тот же файл.
+    """
+
+    def __init__(self, max_queue_size: int = 64) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._last_digests: dict[str, str] = {}
+
+    def submit(self, df: pd.DataFrame, path: str, fmt: str = 'csv', background: bool = False) -> None:
+        """Метод постановки отчета на запись"""
+        if not background:
+            self._write(df, path, fmt, raise_errors=True)
+            return
+        self._ensure_worker()
+        self._queue.put((df.copy(), path, fmt))
+
+    def flush(self) -> None:
+        """Метод ожидания записи всех отчетов из очереди"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='report-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            df, path, fmt = self._queue.get()
+            try:
+                self._write(df, path, fmt)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, df: pd.DataFrame, path: str, fmt: str, raise_errors: bool = False) -> None:
+        digest = frame_digest(df)
+        with self._lock:
+            if digest is not None and self._last_digests.get(path) == digest and os.path.exists(path):
+                logger.debug('Отчет %s не изменился, запись пропущена', path)
+                return
+        try:
+            write_report(df, path, fmt)
+        except Exception as e:
+            logger.error('Ошибка при записи отчета %s: %s', path, e)
+            if raise_errors:
+                raise
+            return
+        with self._lock:
+            if digest is not None:
+                self._last_digests[path] = digest
+        logger.info('Результаты сохранены в файл %s', path)
+
+
+report_writer = ReportWriter()
+atexit.register(report_writer.flush)
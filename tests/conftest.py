@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+
+def make_statement(amounts, card='1111'):
+    return pd.DataFrame({
+        'Дата операции': [f'{day:02d}.12.2021 12:00:00' for day in range(1, len(amounts) + 1)],
+        'Дата платежа': [f'{day:02d}.12.2021' for day in range(1, len(amounts) + 1)],
+        'Номер карты': f'*{card}',
+        'Статус': 'OK',
+        'Сумма операции': amounts,
+        'Категория': ['Супермаркеты', 'Связь'] * (len(amounts) // 2),
+        'Описание': ['Магнит', 'МТС +7 921 111-22-33'] * (len(amounts) // 2),
+    })
+
+
+@pytest.fixture
+def statement():
+    return make_statement
+
+
+@pytest.fixture
+def offline():
+    def currency_rates(currencies, *args, **kwargs):
+        return [{'currency': currency, 'rate': 1.0} for currency in currencies]
+
+    with patch('src.views.API_KEY_STOCK', None), patch('src.views.get_currency_rates', currency_rates), \
+            patch('src.views.load_user_settings', return_value={}):
+        yield
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import pandas as pd
+import pytest
+from src.batch import CARD_TOTALS_FILENAME, CATEGORY_SPEND_FILENAME, DASHBOARD_FILENAME, PHONES_FILENAME, \
+    SUMMARY_FILENAME, find_statements, merge_results, output_names, process_statement, run_batch
+
+
+pytestmark = pytest.mark.usefixtures('offline')
+
+
+@pytest.fixture
+def statements(tmp_path, statement):
+    directory = tmp_path / 'statements'
+    directory.mkdir()
+    statement([-100.0, -50.0, -30.0, -20.0]).to_csv(directory / 'first.csv', index=False)
+    statement([-10.0, -5.0], card='2222').to_csv(directory / 'second.csv', index=False)
+    statement([-1.0, -2.0]).to_csv(directory / 'third.csv', index=False)
+    (directory / 'notes.txt').write_text('не выписка', encoding='utf-8')
+    return directory
+
+
+def test_find_statements(statements):
+    names = [os.path.basename(path) for path in find_statements(str(statements))]
+    assert names == ['first.csv', 'second.csv', 'third.csv']
+    assert find_statements(str(statements / 's*.csv')) == [str(statements / 'second.csv')]
+
+
+def test_output_names():
+    assert output_names(['a/operations.xlsx', 'b/operations.xlsx', 'c.csv']) == ['operations', 'operations_2', 'c']
+
+
+def test_process_statement(statements, tmp_path):
+    output = tmp_path / 'out'
+    result = process_statement(str(statements / 'first.csv'), str(output), '2021-12-31 00:00:00', 'Супермаркеты',
+                               '2021-12-31')
+    assert result['error'] is None
+    assert result['rows'] == 4
+    assert result['cards'] == [{'Последние цифры': '1111', 'Всего потрачено': -200.0, 'Кэшбэк': -2.0}]
+    assert result['categories'] == {'Связь': -70.0, 'Супермаркеты': -130.0}
+    assert result['report_rows'] == 2
+    assert result['phone_rows'] == 2
+    assert json.loads((output / DASHBOARD_FILENAME).read_text(encoding='utf-8'))['cards'] == result['cards']
+    assert len((output / PHONES_FILENAME).read_text(encoding='utf-8').splitlines()) == 2
+
+
+def test_process_statement_returns_error(tmp_path):
+    result = process_statement(str(tmp_path / 'missing.csv'), str(tmp_path / 'out'), '2021-12-31 00:00:00',
+                               'Супермаркеты', '2021-12-31')
+    assert result['error'].startswith('FileNotFoundError')
+
+
+def test_merge_results_keeps_cards_of_each_statement():
+    card_totals, category_spend = merge_results([
+        {'file': 'b.xlsx', 'cards': [{'Последние цифры': '1111', 'Всего потрачено': -20.0, 'Кэшбэк': -0.2}],
+         'categories': {'Связь': -1.0, 'Такси': -7.0}},
+        {'file': 'a.xlsx', 'cards': [{'Последние цифры': '1111', 'Всего потрачено': -10.0, 'Кэшбэк': -0.1}],
+         'categories': {'Связь': -5.0}},
+    ])
+    assert card_totals.to_dict(orient='records') == [
+        {'Выписка': 'a.xlsx', 'Последние цифры': '1111', 'Всего потрачено': -10.0, 'Кэшбэк': -0.1},
+        {'Выписка': 'b.xlsx', 'Последние цифры': '1111', 'Всего потрачено': -20.0, 'Кэшбэк': -0.2}]
+    assert category_spend.to_dict(orient='records') == [
+        {'Категория': 'Такси', 'Сумма операций': -7.0, 'Выписок': 1},
+        {'Категория': 'Связь', 'Сумма операций': -6.0, 'Выписок': 2}]
+
+
+def test_merge_results_without_spend():
+    card_totals, category_spend = merge_results([{'file': 'a.xlsx', 'cards': [], 'categories': {}}])
+    assert card_totals.empty and category_spend.empty
+    assert list(category_spend.columns) == ['Категория', 'Сумма операций', 'Выписок']
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run_batch(statements, tmp_path, workers):
+    output = tmp_path / 'out'
+    progress = []
+    paths = find_statements(str(statements)) + [str(statements / 'missing.csv')]
+    summary = run_batch(paths, str(output), '2021-12-31 00:00:00', 'Супермаркеты', '2021-12-31', workers=workers,
+                        settings={'cashback': {'default_rate': 0.02}},
+                        progress=lambda done, total, result: progress.append((done, total)))
+
+    assert sorted(progress) == [(1, 4), (2, 4), (3, 4), (4, 4)]
+    assert summary['files'] == 4
+    assert summary['rows'] == 8
+    assert [item['file'] for item in summary['failed']] == [str(statements / 'missing.csv')]
+    assert json.loads((output / SUMMARY_FILENAME).read_text(encoding='utf-8')) == summary
+    card_totals = pd.read_csv(output / CARD_TOTALS_FILENAME, dtype={'Последние цифры': str})
+    assert card_totals.to_dict(orient='records') == [
+        {'Выписка': str(statements / 'first.csv'), 'Последние цифры': '1111', 'Всего потрачено': -200.0,
+         'Кэшбэк': -4.0},
+        {'Выписка': str(statements / 'second.csv'), 'Последние цифры': '2222', 'Всего потрачено': -15.0,
+         'Кэшбэк': -0.3},
+        {'Выписка': str(statements / 'third.csv'), 'Последние цифры': '1111', 'Всего потрачено': -3.0,
+         'Кэшбэк': -0.06}]
+    category_spend = pd.read_csv(output / CATEGORY_SPEND_FILENAME)
+    assert category_spend['Сумма операций'].sum() == pytest.approx(-218.0)
+    assert (output / 'third' / DASHBOARD_FILENAME).exists()
+
+
+def test_run_batch_forwards_worker_logs(statements, tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    run_batch(find_statements(str(statements)), str(tmp_path / 'out'), '2021-12-31 00:00:00', 'Супермаркеты',
+              '2021-12-31', workers=2, settings={}, progress=lambda done, total, result: None)
+    worker_records = [record for record in caplog.records if record.process != os.getpid()]
+    assert worker_records
+    assert {record.name for record in worker_records} & {'src.ingest', 'src.views', 'src.loader'}
@@ -0,0 +1,43 @@
+import json
+import pandas as pd
+import pytest
+from benchmarks.generate import COLUMNS, generate_operations, write_operations
+from benchmarks.suite import BENCHMARKS, compare, main
+from src.loader import load_operations
+from src.services import filter_transactions_with_mobile_numbers
+from src.store import TransactionStore
+
+
+@pytest.fixture(scope='module')
+def operations():
+    return generate_operations(2000, seed=1)
+
+
+def test_generate_operations_schema(operations):
+    assert list(operations.columns) == COLUMNS
+    assert len(operations) == 2000
+    assert pd.to_datetime(operations['Дата операции'], format='%d.%m.%Y %H:%M:%S').is_monotonic_decreasing
+    assert operations['Категория'].nunique() > 10
+    assert len(filter_transactions_with_mobile_numbers(operations)) > 0
+    pd.testing.assert_frame_equal(generate_operations(2000, seed=1), operations)
+
+
+@pytest.mark.parametrize("fmt", ['xlsx', 'csv', 'columnar'])
+def test_write_operations_round_trip(operations, fmt, tmp_path):
+    path = write_operations(operations.head(200), str(tmp_path), fmt)
+    store = TransactionStore(load_operations(path, use_cache=False))
+    assert len(store) == 200
+    assert store.ingest_report.rejected.empty
+
+
+def test_suite_emits_json(tmp_path):
+    output = tmp_path / 'results.json'
+    main(['--sizes', '500', '--formats', 'csv', '--repeat', '1', '--data-dir', str(tmp_path), '--output', str(output)])
+
+    report = json.loads(output.read_text(encoding='utf-8'))
+    assert [item['benchmark'] for item in report['results']] == list(BENCHMARKS)
+    assert all(item['rows'] == 500 and item['min'] >= 0 for item in report['results'])
+    assert report['environment']['pandas'] == pd.__version__
+
+    comparison = compare(report, report)
+    assert {item['ratio'] for item in comparison if item['baseline'] > 0} == {1.0}
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.cashback import CashbackRules, calculate_cashback, cashback_aggregates, cashback_records
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame({
+        'Дата операции': pd.to_datetime(['2021-12-01 10:00:00', '2021-12-05 10:00:00', '2021-12-10 10:00:00',
+                                         '2021-12-15 10:00:00', '2021-11-20 10:00:00', '2021-12-20 10:00:00']),
+        'Номер карты': ['7197', '7197', '7197', '4556', '4556', None],
+        'Сумма операции': [-1000.0, -2000.0, -500.0, -3000.0, -400.0, -100.0],
+        'Категория': ['Супермаркеты', 'Фастфуд', 'Переводы', 'Супермаркеты', 'Аптеки', 'Фастфуд'],
+        'MCC': [5411.0, 5814.0, np.nan, 5499.0, 5912.0, 5814.0],
+    })
+
+
+def reference_cashback(df, rules):
+    """Построчный расчет тех же правил для сравнения с векторным"""
+    rows = df.assign(month=df['Дата операции'].dt.to_period('M'))
+    rows['counted'] = [0.0 if category in rules.excluded_categories else amount
+                       for category, amount in zip(rows['Категория'], rows['Сумма операции'])]
+    volume = rows.groupby([rows['Номер карты'].fillna(''), 'month'])['counted'].transform('sum').abs()
+    rates = []
+    for row, card_volume in zip(rows.itertuples(), volume):
+        rate = rules.default_rate
+        for bound, tier_rate in rules.tiers:
+            if card_volume >= bound:
+                rate = tier_rate
+        rate = rules.categories.get(row.Категория, rate)
+        if not pd.isna(row.MCC):
+            rate = rules.mcc.get(int(row.MCC), rate)
+        rates.append(rate)
+    rows['cashback'] = rows['counted'] * rates
+    for keys, cap in [(['Категория'], rules.category_caps), ([], None)]:
+        groups = rows.groupby([rows['Номер карты'].fillna(''), 'month'] + keys)['cashback']
+        sums = groups.transform('sum').abs()
+        limit = (rows['Категория'].map(cap) if cap is not None else pd.Series(rules.monthly_cap, index=rows.index))
+        limit = limit.astype('float64').fillna(np.inf)
+        rows['cashback'] = np.where(sums > limit, rows['cashback'] * limit / sums, rows['cashback'])
+    return rows.groupby('Номер карты')['cashback'].sum().round(2)
+
+
+def test_default_rules_match_previous_calculation(transactions):
+    result = calculate_cashback(transactions, CashbackRules())
+    expected = (transactions.groupby('Номер карты')['Сумма операции'].sum() * 0.01).round(2)
+    pd.testing.assert_series_equal(result.by_card['Кэшбэк'], expected, check_names=False)
+
+
+@pytest.mark.parametrize("rules, expected", [
+    (CashbackRules(categories={'Супермаркеты': 0.05}), {'7197': -75.0, '4556': -154.0}),
+    (CashbackRules(mcc={5411: 0.1}, categories={'Супермаркеты': 0.05}), {'7197': -125.0, '4556': -154.0}),
+    (CashbackRules(excluded_categories=['Переводы']), {'7197': -30.0, '4556': -34.0}),
+    (CashbackRules(monthly_cap=25), {'7197': -25.0, '4556': -29.0}),
+    (CashbackRules(categories={'Супермаркеты': 0.05}, category_caps={'Супермаркеты': 100}),
+     {'7197': -75.0, '4556': -104.0}),
+    (CashbackRules(tiers=[{'from': 0, 'rate': 0.01}, {'from': 3000, 'rate': 0.02}]), {'7197': -70.0, '4556': -64.0}),
+])
+def test_rules(transactions, rules, expected):
+    result = calculate_cashback(transactions, rules)
+    assert result.by_card['Кэшбэк'].to_dict() == expected
+
+
+def test_matches_row_by_row_reference():
+    rng = np.random.default_rng(7)
+    size = 2000
+    df = pd.DataFrame({
+        'Дата операции': pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 365, size), unit='D'),
+        'Номер карты': rng.choice(['7197', '4556', '5091', None], size),
+        'Сумма операции': rng.normal(-500, 800, size).round(2),
+        'Категория': rng.choice(['Супермаркеты', 'Фастфуд', 'Переводы', 'Аптеки', None], size),
+        'MCC': rng.choice([5411.0, 5814.0, 5912.0, np.nan], size),
+    })
+    rules = CashbackRules(categories={'Фастфуд': 0.03, 'Аптеки': 0.02}, mcc={5411: 0.05},
+                          excluded_categories=['Переводы'], monthly_cap=150, category_caps={'Фастфуд': 40},
+                          tiers=[{'from': 0, 'rate': 0.005}, {'from': 5000, 'rate': 0.01}])
+    result = calculate_cashback(df, rules)
+    pd.testing.assert_series_equal(result.by_card['Кэшбэк'], reference_cashback(df, rules), check_names=False)
+
+    categorical = df.astype({'Номер карты': 'category', 'Категория': 'category'})
+    pd.testing.assert_frame_equal(calculate_cashback(categorical, rules).by_card, result.by_card)
+
+    parts = [cashback_aggregates(df.iloc[:700]), cashback_aggregates(df.iloc[700:])]
+    aggregates = cashback_aggregates(pd.concat(parts))
+    assert len(aggregates) < len(df)
+    aggregated = calculate_cashback(aggregates, rules)
+    pd.testing.assert_frame_equal(aggregated.by_card, result.by_card)
+    pd.testing.assert_frame_equal(aggregated.by_category, result.by_category)
+
+
+def test_by_category(transactions):
+    result = calculate_cashback(transactions, CashbackRules(categories={'Супермаркеты': 0.05},
+                                                            excluded_categories=['Переводы']))
+    assert cashback_records(result) == [
+        {'Категория': 'Супермаркеты', 'Сумма операции': -4000.0, 'Кэшбэк': -200.0},
+        {'Категория': 'Фастфуд', 'Сумма операции': -2100.0, 'Кэшбэк': -21.0},
+        {'Категория': 'Аптеки', 'Сумма операции': -400.0, 'Кэшбэк': -4.0},
+        {'Категория': 'Переводы', 'Сумма операции': -500.0, 'Кэшбэк': 0.0},
+    ]
+
+
+def test_empty_frame(transactions):
+    rules = CashbackRules(monthly_cap=10, tiers=[{'from': 0, 'rate': 0.02}])
+    result = calculate_cashback(transactions.iloc[:0], rules)
+    assert result.by_card.empty and result.by_category.empty
+
+
+@pytest.mark.parametrize("settings", [
+    {'cashback': {'default_rate': 2}},
+    {'cashback': {'categories': {'Супермаркеты': 'пять'}}},
+    {'cashback': {'monthly_cap': -1}},
+    {'cashback': {'tiers': [{'rate': 0.01}]}},
+    {'cashback': ['Супермаркеты']},
+])
+def test_invalid_settings(settings):
+    with pytest.raises(ValueError):
+        CashbackRules.from_settings(settings)
+
+
+def test_from_settings():
+    rules = CashbackRules.from_settings({'cashback': {'mcc': {'5411': 0.05}, 'excluded_categories': ['Переводы']}})
+    assert rules.mcc == {5411: 0.05}
+    assert rules.excluded_categories == {'Переводы'}
+    assert CashbackRules.from_settings({}).default_rate == 0.01
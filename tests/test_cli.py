@@ -0,0 +1,184 @@
+import os
+import runpy
+import subprocess
+import sys
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.cli import DEFAULT_SETTINGS_FILE, build_parser, main
+from src.logging_config import stop_logging
+
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+"""Бюджет времени импорта командной строки в микросекундах"""
+IMPORT_BUDGET_US = 150000
+
+HEAVY_MODULES = {'pandas', 'numpy', 'requests', 'dateutil', 'dotenv', 'openpyxl'}
+
+
+@pytest.fixture(autouse=True)
+def logging_setup():
+    yield
+    stop_logging()
+
+
+def import_times(module):
+    """Функция получения накопленного времени импорта модулей по выводу python -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=PROJECT_DIRECTORY, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", ['src.cli', 'src.main'])
+def test_import_time_budget(module):
+    times = import_times(module)
+    assert not HEAVY_MODULES & {name.split('.')[0] for name in times}
+    assert times[module] < IMPORT_BUDGET_US
+
+
+@pytest.mark.parametrize("argv, command", [
+    (['dashboard', '2018-07-20 15:30:45'], 'dashboard'),
+    (['services', '--output', 'numbers.ndjson'], 'services'),
+    (['--compact', 'reports', 'Супермаркеты', '2021-12-31', '--custom'], 'reports'),
+])
+def test_build_parser(argv, command):
+    args = build_parser().parse_args(argv)
+    assert args.command == command
+
+
+def test_build_parser_requires_command():
+    with pytest.raises(SystemExit):
+        build_parser().parse_args([])
+
+
+@patch('src.utils.load_user_settings', return_value={})
+@patch('src.cli.load_store', return_value='store')
+@patch('src.views.main', return_value='{}')
+def test_main_dashboard(mock_main, mock_store, mock_settings, tmp_path, capsys):
+    code = main(['--log-file', str(tmp_path / 'main.log'), 'dashboard', '2018-07-20 15:30:45', '--budget', '0.5'])
+    assert code == 0
+    mock_settings.assert_called_once_with(DEFAULT_SETTINGS_FILE)
+    mock_main.assert_called_once_with('2018-07-20 15:30:45', 'store', budget=0.5, timings=False, settings={},
+                                      compact=False)
+    assert capsys.readouterr().out == '{}\n'
+
+
+@patch('src.utils.load_user_settings', return_value={})
+@patch('src.sqlite_store.SQLiteStore.from_file', return_value='sqlite')
+@patch('src.views.main', return_value='{}')
+def test_main_dashboard_sqlite(mock_main, mock_from_file, mock_settings, tmp_path, capsys):
+    database = str(tmp_path / 'operations.sqlite3')
+    code = main(['--log-file', str(tmp_path / 'main.log'), '--file', 'operations.xlsx', '--sqlite', database,
+                 'dashboard', '2018-07-20 15:30:45'])
+    assert code == 0
+    mock_from_file.assert_called_once_with(database, 'operations.xlsx')
+    mock_main.assert_called_once_with('2018-07-20 15:30:45', 'sqlite', budget=None, timings=False, settings={},
+                                      compact=False)
+
+
+@patch('src.cli.load_store', return_value='store')
+@patch('src.reports.spending_by_category_custom', return_value=pd.DataFrame({'Категория': ['Супермаркеты']}))
+def test_main_reports(mock_report, mock_store, tmp_path, capsys):
+    code = main(['--log-file', str(tmp_path / 'main.log'), 'reports', 'Супермаркеты', '2021-12-31', '--custom'])
+    assert code == 0
+    mock_report.assert_called_once_with('store', 'Супермаркеты', '2021-12-31')
+    assert 'Найдено 1 транзакций' in capsys.readouterr().out
+
+
+@patch('src.cli.load_store', side_effect=FileNotFoundError('operations.xlsx'))
+def test_main_returns_error_code(mock_store, tmp_path, capsys):
+    assert main(['--log-file', str(tmp_path / 'main.log'), 'services']) == 1
+    assert 'operations.xlsx' in capsys.readouterr().err
+
+
+@patch('src.utils.load_user_settings', return_value={})
+@patch('src.cli.load_store', return_value='store')
+@patch('src.views.main', return_value='{}')
+def test_main_writes_profile_and_metrics(mock_main, mock_store, mock_settings, tmp_path, capsys):
+    profile, metrics = tmp_path / 'dashboard.prof', tmp_path / 'metrics.prom'
+    code = main(['--log-file', str(tmp_path / 'main.log'), '--profile', str(profile), '--metrics', str(metrics),
+                 'dashboard', '2018-07-20 15:30:45', '--timings'])
+    assert code == 0
+    mock_main.assert_called_once_with('2018-07-20 15:30:45', 'store', budget=None, timings=True, settings={},
+                                      compact=False)
+    assert profile.stat().st_size > 0
+    assert metrics.exists()
+
+
+@patch('src.utils.load_user_settings', return_value={'cashback': {'default_rate': 0.02}})
+@patch('src.batch.find_statements', return_value=['a.xlsx', 'b.xlsx'])
+@patch('src.batch.run_batch', return_value={'files': 2, 'seconds': 1.0, 'failed': []})
+def test_main_batch(mock_run, mock_find, mock_settings, tmp_path, capsys):
+    code = main(['--log-file', str(tmp_path / 'main.log'), 'batch', 'statements', '2021-12-31 00:00:00',
+                 'Супермаркеты', '--workers', '4', '--output-dir', str(tmp_path), '--settings', 'settings.json'])
+    assert code == 0
+    mock_settings.assert_called_once_with('settings.json')
+    assert mock_run.call_args.kwargs['settings'] == {'cashback': {'default_rate': 0.02}}
+    mock_find.assert_called_once_with('statements')
+    assert mock_run.call_args.args == (['a.xlsx', 'b.xlsx'], str(tmp_path), '2021-12-31 00:00:00', 'Супермаркеты',
+                                       None)
+    assert mock_run.call_args.kwargs['workers'] == 4
+    assert 'Обработано 2 выписок' in capsys.readouterr().out
+
+
+@patch('src.utils.load_user_settings', return_value={})
+@patch('src.cli.load_store', return_value='store')
+@patch('src.views.main', return_value='{}')
+@patch('src.reports.spending_by_category_custom', return_value=pd.DataFrame({'Категория': ['Дом и ремонт']}))
+@patch('src.reports.spending_by_category', side_effect=KeyError('Категория'))
+@patch('src.services.extract_transactions_with_mobile_numbers')
+def test_main_all(mock_services, mock_report, mock_custom, mock_main, mock_store, mock_settings, tmp_path, capsys):
+    code = main(['--log-file', str(tmp_path / 'main.log'), 'all', '2018-07-20 15:30:45', 'Супермаркеты', '2021-12-31',
+                 '--custom-date', '2020-12-31'])
+    assert code == 1
+    mock_store.assert_called_once()
+    mock_services.assert_called_once_with('store', output=sys.stdout)
+    mock_report.assert_called_once_with('store', 'Супермаркеты', '2021-12-31')
+    mock_custom.assert_called_once_with('store', 'Дом и ремонт', '2020-12-31')
+    mock_main.assert_called_once_with('2018-07-20 15:30:45', 'store', budget=None, settings={})
+    assert capsys.readouterr().out == 'Найдено 1 транзакций по категории Дом и ремонт\n{}\n'
+
+
+@patch('src.utils.load_user_settings', return_value={})
+@patch('src.views.main', return_value='{}')
+def test_main_all_saves_both_reports(mock_main, mock_settings, tmp_path, capsys):
+    operations = tmp_path / 'operations.csv'
+    pd.DataFrame({
+        'Дата операции': ['15.12.2021 10:00:00', '20.11.2021 12:00:00', '10.12.2020 09:00:00', '01.01.2019 09:00:00'],
+        'Категория': ['Супермаркеты', 'Супермаркеты', 'Дом и ремонт', 'Дом и ремонт'],
+        'Сумма операции': [-100.0, -50.0, -700.0, -30.0],
+    }).to_csv(operations, index=False)
+
+    with patch('src.reports.logs_directory', str(tmp_path)):
+        code = main(['--log-file', str(tmp_path / 'main.log'), '--file', str(operations), 'all',
+                     '2018-07-20 15:30:45', 'Супермаркеты', '2021-12-31', '--custom-date', '2020-12-31'])
+
+    assert code == 0
+    assert pd.read_csv(tmp_path / 'reports')['Сумма операции'].tolist() == [-100.0, -50.0]
+    assert pd.read_csv(tmp_path / 'custom_report')['Сумма операции'].tolist() == [-700.0]
+    out = capsys.readouterr().out
+    assert 'Найдено 2 транзакций по категории Супермаркеты' in out
+    assert 'Найдено 1 транзакций по категории Дом и ремонт' in out
+
+
+@patch('src.cli.main', return_value=0)
+def test_src_main_runs_full_pipeline_without_arguments(mock_main):
+    with patch.object(sys, 'argv', ['src/main.py']), pytest.raises(SystemExit) as exit_info:
+        runpy.run_module('src.main', run_name='__main__')
+    assert exit_info.value.code == 0
+    mock_main.assert_called_once_with(['all', '2018-07-20 15:30:45', 'Супермаркеты', '2021-12-31',
+                                       '--custom-category', 'Дом и ремонт', '--custom-date', '2020-12-31'])
+
+
+@patch('src.server.run_server')
+def test_main_serve(mock_run, tmp_path):
+    code = main(['--log-file', str(tmp_path / 'main.log'), '--file', 'operations.xlsx', 'serve', '--port', '9000',
+                 '--settings', 'settings.json', '--poll-interval', '0'])
+    assert code == 0
+    mock_run.assert_called_once_with('operations.xlsx', 'settings.json', '127.0.0.1', 9000, 0.0, 4, False)
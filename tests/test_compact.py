@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+from src.compact import column_memory, compact_transactions, expand_transactions, memory_report, to_kopecks
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame({
+        'Дата операции': pd.to_datetime(['2021-12-31 16:44:00', '2021-12-30 10:00:00', '2021-12-29 09:00:00',
+                                         '2021-12-28 08:00:00']),
+        'Номер карты': ['7197', '7197', '5091', '7197'],
+        'Сумма операции': [-160.89, -0.29, 64.0, -1.005],
+        'Кэшбэк': [None, None, 1.0, None],
+        'Категория': ['Супермаркеты', 'Супермаркеты', 'Пополнения', 'Супермаркеты'],
+        'Описание': ['Магнит', 'Колхоз', 'Пополнение', 'Вкусно']
+    })
+
+
+def test_to_kopecks():
+    assert to_kopecks(pd.Series([-160.89, 0.29, 1.005])).tolist() == [-16089, 29, 100]
+    assert to_kopecks(pd.Series([-160.89, None])).dtype == 'Int64'
+
+
+def test_compact_transactions(transactions):
+    result = compact_transactions(transactions)
+
+    assert result.columns.tolist() == transactions.columns.tolist()
+    assert result['Сумма операции'].dtype == 'int64'
+    assert result['Сумма операции'].tolist() == [-16089, -29, 6400, -100]
+    assert isinstance(result['Номер карты'].dtype, pd.CategoricalDtype)
+    assert isinstance(result['Категория'].dtype, pd.CategoricalDtype)
+    assert result['Описание'].dtype == object
+
+
+def test_expand_transactions(transactions):
+    result = expand_transactions(compact_transactions(transactions))
+    assert result['Сумма операции'].tolist() == [-160.89, -0.29, 64.0, -1.0]
+    assert result.drop(columns='Сумма операции').dtypes.equals(transactions.drop(columns='Сумма операции').dtypes)
+    assert isinstance(expand_transactions(compact_transactions(transactions), categorical=True)['Категория'].dtype,
+                      pd.CategoricalDtype)
+
+
+def test_memory_report(transactions):
+    report = memory_report(column_memory(transactions), column_memory(compact_transactions(transactions)))
+    assert report.index.tolist()[:2] == ['Дата операции', 'Номер карты']
+    assert report.loc['Категория', 'После'] < report.loc['Категория', 'До']
+    assert report.loc['Итого', 'До'] == report['До'].drop('Итого').sum()
+    assert (report['Экономия'] == report['До'] - report['После']).all()
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from src.ingest import ingest_transactions, parse_date_column, strip_card_masks
+
+
+@pytest.fixture
+def raw_transactions():
+    return pd.DataFrame({
+        'Дата операции': ['31.12.2021 16:44:00', '31.12.2021 99:00:00', '2021-12-30T10:00:00', '30.12.2021 08:00:00'],
+        'Дата платежа': ['31.12.2021', '31.12.2021', '30.12.2021', None],
+        'Номер карты': ['*7197', ' *5091 ', None, '*'],
+        'Сумма операции': ['-160.89', '-64', '-100', 'abc'],
+        'Категория': ['Супермаркеты', 'Супермаркеты', 'Фастфуд', 'Фастфуд']
+    })
+
+
+def test_ingest_transactions(raw_transactions):
+    result, report = ingest_transactions(raw_transactions)
+
+    assert result.index.tolist() == [0, 2]
+    assert result['Дата операции'].dtype == 'datetime64[ns]'
+    assert result['Дата операции'].tolist() == [pd.Timestamp('2021-12-31 16:44:00'),
+                                                pd.Timestamp('2021-12-30 10:00:00')]
+    assert result['Сумма операции'].tolist() == [-160.89, -100.0]
+    assert result['Номер карты'][0] == '7197'
+    assert pd.isna(result['Номер карты'][2])
+
+    assert report.rows == 4
+    assert report.rows_per_second > 0
+    assert report.rejected.index.tolist() == [1, 3]
+    assert report.rejected['Причина'].tolist() == ['некорректная дата операции', 'некорректная сумма операции']
+
+
+def test_ingest_transactions_does_not_mutate_input(raw_transactions):
+    original = raw_transactions.copy()
+    ingest_transactions(raw_transactions)
+    pd.testing.assert_frame_equal(raw_transactions, original)
+
+
+def test_ingest_transactions_without_date_columns():
+    result, report = ingest_transactions(pd.DataFrame({'Описание': ['Магнит', None]}))
+    assert result['Описание'].tolist() == ['Магнит', None]
+    assert report.rejected.empty
+
+
+def test_parse_date_column_keeps_datetimes():
+    dates = pd.Series(pd.to_datetime(['2021-12-31 16:44:00']))
+    pd.testing.assert_series_equal(parse_date_column(dates, '%d.%m.%Y %H:%M:%S'), dates)
+
+
+def test_strip_card_masks():
+    assert strip_card_masks(pd.Series(['*7197', '1234 5678', None])).tolist()[:2] == ['7197', '12345678']
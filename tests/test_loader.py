@@ -0,0 +1,159 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.loader import load_operations, file_fingerprint, parse_dates, iter_operation_batches
+
+
+@pytest.fixture
+def operations_file(tmp_path):
+    df = pd.DataFrame({
+        'Дата операции': ['31.12.2021 16:44:00', '30.12.2021 10:00:00'],
+        'Дата платежа': ['31.12.2021', '30.12.2021'],
+        'Номер карты': ['*7197', '*5091'],
+        'Сумма операции': [-160.89, -64.0],
+        'Категория': ['Супермаркеты', 'Фастфуд']
+    })
+    file_path = tmp_path / 'operations.xlsx'
+    df.to_excel(file_path, index=False)
+    return file_path
+
+
+def test_parse_dates():
+    df = pd.DataFrame({'Дата операции': ['01.07.2018 10:00:00'], 'Дата платежа': ['01.07.2018']})
+    result = parse_dates(df)
+    assert result['Дата операции'][0] == pd.Timestamp('2018-07-01 10:00:00')
+    assert result['Дата платежа'][0] == pd.Timestamp('2018-07-01')
+
+
+def test_load_operations_parses_iso_dates(tmp_path):
+    file_path = tmp_path / 'operations.csv'
+    pd.DataFrame({
+        'Дата операции': ['31.12.2021 16:44:00', '2021-12-30T10:00:00', 'вчера'],
+        'Дата платежа': ['31.12.2021', '2021-12-30', None],
+    }).to_csv(file_path, index=False)
+    cache_dir = str(tmp_path / 'cache')
+
+    for _ in range(2):
+        result = load_operations(file_path, cache_dir=cache_dir)
+        expected = [pd.Timestamp('2021-12-31 16:44:00'), pd.Timestamp('2021-12-30 10:00:00')]
+        assert result['Дата операции'].tolist()[:2] == expected
+        assert pd.isna(result['Дата операции'][2])
+        assert result['Дата платежа'][1] == pd.Timestamp('2021-12-30')
+
+
+def test_load_operations_ignores_cache_of_other_version(operations_file, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    load_operations(operations_file, cache_dir=str(cache_dir))
+
+    with patch('src.loader.CACHE_VERSION', 0), patch('src.loader.pd.read_excel', wraps=pd.read_excel) as mock_read:
+        load_operations(operations_file, cache_dir=str(cache_dir))
+    mock_read.assert_called_once()
+
+
+def test_load_operations_uses_cache(operations_file, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    first = load_operations(operations_file, cache_dir=str(cache_dir))
+
+    with patch('src.loader.pd.read_excel') as mock_read_excel:
+        second = load_operations(operations_file, cache_dir=str(cache_dir))
+        mock_read_excel.assert_not_called()
+
+    pd.testing.assert_frame_equal(first, second)
+    assert pd.api.types.is_datetime64_any_dtype(second['Дата операции'])
+
+
+def test_load_operations_invalidates_cache(operations_file, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    load_operations(operations_file, cache_dir=str(cache_dir))
+
+    pd.DataFrame({'Дата операции': ['01.01.2022 00:00:00'], 'Категория': ['Такси']}).to_excel(
+        operations_file, index=False)
+    result = load_operations(operations_file, cache_dir=str(cache_dir))
+
+    assert len(result) == 1
+    assert result['Категория'][0] == 'Такси'
+
+
+def test_load_operations_reuses_cache_after_touch(operations_file, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    load_operations(operations_file, cache_dir=str(cache_dir))
+    stat = os.stat(operations_file)
+    os.utime(operations_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    with patch('src.loader.pd.read_excel') as mock_read_excel:
+        load_operations(operations_file, cache_dir=str(cache_dir))
+        mock_read_excel.assert_not_called()
+
+
+def test_file_fingerprint(operations_file):
+    fingerprint = file_fingerprint(operations_file)
+    assert fingerprint['size'] == os.path.getsize(operations_file)
+    assert len(fingerprint['sha256']) == 64
+
+
+@pytest.mark.parametrize("chunk_size, expected_sizes", [
+    (1, [1, 1]),
+    (2, [2]),
+    (10, [2])
+])
+def test_iter_operation_batches_excel(operations_file, chunk_size, expected_sizes):
+    batches = list(iter_operation_batches(operations_file, chunk_size=chunk_size))
+    assert [len(batch) for batch in batches] == expected_sizes
+    result = pd.concat(batches)
+    assert result.index.tolist() == [0, 1]
+    assert result['Дата операции'].tolist() == [pd.Timestamp('2021-12-31 16:44:00'),
+                                                pd.Timestamp('2021-12-30 10:00:00')]
+
+
+def test_iter_operation_batches_csv(tmp_path):
+    file_path = tmp_path / 'operations.csv'
+    pd.DataFrame({'Дата операции': ['31.12.2021 16:44:00'] * 5, 'Сумма операции': range(5)}).to_csv(
+        file_path, index=False)
+    batches = list(iter_operation_batches(file_path, chunk_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert pd.api.types.is_datetime64_any_dtype(batches[0]['Дата операции'])
+
+
+def test_iter_operation_batches_invalid_chunk(operations_file):
+    with pytest.raises(ValueError):
+        list(iter_operation_batches(operations_file, chunk_size=0))
+
+
+def test_load_operations_caches_npz_without_pyarrow(tmp_path):
+    file_path = tmp_path / 'operations.csv'
+    pd.DataFrame({
+        'Дата операции': ['31.12.2021 16:44:00', '30.12.2021 10:00:00', '29.12.2021 09:00:00'],
+        'Номер карты': ['*7197', None, '*5091'],
+        'Сумма операции': [-160.89, -64.0, 5.0],
+        'Бонусы': [3, 1, 0],
+    }).to_csv(file_path, index=False)
+    cache_dir = tmp_path / 'cache'
+
+    with patch('src.loader._parquet_available', return_value=False):
+        first = load_operations(file_path, cache_dir=str(cache_dir))
+        with patch('src.loader.pd.read_csv') as mock_read_csv:
+            second = load_operations(file_path, cache_dir=str(cache_dir))
+            mock_read_csv.assert_not_called()
+
+    pd.testing.assert_frame_equal(first, second)
+    meta = json.loads((cache_dir / 'operations.csv.meta.json').read_text(encoding='utf-8'))
+    assert meta['format'] == 'npz'
+    with np.load(cache_dir / 'operations.csv.data', allow_pickle=False) as data:
+        assert data['columns'].tolist() == list(first.columns)
+
+
+def test_load_operations_ignores_pickle_cache(operations_file, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    load_operations(operations_file, cache_dir=str(cache_dir))
+    meta_path = cache_dir / 'operations.xlsx.meta.json'
+    meta = json.loads(meta_path.read_text(encoding='utf-8'))
+    meta_path.write_text(json.dumps({**meta, 'format': 'pickle'}), encoding='utf-8')
+
+    with patch('src.loader.pd.read_pickle') as mock_read_pickle, \
+            patch('src.loader.pd.read_excel', wraps=pd.read_excel) as mock_read_excel:
+        load_operations(operations_file, cache_dir=str(cache_dir))
+    mock_read_pickle.assert_not_called()
+    mock_read_excel.assert_called_once()
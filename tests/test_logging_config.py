@@ -0,0 +1,78 @@
+import logging
+import pandas as pd
+import pytest
+from src.logging_config import configure_logging, describe, log_summary, parse_module_levels, stop_logging
+
+
+class ReprCounter:
+    calls = 0
+
+    def __repr__(self):
+        ReprCounter.calls += 1
+        return 'ReprCounter()'
+
+
+@pytest.fixture
+def logging_setup(tmp_path):
+    root = logging.getLogger()
+    level = root.level
+    log_file = tmp_path / 'logs' / 'main.log'
+    stop_logging()
+    yield log_file
+    stop_logging()
+    root.setLevel(level)
+
+
+def test_describe_dataframe_uses_shape_and_hash():
+    df = pd.DataFrame({'Описание': ['Магнит'] * 1000, 'Сумма операции': range(1000)})
+    summary = describe(df)
+    assert summary.startswith('DataFrame(shape=(1000, 2), hash=')
+    assert 'Магнит' not in summary
+    assert describe(df) == summary
+    assert describe(df.assign(**{'Сумма операции': 0})) != summary
+
+
+@pytest.mark.parametrize("obj, expected", [
+    (('Супермаркеты', None), "('Супермаркеты', None)"),
+    ({'date': '2021-12-31'}, "{'date': '2021-12-31'}"),
+    (list(range(100)), 'list(len=100)'),
+    ('x' * 500, "'" + 'x' * 199 + '...'),
+])
+def test_describe(obj, expected):
+    assert describe(obj) == expected
+
+
+def test_describe_nested_dataframe():
+    assert describe((pd.Series([1, 2]), 'Такси')).startswith('(Series(shape=(2,), hash=')
+
+
+def test_log_summary_is_lazy():
+    logger = logging.getLogger('tests.lazy')
+    logger.setLevel(logging.INFO)
+    ReprCounter.calls = 0
+    logger.debug('%s', log_summary(ReprCounter()))
+    assert ReprCounter.calls == 0
+    assert str(log_summary(ReprCounter())) == 'ReprCounter()'
+
+
+def test_parse_module_levels():
+    levels = parse_module_levels('src.views=debug, src.store=WARNING,')
+    assert levels == {'src.views': 'DEBUG', 'src.store': 'WARNING'}
+
+
+def test_configure_logging_writes_through_queue(logging_setup, monkeypatch):
+    monkeypatch.setenv('LOG_LEVELS', 'tests.env_module=ERROR')
+    configure_logging('INFO', str(logging_setup), {'tests.quiet_module': 'WARNING'})
+    configure_logging('DEBUG', str(logging_setup))
+
+    assert logging.getLogger('tests.quiet_module').level == logging.WARNING
+    assert logging.getLogger('tests.env_module').level == logging.ERROR
+    logging.getLogger('tests.module').info('Запись %s', 1)
+    logging.getLogger('tests.module').debug('Отладка')
+    logging.getLogger('tests.quiet_module').info('Скрыто')
+    stop_logging()
+
+    content = logging_setup.read_text(encoding='utf-8')
+    assert 'tests.module - INFO - Запись 1' in content
+    assert 'Отладка' not in content
+    assert 'Скрыто' not in content
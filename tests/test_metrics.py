@@ -0,0 +1,102 @@
+import contextvars
+import json
+import pstats
+import threading
+import pytest
+from src.metrics import STAGE_CALLS, STAGE_DURATION, MetricsRegistry, collect_timings, profiled, registry, timed
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def calls(stage, status):
+    return next((item['value'] for item in registry.snapshot()['counters'].get(STAGE_CALLS, [])
+                 if item['labels'] == {'stage': stage, 'status': status}), 0)
+
+
+def test_timed_decorator():
+    @timed('test.decorated')
+    def work(value):
+        return value * 2
+
+    assert work(2) == 4
+    assert work(3) == 6
+    histogram = registry.snapshot()['histograms'][STAGE_DURATION][0]
+    assert histogram['labels'] == {'stage': 'test.decorated'}
+    assert histogram['count'] == 2
+    assert histogram['buckets']['+Inf'] == 2
+    assert calls('test.decorated', 'ok') == 2
+
+
+def test_timed_records_errors():
+    with pytest.raises(ValueError):
+        with timed('test.failing'):
+            raise ValueError('ошибка')
+    assert calls('test.failing', 'error') == 1
+    assert calls('test.failing', 'ok') == 0
+
+
+def test_timed_nested_same_stage():
+    stage = timed('test.nested')
+    with stage:
+        with stage:
+            pass
+    assert calls('test.nested', 'ok') == 2
+
+
+def test_to_prometheus():
+    metrics = MetricsRegistry()
+    metrics.increment('requests_total', stage='a')
+    metrics.observe('latency_seconds', 0.003, stage='a')
+    text = metrics.to_prometheus()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{stage="a"} 1' in text
+    assert 'latency_seconds_bucket{stage="a",le="0.001"} 0' in text
+    assert 'latency_seconds_bucket{stage="a",le="0.005"} 1' in text
+    assert 'latency_seconds_bucket{stage="a",le="+Inf"} 1' in text
+    assert 'latency_seconds_count{stage="a"} 1' in text
+
+
+@pytest.mark.parametrize('filename', ['metrics.json', 'metrics.prom'])
+def test_write(tmp_path, filename):
+    metrics = MetricsRegistry()
+    metrics.increment('requests_total', stage='a')
+    path = tmp_path / 'nested' / filename
+    metrics.write(str(path))
+    content = path.read_text(encoding='utf-8')
+    if filename.endswith('.json'):
+        assert json.loads(content)['counters']['requests_total'] == [{'labels': {'stage': 'a'}, 'value': 1}]
+    else:
+        assert content == metrics.to_prometheus()
+
+
+def test_collect_timings_across_threads():
+    def work():
+        with timed('test.thread'):
+            pass
+
+    with collect_timings() as timings:
+        with timed('test.main'):
+            thread = threading.Thread(target=contextvars.copy_context().run, args=(work,))
+            thread.start()
+            thread.join()
+    with timed('test.outside'):
+        pass
+
+    assert set(timings) == {'test.main', 'test.thread'}
+
+
+def test_profiled(tmp_path):
+    path = tmp_path / 'run.prof'
+    with profiled(str(path)):
+        sum(range(1000))
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+def test_profiled_disabled():
+    with profiled(None):
+        pass
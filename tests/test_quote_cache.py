@@ -0,0 +1,70 @@
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.quote_cache import QuoteCache
+
+
+@pytest.fixture
+def fetch_many():
+    return MagicMock(side_effect=lambda keys: {key: len(key) for key in keys})
+
+
+def test_quote_cache_hit_and_miss(fetch_many):
+    cache = QuoteCache(path=None, ttl=60)
+    assert cache.get_or_fetch_many(['USDEUR', 'USDUSD'], fetch_many) == {'USDEUR': 6, 'USDUSD': 6}
+    assert cache.get_or_fetch_many(['USDEUR', 'USDUSD'], fetch_many) == {'USDEUR': 6, 'USDUSD': 6}
+    assert fetch_many.call_count == 1
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['hits'] == 2
+
+
+def test_quote_cache_fetches_only_missing(fetch_many):
+    cache = QuoteCache(path=None, ttl=60)
+    cache.get_or_fetch_many(['USDEUR'], fetch_many)
+    cache.get_or_fetch_many(['USDEUR', 'USDCNY'], fetch_many)
+    fetch_many.assert_called_with(['USDCNY'])
+
+
+def test_quote_cache_stale_while_revalidate():
+    cache = QuoteCache(path=None, ttl=0.05)
+    values = iter([1.0, 2.0])
+    assert cache.get_or_fetch('stock:AAPL', lambda: next(values)) == 1.0
+    time.sleep(0.1)
+
+    assert cache.get_or_fetch('stock:AAPL', lambda: next(values)) == 1.0
+    cache._executor.shutdown(wait=True)
+
+    assert cache.stats()['stale'] == 1
+    assert cache.stats()['refreshes'] == 1
+    assert cache.get_or_fetch('stock:AAPL', lambda: 3.0) == 2.0
+
+
+def test_quote_cache_persists_between_instances(tmp_path, fetch_many):
+    path = str(tmp_path / 'quotes.sqlite3')
+    QuoteCache(path=path, ttl=60).get_or_fetch_many(['stock:AAPL'], fetch_many)
+
+    other = QuoteCache(path=path, ttl=60)
+    assert other.get_or_fetch_many(['stock:AAPL'], fetch_many) == {'stock:AAPL': 10}
+    assert fetch_many.call_count == 1
+    assert other.stats()['hits'] == 1
+
+
+def test_quote_cache_propagates_fetch_errors():
+    cache = QuoteCache(path=None)
+    with pytest.raises(ValueError):
+        cache.get_or_fetch('stock:AAPL', MagicMock(side_effect=ValueError('нет цены')))
+    assert cache.get_or_fetch('stock:AAPL', lambda: 1.0) == 1.0
+
+
+def test_quote_cache_refreshes_with_refresh_function():
+    cache = QuoteCache(path=None, ttl=0.05)
+    fetch, refresh = MagicMock(return_value=1.0), MagicMock(return_value=2.0)
+    assert cache.get_or_fetch('stock:AAPL', fetch, refresh) == 1.0
+    time.sleep(0.1)
+
+    assert cache.get_or_fetch('stock:AAPL', fetch, refresh) == 1.0
+    cache._executor.shutdown(wait=True)
+
+    assert fetch.call_count == 1
+    refresh.assert_called_once()
+    assert cache.get_or_fetch('stock:AAPL', fetch) == 2.0
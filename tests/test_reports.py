@@ -1,7 +1,15 @@
 import pytest
 import pandas as pd
 from io import StringIO
-from src.reports import spending_by_category
+from unittest.mock import patch
+from src.reports import spending_by_categories, spending_by_category, spending_by_category_from_batches
+from src.store import TransactionStore
+
+
+@pytest.fixture(autouse=True)
+def reports_directory(tmp_path):
+    with patch('src.reports.logs_directory', str(tmp_path)):
+        yield tmp_path
 
 
 @pytest.fixture
@@ -53,3 +61,72 @@ def test_spending_by_category(transaction_data, category, test_date, expected_co
     expected_df = pd.DataFrame(expected_data)
 
     pd.testing.assert_frame_equal(result.reset_index(drop=True), expected_df)
+
+
+def test_spending_by_category_from_batches(transaction_data):
+    batches = [transaction_data.iloc[:2], transaction_data.iloc[2:4], transaction_data.iloc[4:]]
+    result = spending_by_category_from_batches(iter(batches), 'Питание', '2022-05-15')
+    expected = spending_by_category(transaction_data, 'Питание', '2022-05-15')
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("category, test_date", [
+    ('Питание', '2022-04-15'),
+    ('Развлечения', '2022-04-15'),
+    ('Питание', '2022-05-15'),
+    ('Питание', '2021-01-01')
+])
+def test_spending_by_category_with_store(transaction_data, category, test_date):
+    store = TransactionStore(transaction_data.iloc[::-1].reset_index(drop=True))
+    expected = spending_by_category(store.df.copy(), category, test_date)
+    result = spending_by_category(store, category, test_date)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_spending_by_category_compact_store_matches(reports_directory):
+    transactions = pd.DataFrame({
+        'Дата операции': ['15.01.2022 10:00:00', '15.02.2022 11:00:00', '15.03.2022 12:00:00', '15.04.2022 13:00:00'],
+        'Дата платежа': ['16.01.2022', '16.02.2022', '16.03.2022', '16.04.2022'],
+        'Номер карты': ['*7197', '*7197', '*5091', '*7197'],
+        'Статус': 'OK',
+        'Сумма операции': [-100.0, -50.5, -200.0, -150.25],
+        'Валюта операции': 'RUB',
+        'Кэшбэк': [1.0, None, 2.0, None],
+        'Категория': ['Питание', 'Развлечения', 'Питание', 'Питание'],
+        'MCC': [5411.0, 7832.0, None, 5411.0],
+        'Описание': ['Магнит', 'Кино', 'Лента', 'Магнит'],
+        'Бонусы (включая кэшбэк)': [1, 0, 4, 3],
+        'Округление на инвесткопилку': 0,
+    })
+    reports = []
+    for compact in (False, True):
+        result = spending_by_category(TransactionStore(transactions, compact=compact), 'Питание', '2022-04-15')
+        output_file = reports_directory / 'reports'
+        reports.append((result, output_file.read_text(encoding='utf-8')))
+        output_file.unlink()
+
+    (expected, expected_file), (result, result_file) = reports
+    assert len(expected) == 2
+    pd.testing.assert_frame_equal(result, expected)
+    assert result_file == expected_file
+
+
+@pytest.mark.parametrize("use_store", [False, True])
+def test_spending_by_categories(transaction_data, use_store):
+    categories = ['Питание', 'Развлечения', 'Транспорт']
+    dates = ['2022-04-15', '2022-05-15', '2021-01-01']
+    source = TransactionStore(transaction_data.copy()) if use_store else transaction_data.copy()
+
+    result = spending_by_categories(source, categories, dates)
+
+    assert len(result) == len(categories) * len(dates)
+    for row in result.itertuples(index=False):
+        expected = spending_by_category(transaction_data.copy(), row[0], row[1].strftime('%Y-%m-%d'))
+        assert row[3] == len(expected)
+        assert row[4] == expected['Сумма операции'].sum()
+
+
+def test_spending_by_categories_empty(transaction_data):
+    result = spending_by_categories(transaction_data, [], ['2022-04-15'])
+    assert result.empty
+    assert list(result.columns) == ['Категория', 'Дата', 'Начало периода', 'Количество операций', 'Сумма операций']
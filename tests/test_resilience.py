@@ -0,0 +1,86 @@
+import time
+import pytest
+import requests
+from unittest.mock import MagicMock
+from src.resilience import CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, get_breaker, guarded_get, \
+    reset_breakers
+
+
+@pytest.fixture(autouse=True)
+def circuit_breakers():
+    reset_breakers()
+    yield
+    reset_breakers()
+
+
+def test_deadline_timeout():
+    deadline = Deadline(0.2)
+    assert 0 < deadline.timeout(cap=10.0) <= 0.2
+    assert deadline.timeout(cap=0.05) == 0.05
+
+
+def test_deadline_exceeded():
+    deadline = Deadline(0.0)
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout()
+
+
+def test_circuit_breaker_opens_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == 'half-open'
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_circuit_breaker_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+
+def test_guarded_get_derives_timeout_and_trips_breaker():
+    session = MagicMock()
+    session.get.side_effect = requests.ConnectionError('нет соединения')
+    deadline = Deadline(1.0)
+
+    for _ in range(3):
+        with pytest.raises(requests.ConnectionError):
+            guarded_get(session, 'https://example.com/query', deadline)
+    assert session.get.call_args.kwargs['timeout'] <= 1.0
+
+    with pytest.raises(CircuitOpenError):
+        guarded_get(session, 'https://example.com/query', deadline)
+    assert session.get.call_count == 3
+
+
+@pytest.mark.parametrize("error", [None, KeyboardInterrupt])
+def test_guarded_get_keeps_trial_available_when_half_open(error):
+    session = MagicMock()
+    session.get.side_effect = [requests.ConnectionError('нет соединения')] + ([error()] if error else [])
+    with pytest.raises(requests.ConnectionError):
+        guarded_get(session, 'https://example.com/query', Deadline(1.0))
+    breaker = get_breaker('example.com')
+    breaker.opened_at = time.monotonic() - breaker.cooldown
+
+    if error is None:
+        with pytest.raises(DeadlineExceeded):
+            guarded_get(session, 'https://example.com/query', Deadline(0.0))
+    else:
+        with pytest.raises(error):
+            guarded_get(session, 'https://example.com/query', Deadline(1.0))
+
+    assert breaker.state == 'half-open'
+    assert breaker.allow()
@@ -0,0 +1,103 @@
+import datetime
+import json
+from io import StringIO
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src import serialization
+from src.serialization import column_values, dumps, frame_records, write_ndjson
+from src.utils import convert_timestamps
+
+
+@pytest.fixture(params=['json', 'orjson'])
+def backend(request):
+    module = pytest.importorskip('orjson') if request.param == 'orjson' else None
+    with patch('src.serialization.fast_backend', return_value=module):
+        yield request.param
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame({
+        'Дата операции': pd.to_datetime(['2021-12-31 16:44:00', None, '2021-12-30 10:00:00.25'], format='ISO8601'),
+        'Сумма операции': [-160.89, float('nan'), 500.0],
+        'Номер карты': ['*7197', None, '*4556'],
+        'Бонусы (включая кэшбэк)': np.array([3, 0, 10], dtype='int64'),
+        'MCC': pd.array([5411, None, 5814], dtype='Int64'),
+    })
+
+
+@pytest.mark.parametrize("values, expected", [
+    (pd.to_datetime(['2021-12-31 16:44:00', None]), ['2021-12-31T16:44:00', None]),
+    (pd.to_datetime(['2021-12-31 00:00:00', '2021-12-30 10:00:00.5'], format='ISO8601'),
+     ['2021-12-31T00:00:00', '2021-12-30T10:00:00.500000']),
+    ([1.5, float('nan')], [1.5, None]),
+    (np.array([1, 2], dtype='int64'), [1, 2]),
+    (pd.array([1, None], dtype='Int64'), [1, None]),
+    (['Супермаркеты', None], ['Супермаркеты', None]),
+])
+def test_column_values(values, expected):
+    result = column_values(pd.Series(values))
+    assert result == expected
+    assert all(type(value) in (str, int, float, type(None)) for value in result)
+
+
+def test_column_values_matches_isoformat():
+    dates = pd.Series(pd.to_datetime(['2021-12-31 16:44:00', '2021-12-01 00:00:00.000001', '2021-12-01 00:00:00.1',
+                                      '2021-12-02 00:00:00.000000001'], format='ISO8601'))
+    assert column_values(dates) == [value.isoformat() for value in dates]
+
+
+def test_frame_records(transactions):
+    records = frame_records(transactions)
+    assert records[0] == {'Дата операции': '2021-12-31T16:44:00', 'Сумма операции': -160.89, 'Номер карты': '*7197',
+                          'Бонусы (включая кэшбэк)': 3, 'MCC': 5411}
+    assert records[1] == {'Дата операции': None, 'Сумма операции': None, 'Номер карты': None,
+                          'Бонусы (включая кэшбэк)': 0, 'MCC': None}
+
+
+@pytest.mark.parametrize("compact", [True, False])
+def test_dumps_native_values(backend, transactions, compact):
+    data = {
+        'start_date': pd.Timestamp('2021-12-01'),
+        'end_date': datetime.datetime(2021, 12, 31, 12, 0),
+        'count': np.int64(3),
+        'total': np.float64(10.5),
+        'missing': float('nan'),
+        'date': np.datetime64('2021-12-31T00:00:00'),
+        'transactions': transactions,
+    }
+    result = json.loads(dumps(data, compact=compact))
+    assert result['start_date'] == '2021-12-01T00:00:00'
+    assert result['end_date'] == '2021-12-31T12:00:00'
+    assert (result['count'], result['total'], result['missing']) == (3, 10.5, None)
+    assert result['date'].startswith('2021-12-31T00:00:00')
+    assert result['transactions'] == frame_records(transactions)
+
+
+def test_dumps_pretty_matches_previous_format():
+    data = {'greeting': 'Добрый день', 'start_date': pd.Timestamp('2021-12-01'), 'cards': [{'Кэшбэк': 1.5}]}
+    assert dumps(data) == json.dumps(convert_timestamps(data), ensure_ascii=False, indent=4)
+
+
+def test_dumps_compact(backend):
+    assert dumps({'a': [1, 'б']}, compact=True) == '{"a":[1,"б"]}'
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 2])
+def test_write_ndjson(backend, transactions, chunk_size):
+    stream = StringIO()
+    assert write_ndjson(transactions, stream, chunk_size=chunk_size) == 3
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == frame_records(transactions)
+    assert lines[0].startswith('{"Дата операции":"2021-12-31T16:44:00","Сумма операции":-160.89')
+
+
+def test_fast_backend_disabled(monkeypatch):
+    monkeypatch.setenv(serialization.BACKEND_ENV, 'json')
+    serialization.fast_backend.cache_clear()
+    try:
+        assert serialization.fast_backend() is None
+    finally:
+        serialization.fast_backend.cache_clear()
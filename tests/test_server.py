@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from urllib.parse import quote
+import pytest
+from src.server import DashboardServer, DashboardState, Snapshot
+
+
+pytestmark = pytest.mark.usefixtures('offline')
+
+
+@pytest.fixture
+def files(tmp_path, statement):
+    operations, settings = tmp_path / 'operations.csv', tmp_path / 'user_settings.json'
+    statement([-100.0, -50.0, -30.0, -20.0]).to_csv(operations, index=False)
+    settings.write_text(json.dumps({'user_currencies': ['USD'], 'user_stocks': []}), encoding='utf-8')
+    return operations, settings
+
+
+@pytest.fixture
+def server(files):
+    operations, settings = files
+    state = DashboardState(str(operations), str(settings))
+    server = DashboardServer(state, port=0, poll_interval=0.05)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(timeout=30)
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+
+
+def get(server, path, connection=None):
+    connection = connection or HTTPConnection('127.0.0.1', server.port, timeout=10)
+    connection.request('GET', path)
+    response = connection.getresponse()
+    return response.status, response.getheader('Content-Type'), response.read().decode('utf-8')
+
+
+def test_dashboard(server):
+    status, content_type, body = get(server, '/dashboard?datetime=' + quote('2021-12-31 00:00:00'))
+    result = json.loads(body)
+    assert status == 200
+    assert content_type.startswith('application/json')
+    assert result['cards'] == [{'Последние цифры': '1111', 'Всего потрачено': -200.0, 'Кэшбэк': -2.0}]
+    assert [rate['currency'] for rate in result['currency_rates']] == ['USD']
+
+
+def test_reports_and_services(server):
+    status, _, body = get(server, '/reports?category=' + quote('Супермаркеты') + '&date=2021-12-31')
+    assert status == 200
+    assert [row['Сумма операции'] for row in json.loads(body)] == [-100.0, -30.0]
+
+    status, content_type, body = get(server, '/services')
+    assert status == 200
+    assert content_type.startswith('application/x-ndjson')
+    assert len(body.splitlines()) == 2
+
+
+@pytest.mark.parametrize('path, expected_status', [
+    ('/dashboard', 400),
+    ('/dashboard?datetime=abc', 400),
+    ('/reports?category=x&date=31.12.2021', 400),
+    ('/unknown', 404),
+])
+def test_errors(server, path, expected_status):
+    status, _, body = get(server, path)
+    assert status == expected_status
+    assert 'error' in json.loads(body)
+
+
+def test_keep_alive(server):
+    connection = HTTPConnection('127.0.0.1', server.port, timeout=10)
+    assert get(server, '/health', connection)[0] == 200
+    assert get(server, '/metrics', connection)[0] == 200
+
+
+def test_concurrent_requests(server):
+    path = '/dashboard?datetime=' + quote('2021-12-31 00:00:00')
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        statuses = list(executor.map(lambda _: get(server, path)[0], range(16)))
+    assert statuses == [200] * 16
+
+
+def test_hot_reload(server, files, statement):
+    operations, settings = files
+    statement([-10.0, -5.0], card='2222').to_csv(operations, index=False)
+    settings.write_text(json.dumps({'user_currencies': ['EUR'], 'user_stocks': []}), encoding='utf-8')
+
+    deadline = time.monotonic() + 10
+    while server.state.snapshot.version == 1 and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    result = json.loads(get(server, '/dashboard?datetime=' + quote('2021-12-31 00:00:00'))[2])
+    assert result['cards'] == [{'Последние цифры': '2222', 'Всего потрачено': -15.0, 'Кэшбэк': -0.15}]
+    assert [rate['currency'] for rate in result['currency_rates']] == ['EUR']
+    assert json.loads(get(server, '/health')[2])['version'] == 2
+
+
+def test_reload_keeps_snapshot_on_broken_settings(files):
+    operations, settings = files
+    state = DashboardState(str(operations), str(settings))
+    snapshot = state.load()
+    settings.write_text('{"user_currencies": [', encoding='utf-8')
+
+    assert state.reload_if_changed() is False
+    assert state.snapshot is snapshot
+    assert state.reload_if_changed() is False
+
+
+def test_reload_reuses_unchanged_store(files):
+    operations, settings = files
+    state = DashboardState(str(operations), str(settings))
+    snapshot = state.load()
+    settings.write_text(json.dumps({'user_currencies': ['EUR']}), encoding='utf-8')
+
+    assert state.reload_if_changed() is True
+    assert state.snapshot.store is snapshot.store
+    assert state.snapshot.settings == {'user_currencies': ['EUR']}
+
+
+def test_snapshot_cache(files):
+    operations, settings = files
+    snapshot = DashboardState(str(operations), str(settings)).load()
+    calls = []
+    assert snapshot.cached('key', lambda: calls.append(1) or 'value') == 'value'
+    assert snapshot.cached('key', lambda: calls.append(1) or 'other') == 'value'
+    assert calls == [1]
+    assert isinstance(snapshot, Snapshot)
@@ -1,7 +1,9 @@
 import pandas as pd
-from io import BytesIO
+import json
+from io import BytesIO, StringIO
 import pytest
-from src.services import extract_transactions_with_mobile_numbers
+from src.services import extract_transactions_with_mobile_numbers, \
+    extract_transactions_with_mobile_numbers_from_batches, filter_transactions_with_mobile_numbers
 
 
 @pytest.fixture
@@ -18,13 +20,54 @@ def excel_file():
 
 
 @pytest.mark.parametrize("file_path, expected_result", [
-    ('dummy_path.xlsx', None)
+    ('dummy_path.xlsx', ['+7 (123) 456-78-90 покупка'])
 ])
 def test_extract_transactions_with_mobile_numbers(monkeypatch, file_path, expected_result, excel_file):
+    df = pd.read_excel(excel_file)
+
     def mock_read_excel(*args, **kwargs):
-        return pd.read_excel(excel_file)
+        return df
 
     monkeypatch.setattr(pd, 'read_excel', mock_read_excel)
 
     result = extract_transactions_with_mobile_numbers(file_path)
-    assert result == expected_result
+    assert result['Описание'].tolist() == expected_result
+
+
+def test_extract_transactions_with_mobile_numbers_from_batches(excel_file):
+    df = pd.read_excel(excel_file)
+    batches = [df.iloc[:2], df.iloc[2:]]
+    output = StringIO()
+
+    result = extract_transactions_with_mobile_numbers_from_batches(iter(batches), output=output)
+
+    assert result == 1
+    assert output.getvalue() == '{"Описание":"+7 (123) 456-78-90 покупка"}\n'
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_filter_transactions_with_mobile_numbers(vectorized):
+    df = pd.DataFrame({'Описание': ['Перевод +7 999 123-45-67', 'Магнит', None, '+79991234567']})
+    result = filter_transactions_with_mobile_numbers(df, vectorized=vectorized)
+    assert result.index.tolist() == [0, 3]
+
+
+def test_write_ndjson_to_file(tmp_path):
+    df = pd.DataFrame({
+        'Дата операции': [pd.Timestamp('2021-12-31 16:44:00')],
+        'Сумма операции': [-160.89],
+        'Кэшбэк': [float('nan')],
+        'Описание': ['+7 999 123-45-67']
+    })
+    file_path = tmp_path / 'numbers.ndjson'
+
+    extract_transactions_with_mobile_numbers(df, output=str(file_path))
+
+    lines = file_path.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0]) == {
+        'Дата операции': '2021-12-31T16:44:00',
+        'Сумма операции': -160.89,
+        'Кэшбэк': None,
+        'Описание': '+7 999 123-45-67'
+    }
@@ -0,0 +1,152 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.reports import filter_by_category
+from src.sqlite_store import SQLiteStore
+from src.store import TransactionStore, get_transactions, select_top
+from src.views import analyze_cards
+
+
+@pytest.fixture
+def raw_transactions():
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp('2021-10-01') + pd.to_timedelta(rng.integers(0, 90 * 24 * 3600, 300), unit='s')
+    cards = rng.choice(['*1111', '*2222', '*3333', None], 300)
+    return pd.DataFrame({
+        'Дата операции': dates.strftime('%d.%m.%Y %H:%M:%S'),
+        'Дата платежа': dates.strftime('%d.%m.%Y'),
+        'Номер карты': cards,
+        'Статус': 'OK',
+        'Сумма операции': np.round(rng.normal(-500, 700, 300), 2),
+        'Валюта операции': 'RUB',
+        'Сумма платежа': np.round(rng.normal(-500, 700, 300), 2),
+        'Категория': rng.choice(['Супермаркеты', 'Такси', 'Связь', None], 300),
+        'MCC': rng.choice([5411.0, np.nan], 300),
+        'Описание': rng.choice(['Магнит', 'Яндекс Такси', 'МТС +7 921 111-22-33'], 300),
+        'Сумма операции с округлением': np.round(rng.uniform(0, 1000, 300), 2),
+    })
+
+
+@pytest.fixture
+def stores(raw_transactions, tmp_path):
+    database = SQLiteStore(str(tmp_path / 'operations.sqlite3'))
+    database.load(raw_transactions, batch_size=64)
+    return TransactionStore(raw_transactions), database
+
+
+def test_load_round_trip(stores):
+    store, database = stores
+    assert len(database) == len(store)
+    result = get_transactions(database)
+    expected = get_transactions(store)
+    pd.testing.assert_frame_equal(result[expected.columns].fillna(np.nan), expected.fillna(np.nan), check_dtype=False,
+                                  check_index_type=False)
+    assert result['Дата операции'].dtype == 'datetime64[ns]'
+
+
+@pytest.mark.parametrize("category, start_date, end_date", [
+    ('Супермаркеты', '2021-10-01', '2021-12-31 23:59:59'),
+    ('Такси', '2021-11-05 12:00:00', '2021-11-20'),
+    ('Кино', '2021-10-01', '2021-12-31'),
+])
+def test_category_rows_match_store(stores, category, start_date, end_date):
+    store, database = stores
+    start_date, end_date = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    result = filter_by_category(database, category, start_date, end_date)
+    expected = filter_by_category(store, category, start_date, end_date)
+    assert result.index.tolist() == expected.index.tolist()
+    assert result['Сумма операции'].tolist() == expected['Сумма операции'].tolist()
+
+
+@pytest.mark.parametrize("rank_by", ['Сумма операции', 'spend', 'Сумма платежа', 'Сумма операции с округлением'])
+@pytest.mark.parametrize("start_date, end_date", [
+    ('2021-10-01', '2021-12-31 23:59:59'),
+    ('2021-11-03 08:00:00', '2021-11-17 18:00:00'),
+])
+def test_card_queries_match_store(stores, rank_by, start_date, end_date):
+    store, database = stores
+    df = get_transactions(store)
+    window = df[(df['Дата операции'] >= start_date) & (df['Дата операции'] <= end_date)]
+
+    totals = database.card_totals(start_date, end_date)
+    expected = window.groupby('Номер карты')['Сумма операции'].sum()
+    pd.testing.assert_series_equal(totals, expected, check_names=False, check_index_type=False)
+    top = database.top_transactions(start_date, end_date, k=5, rank_by=rank_by)
+    assert top.index.tolist() == select_top(window, 5, rank_by).index.tolist()
+    assert analyze_cards(database, start_date, end_date, rank_by) == \
+        analyze_cards(store, start_date, end_date, rank_by)
+
+
+def test_queries_use_indexes(stores):
+    store, database = stores
+    with database._connect() as connection:
+        plan = connection.execute('EXPLAIN QUERY PLAN SELECT * FROM transactions WHERE category = ? '
+                                  'AND operation_date BETWEEN ? AND ?', ('Такси', 'a', 'b')).fetchall()
+    assert 'idx_transactions_category_date' in str(plan)
+
+
+def test_from_file_loads_only_when_changed(raw_transactions, tmp_path):
+    path = tmp_path / 'operations.csv'
+    raw_transactions.to_csv(path, index=False)
+    database_path = str(tmp_path / 'operations.sqlite3')
+
+    database = SQLiteStore.from_file(database_path, str(path))
+    assert len(database) == len(raw_transactions)
+    assert database.meta('source') is not None
+    with database._connect() as connection:
+        connection.execute('DELETE FROM transactions WHERE id < 10')
+    assert len(SQLiteStore.from_file(database_path, str(path))) == len(raw_transactions) - 10
+
+    raw_transactions.iloc[:100].to_csv(path, index=False)
+    assert len(SQLiteStore.from_file(database_path, str(path))) == 100
+
+
+def test_append_frames_with_range_index(raw_transactions, tmp_path):
+    database = SQLiteStore(str(tmp_path / 'operations.sqlite3'))
+    first = raw_transactions.iloc[:100].reset_index(drop=True)
+    second = raw_transactions.iloc[100:].reset_index(drop=True)
+    database.load(first, replace=False)
+    database.load(second, replace=False, batch_size=64)
+
+    assert len(database) == len(raw_transactions)
+    result = database.read_all()
+    assert result.index.tolist() == list(range(len(raw_transactions)))
+    assert result['Описание'].tolist() == raw_transactions['Описание'].tolist()
+
+
+def test_failed_reload_keeps_previous_table(raw_transactions, tmp_path):
+    path = tmp_path / 'operations.csv'
+    raw_transactions.to_csv(path, index=False)
+    database = SQLiteStore.from_file(str(tmp_path / 'operations.sqlite3'), str(path))
+    signature = database.meta('source')
+
+    duplicated = pd.concat([raw_transactions.iloc[:100], raw_transactions.iloc[:100]])
+    with pytest.raises(sqlite3.IntegrityError):
+        database.load(duplicated, batch_size=64)
+
+    assert len(database) == len(raw_transactions)
+    assert database.meta('source') == signature
+    with database._connect() as connection:
+        tables = connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    assert sorted(tables) == [('meta',), ('transactions',)]
+
+
+def test_concurrent_from_file_loads_once(raw_transactions, tmp_path):
+    path = tmp_path / 'operations.csv'
+    raw_transactions.to_csv(path, index=False)
+    database_path = str(tmp_path / 'operations.sqlite3')
+
+    with patch.object(SQLiteStore, '_insert', autospec=True, side_effect=SQLiteStore._insert) as mock_insert:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            stores = list(executor.map(lambda _: SQLiteStore.from_file(database_path, str(path)), range(4)))
+
+    assert mock_insert.call_count == 1
+    assert [len(store) for store in stores] == [len(raw_transactions)] * 4
+
+
+def test_top_transactions_rejects_unknown_ranking(stores):
+    with pytest.raises(ValueError):
+        stores[1].top_transactions('2021-10-01', '2021-12-31', rank_by='Кэшбэк')
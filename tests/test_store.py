@@ -0,0 +1,273 @@
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.store import CardDailyTotals, DateIndex, PartitionIndex, TopKIndex, TransactionStore, get_transactions, \
+    normalize_transactions, rank_scores, select_top
+
+
+@pytest.fixture
+def raw_transactions():
+    return pd.DataFrame({
+        'Дата операции': ['01.07.2018 10:00:00', '10.07.2018 12:30:00'],
+        'Дата платежа': ['01.07.2018', '10.07.2018'],
+        'Номер карты': [' *7197 ', None],
+        'Сумма операции': ['-100.5', '-20'],
+        'Категория': ['Супермаркеты', 'Фастфуд']
+    })
+
+
+def test_normalize_transactions(raw_transactions):
+    result = normalize_transactions(raw_transactions)
+    assert pd.api.types.is_datetime64_any_dtype(result['Дата операции'])
+    assert pd.api.types.is_datetime64_any_dtype(result['Дата платежа'])
+    assert result['Сумма операции'].tolist() == [-100.5, -20.0]
+    assert result['Номер карты'][0] == '7197'
+    assert pd.isna(result['Номер карты'][1])
+    assert raw_transactions['Дата операции'][0] == '01.07.2018 10:00:00'
+
+
+def test_store_from_file_reads_once(raw_transactions):
+    with patch('src.store.load_operations', return_value=raw_transactions) as mock_load:
+        store = TransactionStore.from_file('operations.xlsx')
+        assert get_transactions(store) is store.df
+        assert get_transactions(store) is store.df
+        mock_load.assert_called_once_with('operations.xlsx', cache_dir=None)
+    assert len(store) == 2
+
+
+def test_get_transactions_from_path(raw_transactions):
+    with patch('src.store.load_operations', return_value=raw_transactions):
+        result = get_transactions('operations.xlsx')
+    assert pd.api.types.is_datetime64_any_dtype(result['Дата операции'])
+
+
+def test_get_transactions_from_dataframe(raw_transactions):
+    result = get_transactions(raw_transactions)
+    assert pd.api.types.is_datetime64_any_dtype(result['Дата операции'])
+    assert raw_transactions['Номер карты'][0] == ' *7197 '
+
+
+@pytest.mark.parametrize("start_date, end_date, expected_amounts", [
+    ('2018-07-01', '2018-07-31', [-30.0, -10.0, -20.0]),
+    ('2018-07-05', '2018-07-10 12:30:00', [-10.0, -20.0]),
+    ('2018-08-01', '2018-08-31', []),
+])
+def test_date_index_window(start_date, end_date, expected_amounts):
+    df = pd.DataFrame({
+        'Дата операции': pd.to_datetime(['2018-07-10 12:30:00', '2018-07-05 00:00:00', '2018-07-01 00:00:00']),
+        'Сумма операции': [-20.0, -10.0, -30.0]
+    })
+    index = DateIndex(df)
+    assert index.window(start_date, end_date)['Сумма операции'].tolist() == expected_amounts
+
+
+def test_store_date_index_is_cached(raw_transactions):
+    store = TransactionStore(raw_transactions)
+    assert store.date_index is store.date_index
+
+
+@pytest.fixture
+def partitioned_transactions():
+    return pd.DataFrame({
+        'Дата операции': pd.to_datetime(['2018-07-20 00:00:00', '2018-07-01 00:00:00', '2018-07-15 00:00:00',
+                                         '2018-07-10 00:00:00', '2018-07-05 00:00:00']),
+        'Категория': ['Такси', 'Фастфуд', 'Такси', None, 'Такси'],
+        'Сумма операции': [-1.0, -2.0, -3.0, -4.0, -5.0]
+    })
+
+
+@pytest.mark.parametrize("key, start_date, end_date, expected_amounts", [
+    ('Такси', None, None, [-5.0, -3.0, -1.0]),
+    ('Такси', '2018-07-06', '2018-07-20', [-3.0, -1.0]),
+    ('Такси', '2018-07-21', '2018-07-31', []),
+    ('Фастфуд', '2018-07-01', '2018-07-01', [-2.0]),
+    ('Супермаркеты', None, None, []),
+])
+def test_partition_index_rows(partitioned_transactions, key, start_date, end_date, expected_amounts):
+    index = PartitionIndex(partitioned_transactions, 'Категория')
+    assert index.rows(key, start_date, end_date)['Сумма операции'].tolist() == expected_amounts
+
+
+def test_partition_index_keys(partitioned_transactions):
+    index = PartitionIndex(partitioned_transactions, 'Категория')
+    assert index.keys.tolist() == ['Такси', 'Фастфуд']
+    assert index.offsets.tolist() == [1, 4, 5]
+
+
+@pytest.fixture
+def card_transactions():
+    return pd.DataFrame({
+        'Дата операции': pd.to_datetime(['2018-07-01 10:00:00', '2018-07-01 18:00:00', '2018-07-03 09:00:00',
+                                         '2018-07-05 12:00:00', '2018-07-05 20:00:00', '2018-07-06 08:00:00']),
+        'Номер карты': ['1111', '2222', '1111', '1111', '2222', None],
+        'Сумма операции': [-100.0, -50.0, -200.0, -300.0, -10.0, -1.0]
+    })
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    ('2018-07-01', '2018-07-31'),
+    ('2018-07-01', '2018-07-05 15:00:00'),
+    ('2018-07-01 12:00:00', '2018-07-05 15:00:00'),
+    ('2018-07-05', '2018-07-05 23:59:59'),
+    ('2018-07-02', '2018-07-02 23:00:00'),
+])
+def test_card_daily_totals_between(card_transactions, start_date, end_date):
+    store = TransactionStore(card_transactions)
+    result = store.card_daily_totals.between(start_date, end_date, store.date_index)
+
+    dates = card_transactions['Дата операции']
+    window = card_transactions[(dates >= start_date) & (dates <= end_date)]
+    expected = window.groupby('Номер карты')['Сумма операции'].sum()
+
+    pd.testing.assert_series_equal(result['Сумма операции'], expected, check_names=False, check_index_type=False)
+    assert list(result.columns) == ['Сумма операции']
+
+
+def test_card_daily_totals_update(card_transactions):
+    totals = CardDailyTotals(card_transactions.iloc[:3])
+    cumulative_2222 = totals.cumulative_spend['2222']
+    totals.update(card_transactions.iloc[3:4])
+
+    assert totals.cumulative_spend['2222'] is cumulative_2222
+    assert totals.cumulative_spend['1111'].tolist() == [0.0, -100.0, -300.0, -600.0]
+    full = totals.full_days(pd.Timestamp('2018-07-01'), pd.Timestamp('2018-07-06'))
+    assert full['Сумма операции'].to_dict() == {'1111': -600.0, '2222': -50.0}
+
+
+@pytest.fixture
+def top_transactions():
+    dates = pd.date_range('2018-07-01 08:00:00', periods=40, freq='7h')
+    return pd.DataFrame({
+        'Дата операции': dates,
+        'Номер карты': ['1111', '2222'] * 20,
+        'Сумма операции': [(-1) ** i * (i * 37 % 101) for i in range(40)],
+        'Сумма платежа': [-(i * 13 % 29) for i in range(40)],
+        'Сумма операции с округлением': [i * 13 % 29 for i in range(40)]
+    }).astype({'Сумма операции': 'float64', 'Сумма платежа': 'float64', 'Сумма операции с округлением': 'float64'})
+
+
+@pytest.mark.parametrize("rank_by", ['Сумма операции', 'spend', 'Сумма платежа', 'Сумма операции с округлением'])
+@pytest.mark.parametrize("by_card", [False, True])
+@pytest.mark.parametrize("start_date, end_date", [
+    ('2018-07-01', '2018-07-31'),
+    ('2018-07-02 12:00:00', '2018-07-08 09:00:00'),
+    ('2018-07-03 01:00:00', '2018-07-03 20:00:00'),
+])
+def test_store_top_transactions(top_transactions, rank_by, by_card, start_date, end_date):
+    store = TransactionStore(top_transactions)
+    dates = top_transactions['Дата операции']
+    window = top_transactions[(dates >= start_date) & (dates <= end_date)]
+
+    result = store.top_transactions(start_date, end_date, k=3, rank_by=rank_by, by_card=by_card)
+    pd.testing.assert_frame_equal(result, select_top(window, 3, rank_by, by_card))
+
+
+def test_select_top_matches_nlargest(top_transactions):
+    pd.testing.assert_frame_equal(select_top(top_transactions, 5), top_transactions.nlargest(5, 'Сумма операции'))
+
+
+def test_rank_scores_spend_excludes_income():
+    df = pd.DataFrame({'Сумма операции': [-100.0, 500.0, -20.0]})
+    assert rank_scores(df, 'spend').tolist()[0] == 100.0
+    assert pd.isna(rank_scores(df, 'spend')[1])
+    with pytest.raises(ValueError):
+        rank_scores(df, 'Кэшбэк')
+
+
+def test_top_k_index_update(top_transactions):
+    index = TopKIndex(top_transactions.iloc[:30], k=2)
+    index.update(top_transactions.iloc[30:])
+    expected = TopKIndex(top_transactions, k=2)
+    pd.testing.assert_frame_equal(index.rows, expected.rows)
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    ('2018-07-01', '2018-07-31'),
+    ('2018-07-02 12:00:00', '2018-07-08 09:00:00'),
+])
+def test_compact_store_matches_store(top_transactions, start_date, end_date):
+    store = TransactionStore(top_transactions)
+    compact = TransactionStore(top_transactions, compact=True)
+
+    pd.testing.assert_frame_equal(compact.card_daily_totals.between(start_date, end_date, compact.date_index),
+                                  store.card_daily_totals.between(start_date, end_date, store.date_index))
+    expected = store.top_transactions(start_date, end_date, rank_by='spend')
+    result = compact.top_transactions(start_date, end_date, rank_by='spend')
+    assert result.index.tolist() == expected.index.tolist()
+    assert result['Сумма операции'].tolist() == expected['Сумма операции'].tolist()
+    assert compact.memory_report().loc['Итого', 'Экономия'] > 0
+
+
+def test_date_index_update(top_transactions):
+    shuffled = top_transactions.sample(frac=1, random_state=0)
+    index = DateIndex(shuffled.iloc[:25])
+    index.update(shuffled.iloc[25:])
+    expected = DateIndex(shuffled)
+    assert index.dates.tolist() == expected.dates.tolist()
+    pd.testing.assert_frame_equal(index.window('2018-07-03', '2018-07-06'),
+                                  expected.window('2018-07-03', '2018-07-06'))
+
+
+def test_partition_index_update(partitioned_transactions):
+    new_rows = pd.DataFrame({
+        'Дата операции': pd.to_datetime(['2018-07-12 00:00:00', '2018-07-02 00:00:00', '2018-07-03 00:00:00',
+                                         '2018-07-25 00:00:00']),
+        'Категория': ['Такси', 'Связь', None, 'Такси'],
+        'Сумма операции': [-6.0, -7.0, -8.0, -9.0]
+    }, index=[5, 6, 7, 8])
+    index = PartitionIndex(partitioned_transactions, 'Категория')
+    index.update(new_rows)
+    expected = PartitionIndex(pd.concat([partitioned_transactions, new_rows]), 'Категория')
+
+    assert sorted(index.keys) == sorted(expected.keys)
+    assert index.offsets[0] == expected.offsets[0] == 2
+    for key in expected.keys:
+        pd.testing.assert_frame_equal(index.rows(key), expected.rows(key))
+        assert index.rows(key, '2018-07-06', '2018-07-20').index.tolist() == \
+            expected.rows(key, '2018-07-06', '2018-07-20').index.tolist()
+
+
+@pytest.fixture
+def exports(top_transactions):
+    """Две выгрузки, которые пересекаются по 10 транзакциям"""
+    full = top_transactions.assign(**{'Категория': ['Такси', 'Фастфуд', 'Связь', 'Такси'] * 10,
+                                      'Описание': [f'Операция {i % 7}' for i in range(40)]})
+    return full, full.iloc[:30], full.iloc[20:]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_store_append_matches_full_load(exports, compact):
+    full, first, second = exports
+    store = TransactionStore(first, compact=compact)
+    store.date_index, store.category_index, store.card_daily_totals, store.top_k_index(5, 'spend')
+
+    report = store.append(second)
+    expected = TransactionStore(full, compact=compact)
+
+    assert (report.rows, report.appended, report.duplicates, report.rejected) == (20, 10, 10, 0)
+    assert len(store) == len(full)
+    for start_date, end_date in [('2018-07-01', '2018-07-31'), ('2018-07-05 12:00:00', '2018-07-09 09:00:00')]:
+        pd.testing.assert_frame_equal(store.card_daily_totals.between(start_date, end_date, store.date_index),
+                                      expected.card_daily_totals.between(start_date, end_date, expected.date_index))
+        assert store.top_transactions(start_date, end_date, rank_by='spend').index.tolist() == \
+            expected.top_transactions(start_date, end_date, rank_by='spend').index.tolist()
+        for category in ['Такси', 'Связь']:
+            assert store.category_index.rows(category, start_date, end_date).index.tolist() == \
+                expected.category_index.rows(category, start_date, end_date).index.tolist()
+    assert store.append(second).appended == 0
+
+
+def test_store_append_counts_repeated_transactions(exports):
+    full, first, second = exports
+    store = TransactionStore(first.iloc[:1])
+    report = store.append(pd.concat([first.iloc[:1], first.iloc[:1], first.iloc[1:2]]))
+    assert (report.appended, report.duplicates) == (2, 1)
+    assert store.df.index.tolist() == [0, 1, 2]
+
+
+def test_store_append_file(exports, tmp_path):
+    full, first, second = exports
+    path = tmp_path / 'export.csv'
+    second.to_csv(path, index=False, date_format='%d.%m.%Y %H:%M:%S')
+    store = TransactionStore(first)
+    assert store.append_file(str(path)).appended == 10
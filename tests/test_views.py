@@ -1,10 +1,35 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 import pytest
 from unittest.mock import patch, MagicMock
-from src.views import fetch_stock_price, get_greeting, get_currency_rates, get_stock_price, analyze_cards
+from src import views
+from src.views import fetch_stock_price, get_greeting, get_currency_rates, get_stock_price, analyze_cards, \
+    analyze_cards_from_batches, analyze_cashback
+from src.cashback import CashbackRules
+from src.quote_cache import QuoteCache
+from src.resilience import Deadline, get_breaker, reset_breakers
+from src.store import TransactionStore
 from datetime import datetime
 import pandas as pd
 
 
+@pytest.fixture(autouse=True)
+def circuit_breakers():
+    reset_breakers()
+    yield
+    reset_breakers()
+
+
+@pytest.fixture(autouse=True)
+def quote_cache():
+    cache = QuoteCache(path=None)
+    with patch('src.views.get_quote_cache', return_value=cache):
+        yield cache
+
+
 @pytest.fixture
 def mock_stock_prices():
     return {"AAPL": 150.12}
@@ -53,7 +78,7 @@ def test_get_greeting(time_str, expected_greeting):
     assert get_greeting(time) == expected_greeting
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 @patch('src.views.API_KEY', None)
 def test_get_currency_rates_no_api_key(mock_get):
     currencies = ["USD", "EUR"]
@@ -63,7 +88,7 @@ def test_get_currency_rates_no_api_key(mock_get):
     assert rates[1]["currency"] == "EUR"
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 @patch('src.views.API_KEY', 'test_api_key')
 def test_get_currency_rates_with_api_key(mock_get, mock_api_response):
     mock_get.return_value.status_code = 200
@@ -77,7 +102,7 @@ def test_get_currency_rates_with_api_key(mock_get, mock_api_response):
     assert rates[1]["rate"] == 0.85
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 @patch('src.views.API_KEY_STOCK', None)
 def test_get_stock_price_no_api_key(mock_get):
     stocks = ["AAPL", "MSFT"]
@@ -85,7 +110,7 @@ def test_get_stock_price_no_api_key(mock_get):
     assert len(prices) == 5
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 @patch('src.views.API_KEY_STOCK', 'test_api_key')
 def test_get_stock_price_with_api_key(mock_get, mock_api_response):
     mock_get.return_value.status_code = 200
@@ -106,3 +131,250 @@ def test_analyze_cards(mock_read_excel, sample_transactions):
     card_info, transactions = analyze_cards('/fake/path/operations.xlsx', start_date, end_date)
     assert len(card_info) == 2
     assert len(transactions) == 4
+
+
+def test_analyze_cards_with_store(sample_transactions):
+    store = TransactionStore(sample_transactions)
+    dates_before = store.df['Дата операции'].copy()
+
+    card_info, transactions = analyze_cards(store, pd.to_datetime("2018-07-01"), pd.to_datetime("2018-07-16"))
+    assert len(card_info) == 2
+    assert len(transactions) == 3
+    pd.testing.assert_series_equal(store.df['Дата операции'], dates_before)
+
+
+def test_analyze_cards_from_batches(sample_transactions):
+    start_date = pd.to_datetime("2018-07-01")
+    end_date = pd.to_datetime("2018-07-31")
+    batches = [sample_transactions.iloc[:1], sample_transactions.iloc[1:3], sample_transactions.iloc[3:]]
+
+    with patch('pandas.read_excel', return_value=sample_transactions):
+        expected = analyze_cards('/fake/path/operations.xlsx', start_date, end_date)
+
+    assert analyze_cards_from_batches(iter(batches), start_date, end_date) == expected
+
+    rules = CashbackRules(categories={"Food": 0.05}, monthly_cap=1.0)
+    cashback = analyze_cashback(sample_transactions, start_date, end_date, rules)
+    with patch('pandas.read_excel', return_value=sample_transactions):
+        expected = analyze_cards('/fake/path/operations.xlsx', start_date, end_date,
+                                 cashback=cashback.by_card['Кэшбэк'])
+    assert analyze_cards_from_batches(iter(batches), start_date, end_date, rules) == expected
+    assert [card["Кэшбэк"] for card in expected[0]] == [0.7, 1.0]
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    ("2018-07-01", "2018-07-31"),
+    ("2018-07-05", "2018-07-16"),
+    ("2018-08-01", "2018-08-31"),
+])
+def test_analyze_cards_store_matches_dataframe(sample_transactions, start_date, end_date):
+    store = TransactionStore(sample_transactions.copy())
+    expected = analyze_cards(sample_transactions, pd.to_datetime(start_date), pd.to_datetime(end_date))
+    assert analyze_cards(store, pd.to_datetime(start_date), pd.to_datetime(end_date)) == expected
+
+
+"""Задержки ответа локального сервера котировок в секундах"""
+SERVER_DELAYS = {"AAPL": 0.1, "AMZN": 0.2, "GOOGL": 0.3, "MSFT": 0.1, "TSLA": 0.2, "currency": 0.3}
+
+"""Акции, для которых локальный сервер возвращает ошибку"""
+SERVER_ERRORS = set()
+
+
+class QuoteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        if 'symbol' in query:
+            symbol = query['symbol'][0]
+            time.sleep(SERVER_DELAYS[symbol])
+            if symbol in SERVER_ERRORS:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            payload = {"Global Quote": {"05. price": "100.00"}}
+        else:
+            time.sleep(SERVER_DELAYS['currency'])
+            payload = {"quotes": {"USDUSD": 1.0, "USDEUR": 0.85}}
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def quote_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), QuoteHandler)
+    server.block_on_close = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_stock_price_concurrent(quote_server):
+    stocks = ["AAPL", "AMZN", "GOOGL", "MSFT", "TSLA"]
+    with patch('src.views.API_KEY_STOCK', 'test_api_key'), patch('src.views.STOCK_API_URL', f'{quote_server}/query'):
+        start = time.perf_counter()
+        prices = get_stock_price(stocks)
+        elapsed = time.perf_counter() - start
+
+    assert [price["stock"] for price in prices] == stocks
+    assert all(price["price"] == 100.0 for price in prices)
+    assert elapsed < max(SERVER_DELAYS[s] for s in stocks) + 0.25
+    assert elapsed < sum(SERVER_DELAYS[s] for s in stocks)
+
+
+def test_main_fetches_quotes_concurrently(quote_server, sample_transactions):
+    settings = {"user_currencies": ["USD", "EUR"], "user_stocks": ["AAPL", "AMZN", "GOOGL", "MSFT", "TSLA"]}
+    with patch('src.views.API_KEY', 'test_api_key'), patch('src.views.API_KEY_STOCK', 'test_api_key'), \
+            patch('src.views.STOCK_API_URL', f'{quote_server}/query'), \
+            patch('src.views.CURRENCY_API_URL', f'{quote_server}/live'), \
+            patch('src.views.load_user_settings', return_value=settings):
+        start = time.perf_counter()
+        result = json.loads(views.main("2018-07-20 15:30:45", sample_transactions))
+        elapsed = time.perf_counter() - start
+
+    assert result["currency_rates"] == [{"currency": "USD", "rate": 1.0}, {"currency": "EUR", "rate": 0.85}]
+    assert len(result["stock_prices"]) == 5
+    assert elapsed < max(SERVER_DELAYS.values()) + 0.3
+
+
+def test_main_applies_cashback_rules(sample_transactions):
+    settings = {"user_currencies": [], "user_stocks": [],
+                "cashback": {"categories": {"Food": 0.05}, "excluded_categories": ["Entertainment"]}}
+    with patch('src.views.API_KEY', None), patch('src.views.API_KEY_STOCK', None), \
+            patch('src.views.load_user_settings', return_value=settings):
+        result = json.loads(views.main("2018-07-20 15:30:45", sample_transactions))
+
+    assert [(card["Последние цифры"], card["Кэшбэк"]) for card in result["cards"]] == [("3456", 0.2), ("4321", 1.5)]
+    assert result["cashback_categories"] == [
+        {"Категория": "Food", "Сумма операции": 30.0, "Кэшбэк": 1.5},
+        {"Категория": "Transport", "Сумма операции": 20.0, "Кэшбэк": 0.2},
+        {"Категория": "Entertainment", "Сумма операции": 40.0, "Кэшбэк": 0.0},
+    ]
+    assert "cashback" not in result["degraded"]
+
+
+def test_main_invalid_cashback_rules(sample_transactions):
+    settings = {"user_currencies": [], "user_stocks": [], "cashback": {"default_rate": 5}}
+    with patch('src.views.API_KEY', None), patch('src.views.API_KEY_STOCK', None), \
+            patch('src.views.load_user_settings', return_value=settings):
+        result = json.loads(views.main("2018-07-20 15:30:45", sample_transactions))
+
+    assert [card["Кэшбэк"] for card in result["cards"]] == [0.2, 0.7]
+    assert result["cashback_categories"] == []
+    assert "cashback" in result["degraded"]
+
+
+@pytest.mark.parametrize("rules, expected_cashback", [
+    (CashbackRules(categories={"Food": 0.05}, monthly_cap=1.0), [0.7, 1.0]),
+    (CashbackRules(mcc={5411: 0.1}, categories={"Food": 0.05}), [1.2, 5.5]),
+])
+@pytest.mark.parametrize("compact", [False, True])
+def test_analyze_cashback_store_matches_dataframe(sample_transactions, compact, rules, expected_cashback):
+    transactions = sample_transactions.assign(MCC=[5411.0, None, 5812.0, 5411.0])
+    start_date, end_date = pd.to_datetime("2018-07-01"), pd.to_datetime("2018-07-31")
+    expected = analyze_cashback(transactions, start_date, end_date, rules)
+    result = analyze_cashback(TransactionStore(transactions, compact=compact), start_date, end_date, rules)
+    pd.testing.assert_frame_equal(result.by_card, expected.by_card)
+    pd.testing.assert_frame_equal(result.by_category, expected.by_category, check_categorical=False)
+    assert expected.by_card["Кэшбэк"].tolist() == expected_cashback
+
+
+def test_get_stock_price_fallback_per_symbol(quote_server):
+    with patch('src.views.API_KEY_STOCK', 'test_api_key'), patch('src.views.STOCK_API_URL', f'{quote_server}/query'):
+        with patch('tests.test_views.SERVER_ERRORS', {"TSLA"}):
+            prices = get_stock_price(["AAPL", "TSLA"])
+    assert prices == [{"stock": "AAPL", "price": 100.0}, {"stock": "TSLA", "price": 1007.08}]
+
+
+def test_get_stock_price_uses_cache(quote_server, quote_cache):
+    stocks = ["AAPL", "MSFT"]
+    with patch('src.views.API_KEY_STOCK', 'test_api_key'), patch('src.views.STOCK_API_URL', f'{quote_server}/query'):
+        first = get_stock_price(stocks)
+        with patch('requests.Session.get') as mock_get:
+            second = get_stock_price(stocks)
+            mock_get.assert_not_called()
+
+    assert first == second
+    assert quote_cache.stats()['misses'] == 2
+    assert quote_cache.stats()['hits'] == 2
+
+
+@patch('requests.Session.get')
+@patch('src.views.API_KEY_STOCK', 'test_api_key')
+def test_get_stock_price_does_not_cache_defaults(mock_get, quote_cache):
+    mock_get.return_value.json = MagicMock(return_value={"Global Quote": {}})
+    assert get_stock_price(["AAPL"]) == [{"stock": "AAPL", "price": 150.12}]
+    get_stock_price(["AAPL"])
+    assert mock_get.call_count == 2
+
+
+def test_main_within_budget_with_slow_upstream(quote_server, sample_transactions):
+    settings = {"user_currencies": ["USD", "EUR"], "user_stocks": ["AAPL", "TSLA"]}
+    with patch('src.views.API_KEY', 'test_api_key'), patch('src.views.API_KEY_STOCK', 'test_api_key'), \
+            patch('src.views.STOCK_API_URL', f'{quote_server}/query'), \
+            patch('src.views.CURRENCY_API_URL', f'{quote_server}/live'), \
+            patch('src.views.load_user_settings', return_value=settings), \
+            patch.dict(SERVER_DELAYS, {"TSLA": 2.0}):
+        start = time.perf_counter()
+        result = json.loads(views.main("2018-07-20 15:30:45", sample_transactions, budget=0.5))
+        elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.7
+    assert result["degraded"] == ["stock_prices"]
+    assert result["currency_rates"] == [{"currency": "USD", "rate": 1.0}, {"currency": "EUR", "rate": 0.85}]
+    assert result["stock_prices"] == [{"stock": "AAPL", "price": 100.0}, {"stock": "TSLA", "price": 1007.08}]
+
+
+def test_get_stock_price_skips_open_circuit(quote_server):
+    with patch('src.views.API_KEY_STOCK', 'test_api_key'), patch('src.views.STOCK_API_URL', f'{quote_server}/query'):
+        breaker = get_breaker(quote_server.split('//')[1])
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+
+        with patch('requests.Session.get') as mock_get:
+            degraded = set()
+            prices = get_stock_price(["AAPL"], degraded=degraded)
+            mock_get.assert_not_called()
+
+    assert prices == [{"stock": "AAPL", "price": 150.12}]
+    assert degraded == {"stock_prices"}
+
+
+def test_main_reports_stage_timings(quote_server, sample_transactions):
+    settings = {"user_currencies": ["USD"], "user_stocks": ["AAPL"]}
+    with patch('src.views.API_KEY', 'test_api_key'), patch('src.views.API_KEY_STOCK', 'test_api_key'), \
+            patch('src.views.STOCK_API_URL', f'{quote_server}/query'), \
+            patch('src.views.CURRENCY_API_URL', f'{quote_server}/live'), \
+            patch('src.views.load_user_settings', return_value=settings):
+        result = json.loads(views.main("2018-07-20 15:30:45", sample_transactions, timings=True))
+        without_timings = json.loads(views.main("2018-07-20 15:30:45", sample_transactions))
+
+    assert {'views.build_dashboard', 'views.load_settings', 'views.analyze_cards',
+            'views.get_currency_rates', 'views.get_stock_price'} <= set(result["timings"])
+    assert all(seconds >= 0 for seconds in result["timings"].values())
+    assert "timings" not in without_timings
+
+
+def test_stale_quotes_refresh_after_request_deadline(quote_server, quote_cache):
+    quote_cache.put_many({"stock:AAPL": 1.0, "USDEUR": 0.5})
+    quote_cache.ttl = 0
+    deadline = Deadline(0)
+    with patch('src.views.API_KEY', 'test_api_key'), patch('src.views.API_KEY_STOCK', 'test_api_key'), \
+            patch('src.views.STOCK_API_URL', f'{quote_server}/query'), \
+            patch('src.views.CURRENCY_API_URL', f'{quote_server}/live'):
+        assert views.fetch_stock_quote("AAPL", deadline) == {"stock": "AAPL", "price": 1.0}
+        assert get_currency_rates(["EUR"], deadline) == [{"currency": "EUR", "rate": 0.5}]
+        quote_cache._executor.shutdown(wait=True)
+
+    assert quote_cache.stats()['refreshes'] == 2
+    assert quote_cache.stats()['errors'] == 0
@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.reports import save_report
+from src.writers import ReportWriter, frame_digest, report_path
+
+
+@pytest.fixture
+def report_df():
+    return pd.DataFrame({
+        'Дата операции': pd.to_datetime(['2021-12-31 16:44:00']),
+        'Категория': ['Супермаркеты'],
+        'Сумма операции': [-160.89]
+    })
+
+
+@pytest.mark.parametrize("fmt, reader", [
+    ('csv', pd.read_csv),
+    ('csv.gz', pd.read_csv),
+    ('ndjson', lambda path: pd.read_json(path, lines=True)),
+])
+def test_report_writer_formats(tmp_path, report_df, fmt, reader):
+    path = report_path(str(tmp_path), 'report', fmt)
+    ReportWriter().submit(report_df, path, fmt)
+    result = reader(path)
+    assert result['Категория'].tolist() == ['Супермаркеты']
+    assert result['Сумма операции'].tolist() == [-160.89]
+
+
+def test_report_path_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        report_path(str(tmp_path), 'report', 'xml')
+
+
+def test_report_writer_skips_unchanged(tmp_path, report_df):
+    writer = ReportWriter()
+    path = str(tmp_path / 'report')
+    with patch('src.writers.write_report') as mock_write:
+        mock_write.side_effect = lambda df, p, fmt: open(p, 'w').close()
+        writer.submit(report_df, path)
+        writer.submit(report_df.copy(), path)
+        writer.submit(report_df.assign(**{'Сумма операции': -1.0}), path)
+    assert mock_write.call_count == 2
+
+
+def test_report_writer_background(tmp_path, report_df):
+    writer = ReportWriter(max_queue_size=2)
+    paths = [str(tmp_path / f'report_{i}') for i in range(5)]
+    for path in paths:
+        writer.submit(report_df, path, background=True)
+    writer.flush()
+    for path in paths:
+        assert pd.read_csv(path)['Категория'].tolist() == ['Супермаркеты']
+
+
+def test_frame_digest(report_df):
+    assert frame_digest(report_df) == frame_digest(report_df.copy())
+    assert frame_digest(report_df) != frame_digest(report_df.rename(columns={'Категория': 'category'}))
+
+
+def test_save_report_template(tmp_path, report_df):
+    @save_report('report_{category}_{date}', fmt='ndjson')
+    def report(transactions, category, date=None):
+        return transactions
+
+    with patch('src.reports.logs_directory', str(tmp_path)):
+        report(report_df, 'Супермаркеты', date='2021-12-31')
+
+    result = pd.read_json(tmp_path / 'report_Супермаркеты_2021-12-31.ndjson', lines=True)
+    assert len(result) == 1
+
+
+def test_save_report_unique(tmp_path, report_df):
+    @save_report('report', unique=True)
+    def report(transactions):
+        return transactions
+
+    with patch('src.reports.logs_directory', str(tmp_path)):
+        report(report_df)
+        report(report_df)
+
+    assert len(list(tmp_path.iterdir())) == 2